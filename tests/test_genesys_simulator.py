@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+from genesys import Genesys
+from simulation.genesys_simulator import (
+    GenesysBus,
+    SimulatedSerial,
+    SimulatedSupply,
+    SimulatorTiming,
+)
+
+# Instantaneous link, so that only the slew rate and the timeouts take time
+FAST = dict(baudrate=10**9, processing_delay=0.0)
+
+
+@pytest.fixture(autouse=True)
+def forget_addressed_device():
+    # The addressed device is shared by all the Genesys instances
+    Genesys.listening_address.clear()
+    yield
+    Genesys.listening_address.clear()
+
+
+@pytest.fixture
+def bus() -> GenesysBus:
+    return GenesysBus(
+        [
+            SimulatedSupply(6, serial_number="SIM-000006", slew_rate=10.0, current_noise=0.0, voltage_noise=0.0),
+            SimulatedSupply(7, serial_number="SIM-000007", slew_rate=10.0, current_noise=0.0, voltage_noise=0.0),
+        ],
+        seed=0,
+    )
+
+
+@pytest.fixture
+def port(bus: GenesysBus) -> SimulatedSerial:
+    return SimulatedSerial(bus, SimulatorTiming(**FAST, seed=0), timeout=0.2)
+
+
+def test_adr_selects_the_device(bus, port):
+    ps1, ps2 = Genesys(6, port), Genesys(7, port)
+
+    assert ps1.get_identity() == "LAMBDA,GEN6-100"
+    assert ps1.get_serial_number() == "SIM-000006"
+    assert ps2.get_serial_number() == "SIM-000007"
+    assert bus.selected == 7
+    assert ps1.get_serial_number() == "SIM-000006"
+    assert bus.selected == 6
+
+
+def test_unknown_address_does_not_reply(bus):
+    assert bus.handle("ADR 3") is None
+    assert bus.selected is None
+    assert bus.handle("IDN?") is None
+
+
+def test_repeat_last_command(port):
+    ps = Genesys(6, port)
+
+    assert ps.set_programmed_current(5) == "OK"
+    assert ps.get_programmed_current() == "5.00"
+    assert ps.repeat_last_command() == "5.00"
+
+
+def test_current_ramp_follows_the_slew_rate(bus, port):
+    ps = Genesys(6, port)
+    assert ps.set_power_status("ON") == "OK"
+
+    start = time.monotonic()
+    assert ps.set_programmed_current(2) == "OK"
+    assert ps.get_programmed_current() == "2.00"
+    measured = float(ps.get_measured_current())
+    elapsed = time.monotonic() - start
+    # The output is still ramping at 10 A/s
+    assert 0.0 <= measured < 2.0
+    assert measured <= 10.0 * elapsed + 0.01
+
+    time.sleep(0.25)
+    assert float(ps.get_measured_current()) == pytest.approx(2.0)
+    assert ps.get_operation_mode() == "CC"
+
+
+def test_dropped_reply_times_out(port):
+    ps = Genesys(6, port)
+    assert ps.get_identity() == "LAMBDA,GEN6-100"
+
+    port.timing.drop_probability = 1.0
+    start = time.monotonic()
+    assert ps.get_identity() == ""
+    assert time.monotonic() - start >= port.timeout
+
+    # The link recovers once the replies get through again
+    port.timing.drop_probability = 0.0
+    assert ps.get_identity() == "LAMBDA,GEN6-100"
+
+
+def test_unanswered_adr_raises_after_retries(bus):
+    port = SimulatedSerial(bus, SimulatorTiming(**FAST, drop_probability=1.0, seed=0), timeout=0.05)
+    ps = Genesys(6, port)
+
+    with pytest.raises(AssertionError):
+        ps.get_identity()
+    assert ps.tries == 0
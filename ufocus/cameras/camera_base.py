@@ -35,3 +35,11 @@ class Camera(ABC):
 
     @abstractmethod
     def stop(self): ...
+
+    def set_roi(self, window: Optional[tuple[int, int, int, int]]) -> bool:
+        """
+        Restrict the readout to the window (x1, y1, x2, y2), or to the full sensor for None.
+
+        Returns False if the camera cannot change its readout window while grabbing.
+        """
+        return False
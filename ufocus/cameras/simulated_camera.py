@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from typing import Optional
+
+from cameras.camera_base import Camera
+from simulation.beam_model import QuadrupoleFocusingModel
+from simulation.genesys_simulator import GenesysBus, get_default_bus
+from workers.simulated_camera_worker import SimulatedCameraWorker
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedCamera(Camera):
+    """
+    Virtual microprobe camera rendering the beam spot on the screen.
+
+    The spot follows the output currents of the simulated Genesys supplies
+    (Q1 at address 6 and Q2/3 at address 7) through a quadrupole focusing model.
+    """
+
+    def __init__(
+        self,
+        model: Optional[QuadrupoleFocusingModel] = None,
+        bus: Optional[GenesysBus] = None,
+        width: int = 1024,
+        height: int = 768,
+        frame_rate: float = 30.0,
+    ) -> None:
+        super().__init__()
+        self.model = model if model is not None else QuadrupoleFocusingModel()
+        self.bus = bus if bus is not None else get_default_bus()
+        self.addresses = (6, 7)
+        self.sensor_size = (width, height)
+        self.frame_rate = frame_rate
+        self.grabbing = False
+        self.roi: Optional[tuple[int, int, int, int]] = None
+
+    def configure(self) -> None:
+        self.width, self.height = self.sensor_size
+
+    def reset(self) -> None:
+        self.model = QuadrupoleFocusingModel(seed=self.model.seed)
+        if self.is_connected:
+            self.camera = self.model
+
+    def connect(self, idx: int = 0) -> None:
+        self.camera = self.model
+        self.is_connected = True
+        logger.info("Connected to the simulated camera")
+
+    def disconnect(self) -> None:
+        self.stop()
+        self.camera = None
+        self.is_connected = False
+
+    def get_worker(self, parent) -> SimulatedCameraWorker:
+        return SimulatedCameraWorker(self, parent)
+
+    def currents(self) -> tuple[float, float]:
+        currents = self.bus.currents()
+        return currents[self.addresses[0]], currents[self.addresses[1]]
+
+    def start(self):
+        pass
+
+    def stop(self) -> None:
+        self.grabbing = False
+
+    def set_roi(self, window: Optional[tuple[int, int, int, int]]) -> bool:
+        self.roi = window
+        logger.info(f"Camera readout window: {window if window is not None else 'full frame'}")
+        return True
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from queue import Empty, SimpleQueue
+from threading import Event, Lock, Thread
+from typing import Any, Optional
+
+from dirs import BASE_PATH
+from image_processing.analysis import ELLIPSE_FIELDS
+
+CATALOGUE_PATH: Path = BASE_PATH / "catalogue.sqlite3"
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    path TEXT,
+    started TEXT,
+    date TEXT,
+    optimizer TEXT,
+    seed INTEGER,
+    ion TEXT,
+    energy REAL,
+    lenses TEXT,
+    settings TEXT,
+    finished INTEGER DEFAULT 0,
+    message TEXT,
+    nfev INTEGER,
+    measurements INTEGER,
+    q1 REAL,
+    q2 REAL,
+    objective REAL,
+    area REAL,
+    circularity REAL
+);
+CREATE TABLE IF NOT EXISTS evaluations (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER REFERENCES runs(id),
+    request INTEGER,
+    time TEXT,
+    q1 REAL,
+    q2 REAL,
+    objective REAL,
+    frames INTEGER,
+    duration REAL,
+    {", ".join(f"{name} REAL" for name in ELLIPSE_FIELDS)}
+);
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER REFERENCES runs(id),
+    run_path TEXT,
+    number INTEGER,
+    request INTEGER,
+    kind TEXT,
+    path TEXT UNIQUE,
+    offset INTEGER,
+    dtype TEXT,
+    shape TEXT,
+    saved TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_date ON runs(date);
+CREATE INDEX IF NOT EXISTS runs_beam ON runs(ion, energy);
+CREATE INDEX IF NOT EXISTS runs_area ON runs(area);
+CREATE INDEX IF NOT EXISTS evaluations_run ON evaluations(run_id, request);
+CREATE INDEX IF NOT EXISTS evaluations_currents ON evaluations(q1, q2);
+CREATE INDEX IF NOT EXISTS evaluations_objective ON evaluations(objective);
+CREATE INDEX IF NOT EXISTS evaluations_area ON evaluations(area);
+CREATE INDEX IF NOT EXISTS images_run ON images(run_id, number);
+CREATE INDEX IF NOT EXISTS images_path ON images(run_path, number);
+"""
+
+RUN_ID = "(SELECT id FROM runs WHERE key = ?)"
+
+logger = logging.getLogger(__name__)
+
+
+class RunCatalogue:
+    """
+    SQLite catalogue of the runs, their evaluations and the saved images.
+
+    Writes are queued from any thread and executed by a single background thread,
+    which commits whenever the queue runs empty, so that the focusing loop never
+    waits for the database. Queries open their own connection; the database is in
+    WAL mode, so they do not block the writer. Runs are identified by the key of
+    their journal and checkpoint files.
+    """
+
+    def __init__(self, path: Path = CATALOGUE_PATH) -> None:
+        self.path = path
+        self.queue: SimpleQueue[Optional[tuple]] = SimpleQueue()
+        self.lock = Lock()
+        self.thread: Optional[Thread] = None
+        # Run of the minimization in progress, images saved meanwhile are attached to it
+        self.active_run: Optional[str] = None
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        return connection
+
+    def submit(self, sql: str, params: tuple = ()) -> None:
+        with self.lock:
+            if self.thread is None:
+                self.thread = Thread(target=self.run, name="Run catalogue", daemon=True)
+                self.thread.start()
+        self.queue.put((sql, params))
+
+    def run(self) -> None:
+        try:
+            connection = self.connect()
+        except sqlite3.Error as err:
+            logger.error(f"Could not open the run catalogue {self.path}: {err}")
+            return
+        with connection:
+            while (item := self.queue.get()) is not None:
+                # Write everything that is queued in a single transaction
+                while item is not None:
+                    self.execute(connection, item)
+                    try:
+                        item = self.queue.get_nowait()
+                    except Empty:
+                        break
+                connection.commit()
+                if item is None:
+                    break
+        connection.close()
+
+    def execute(self, connection: sqlite3.Connection, item: tuple) -> None:
+        sql, params = item
+        if isinstance(sql, Event):
+            connection.commit()
+            sql.set()
+            return
+        try:
+            connection.execute(sql, params)
+        except sqlite3.Error as err:
+            logger.error(f"Run catalogue write failed: {err}")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until the queued writes are committed."""
+        if self.thread is None:
+            return True
+        done = Event()
+        self.queue.put((done, ()))
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.queue.put(None)
+            thread.join(timeout)
+
+    def begin_run(self, key: str, path: Path, optimizer: str, seed: int, beam: dict, settings: dict) -> None:
+        now = datetime.now()
+        self.submit(
+            "INSERT OR IGNORE INTO runs (key, path, started, date, optimizer, seed, ion, energy, lenses, settings) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                str(path),
+                now.isoformat(timespec="seconds"),
+                now.date().isoformat(),
+                optimizer,
+                seed,
+                # Normalized like BeamParameters.key, so that find_runs can use the runs_beam index
+                beam.get("ion", "").strip().lower(),
+                beam.get("energy", 0.0),
+                beam.get("lenses", ""),
+                json.dumps(settings, default=str),
+            ),
+        )
+        self.active_run = key
+
+    def end_run(
+        self,
+        key: str,
+        finished: bool,
+        message: str,
+        nfev: int,
+        measurements: int,
+        x: list[float],
+        objective: float,
+        ellipse: Any,
+    ) -> None:
+        self.submit(
+            "UPDATE runs SET finished = ?, message = ?, nfev = ?, measurements = ?, q1 = ?, q2 = ?, "
+            "objective = ?, area = ?, circularity = ? WHERE key = ?",
+            (
+                int(finished),
+                message,
+                nfev,
+                measurements,
+                float(x[0]),
+                float(x[1]),
+                float(objective),
+                float(ellipse.area),
+                float(ellipse.circularity),
+                key,
+            ),
+        )
+        if self.active_run == key:
+            self.active_run = None
+
+    def add_evaluation(
+        self,
+        key: str,
+        request: Optional[int],
+        x: list[float],
+        objective: float,
+        frames: int,
+        ellipse: Any,
+        duration: float,
+    ) -> None:
+        self.submit(
+            f"INSERT INTO evaluations (run_id, request, time, q1, q2, objective, frames, duration, "
+            f"{', '.join(ELLIPSE_FIELDS)}) VALUES ({RUN_ID}, {', '.join('?' * (7 + len(ELLIPSE_FIELDS)))})",
+            (
+                key,
+                request,
+                datetime.now().isoformat(timespec="milliseconds"),
+                float(x[0]),
+                float(x[1]),
+                float(objective),
+                frames,
+                duration,
+                *(float(getattr(ellipse, name)) for name in ELLIPSE_FIELDS),
+            ),
+        )
+
+    def add_image(
+        self,
+        run_path: Path,
+        number: int,
+        request: Optional[int],
+        kind: str,
+        path: Path,
+        offset: int,
+        dtype: str,
+        shape: tuple[int, ...],
+    ) -> None:
+        """Register a saved .npy image; `offset` is the position of the data in the file."""
+        self.submit(
+            f"INSERT OR REPLACE INTO images (run_id, run_path, number, request, kind, path, offset, dtype, shape, saved) "
+            f"VALUES ({RUN_ID}, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.active_run,
+                str(run_path),
+                number,
+                request,
+                kind,
+                str(path),
+                offset,
+                dtype,
+                json.dumps(list(shape)),
+                datetime.now().isoformat(timespec="milliseconds"),
+            ),
+        )
+
+    def query(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        """Run a read-only query on a connection of the calling thread."""
+        connection = self.connect()
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def find_runs(
+        self,
+        ion: Optional[str] = None,
+        energy: Optional[float] = None,
+        energy_tolerance: float = 1e-6,
+        max_area: Optional[float] = None,
+        since: Optional[str] = None,
+        finished: bool = True,
+    ) -> list[sqlite3.Row]:
+        """Return the runs matching all the given criteria, the latest first."""
+        conditions, params = [], []
+        if ion is not None:
+            conditions.append("ion = ?")
+            params.append(ion.strip().lower())
+        if energy is not None:
+            conditions.append("energy BETWEEN ? AND ?")
+            params += [energy - energy_tolerance, energy + energy_tolerance]
+        if max_area is not None:
+            conditions.append("area < ?")
+            params.append(max_area)
+        if since is not None:
+            conditions.append("date >= ?")
+            params.append(since)
+        if finished:
+            conditions.append("finished = 1")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self.query(f"SELECT * FROM runs {where} ORDER BY started DESC", tuple(params))
+
+    def evaluations(self, key: str) -> list[sqlite3.Row]:
+        return self.query(f"SELECT * FROM evaluations WHERE run_id = {RUN_ID} ORDER BY id", (key,))
+
+    def images(self, key: Optional[str] = None, run_path: Optional[Path] = None) -> list[sqlite3.Row]:
+        """Return the images of a minimization run, or of all the images saved in a run directory."""
+        if key is not None:
+            return self.query(f"SELECT * FROM images WHERE run_id = {RUN_ID} ORDER BY number, kind", (key,))
+        return self.query("SELECT * FROM images WHERE run_path = ? ORDER BY number, kind", (str(run_path),))
+
+
+catalogue = RunCatalogue()
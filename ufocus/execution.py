@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from collections import deque
+from enum import Enum
+from threading import Condition
+from typing import Any, Optional
+
+from PySide6.QtCore import QRunnable, QThread, QThreadPool
+
+logger = logging.getLogger(__name__)
+
+
+class Role(Enum):
+    ACQUISITION = "acquisition"
+    PROCESSING = "processing"
+    DEVICE_IO = "device I/O"
+    OPTIMIZATION = "optimization"
+    BACKGROUND = "background"
+
+
+# Number of long-lived tasks and priority of the threads of every role. Device I/O runs
+# the power supply controller and its command thread, background runs short tasks of
+# the GUI that must not compete with the focusing loop.
+ROLE_THREADS = {
+    Role.ACQUISITION: 1,
+    Role.PROCESSING: 1,
+    Role.DEVICE_IO: 2,
+    Role.OPTIMIZATION: 1,
+    Role.BACKGROUND: 1,
+}
+ROLE_PRIORITIES = {
+    Role.ACQUISITION: QThread.Priority.TimeCriticalPriority,
+    Role.PROCESSING: QThread.Priority.HighPriority,
+    Role.DEVICE_IO: QThread.Priority.HighPriority,
+    Role.OPTIMIZATION: QThread.Priority.NormalPriority,
+    Role.BACKGROUND: QThread.Priority.LowestPriority,
+}
+
+
+class Executor:
+    """
+    Dedicated thread pools for the long-lived workers of the application.
+
+    Every role gets its own pool sized for the tasks it runs, so that a worker never
+    waits for a free thread of the global pool and the start order does not matter.
+    """
+
+    def __init__(self) -> None:
+        self.pools: dict[Role, QThreadPool] = {}
+        for role in Role:
+            pool = QThreadPool()
+            pool.setObjectName(role.value)
+            pool.setMaxThreadCount(ROLE_THREADS[role])
+            pool.setThreadPriority(ROLE_PRIORITIES[role])
+            self.pools[role] = pool
+
+    def start(self, role: Role, runnable: QRunnable) -> None:
+        pool = self.pools[role]
+        if not pool.tryStart(runnable):
+            # The previous task of the role is still shutting down, run after it
+            logger.warning(f"All {role.value} threads are busy, queueing the task")
+            pool.start(runnable)
+
+    def activeThreadCount(self) -> int:
+        return sum(pool.activeThreadCount() for pool in self.pools.values())
+
+    def shutdown(self, timeout: float = 1.0) -> bool:
+        """Wait up to `timeout` seconds for the tasks of every role, return False if any is left."""
+        deadline = time.perf_counter() + timeout
+        finished = True
+        for role, pool in self.pools.items():
+            remaining = max(0, int(1000 * (deadline - time.perf_counter())))
+            if not pool.waitForDone(remaining):
+                logger.warning(f"The {role.value} threads did not terminate properly")
+                finished = False
+        return finished
+
+
+class BoundedInbox:
+    """
+    Bounded single-consumer queue that drops the oldest item when it is full.
+
+    Used between the camera and the image processing, so that a slow consumer
+    processes the latest frames instead of building up latency.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.items: deque[Any] = deque(maxlen=capacity)
+        self.condition = Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item: Any) -> bool:
+        """Add an item, returns False if the oldest item had to be dropped."""
+        with self.condition:
+            full = len(self.items) == self.items.maxlen
+            if full:
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+            return not full
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Return the oldest item, or None when the inbox is closed or the timeout expires."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.items or self.closed, timeout)
+            if self.closed or not self.items:
+                return None
+            return self.items.popleft()
+
+    def clear(self) -> None:
+        with self.condition:
+            self.items.clear()
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
@@ -6,6 +6,8 @@ from collections import deque
 
 from serial import Serial
 
+from profiling import profiled
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,6 +35,7 @@ class Genesys:
     def read_response(self) -> str:
         return self.serial_port.read_until(b'\r').decode('utf-8').strip()
 
+    @profiled("serial: ADR switch")
     def address_device(self, adr_num):
         adr = f"ADR {adr_num}\r"
         self.serial_port.write(adr.encode('utf-8'))
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+from dataclasses import dataclass, field, fields
+from math import nan, pi, sqrt
+from typing import Optional
+
+import cv2
+from numpy import empty, ndarray, uint8
+
+from image_processing.parallel import band_pool
+
+# Qt-free analysis of accumulated images, so that it can also run in a separate process
+
+
+@dataclass
+class DetectedEllipse:
+    """Data class representing a detected ellipse with its properties."""
+
+    x_c: float = nan
+    y_c: float = nan
+    minor: float = nan
+    major: float = nan
+    angle: float = nan
+    area: float = field(init=False)
+    perimeter: float = field(init=False)
+    circularity: float = field(init=False)
+    eccentricity: float = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.area = self.calculate_area(self.major, self.minor)
+        self.perimeter = self.calculate_perimeter(self.major, self.minor)
+        self.circularity = self.calculate_circularity(self.area, self.perimeter)
+        self.eccentricity = self.calculate_eccentricity(self.major, self.minor)
+
+    def calculate_area(self, major: float, minor: float) -> float:
+        return 0.25 * pi * major * minor
+
+    def calculate_perimeter(self, major: float, minor: float) -> float:
+        return (
+            0.5
+            * pi
+            * (3 * (major + minor) - sqrt((3 * major + minor) * (major + 3 * minor)))
+        )
+
+    def calculate_circularity(self, area: float, perimeter: float) -> float:
+        return 4 * pi * area / perimeter**2
+
+    def calculate_eccentricity(self, major: float, minor: float) -> float:
+        return sqrt(1 - (minor / major) ** 2)
+
+
+# Columns of the ellipse in the journals, the catalogue and the result tables
+ELLIPSE_FIELDS = tuple(f.name for f in fields(DetectedEllipse))
+
+
+def objective(ellipse: DetectedEllipse, numerator_pow: float = 1, denominator_pow: float = 2) -> float:
+    """Objective function minimized to focus the beam, small and round spots score lowest."""
+    return ellipse.area**numerator_pow / ellipse.circularity**denominator_pow
+
+
+@dataclass
+class AnalysisResult:
+    """
+    Outcome of the analysis of an accumulated image.
+
+    The profiles are normalized to their maximum. The images are None when the
+    result was sent back from the analysis process, which writes them to shared memory.
+    """
+
+    vertical: ndarray
+    horizontal: ndarray
+    histogram: ndarray
+    threshold: float
+    ellipse: Optional[DetectedEllipse]
+    normalized: Optional[ndarray] = None
+    processed: Optional[ndarray] = None
+
+
+# Smallest contour area, in full resolution pixels, that is considered a beam spot
+MIN_CONTOUR_AREA = 100
+
+# Smallest side of the image, in pixels, at the coarsest pyramid level
+MIN_PYRAMID_SIZE = 64
+
+
+def find_contours(
+    image: ndarray,
+    threshold: int,
+    kernel: Optional[tuple[int, int]] = None,
+    offset: tuple[int, int] = (0, 0),
+) -> tuple[float, list]:
+    """Blur, threshold and return the applied threshold and the outer contours of the image."""
+    # First, optionally apply gaussian filtering
+    blur = cv2.GaussianBlur(image, kernel, 0) if kernel is not None else image
+
+    # Apply binary thresholding
+    if threshold == -1:
+        thresh_method = cv2.THRESH_BINARY + cv2.THRESH_OTSU
+    else:
+        thresh_method = cv2.THRESH_BINARY
+    applied, thresh = cv2.threshold(blur, threshold, 255, thresh_method)
+
+    # Detect the outer contours on the binary image
+    contours = cv2.findContours(
+        image=thresh, mode=cv2.RETR_EXTERNAL, method=cv2.CHAIN_APPROX_NONE, offset=offset
+    )[0]
+    return applied, contours
+
+
+def coarse_window(
+    image: ndarray,
+    threshold: int,
+    kernel: Optional[tuple[int, int]],
+    levels: int,
+) -> Optional[tuple[int, int, int, int]]:
+    """
+    Locate the spot on the image downsampled `levels` times by 2.
+
+    Returns the full resolution window (x0, y0, x1, y1) around the largest contour,
+    padded by half its size, or None if nothing was found.
+    """
+    coarse = image
+    for _ in range(levels):
+        coarse = cv2.pyrDown(coarse)
+    scale = 2**levels
+    if kernel is not None:
+        # Same blur in full resolution pixels, the kernel size has to stay odd
+        k = kernel[0] // scale | 1
+        kernel = (k, k) if k > 1 else None
+
+    _, contours = find_contours(coarse, threshold, kernel)
+    contours = [c for c in contours if cv2.contourArea(c) > MIN_CONTOUR_AREA / scale**2]
+    if not contours:
+        return None
+
+    x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+    margin = max(w, h) // 2 + 2
+    height, width = image.shape
+    window = (
+        max(0, (x - margin) * scale),
+        max(0, (y - margin) * scale),
+        min(width, (x + w + margin) * scale),
+        min(height, (y + h + margin) * scale),
+    )
+    return window
+
+
+def analyze(
+    accumulator: ndarray,
+    threshold: int,
+    kernel: Optional[tuple[int, int]] = None,
+    normalized: Optional[ndarray] = None,
+    processed: Optional[ndarray] = None,
+    pyramid: int = 0,
+) -> AnalysisResult:
+    """
+    Detect the beam spot in the sum of the accumulated images.
+
+    A `threshold` of -1 selects Otsu's method, `kernel` enables Gaussian filtering.
+    With `pyramid` levels, the spot is located on the image downsampled by 2**pyramid
+    and the contours are only detected in a full resolution window around it, so that
+    the cost scales with the spot size rather than with the sensor size.
+    The normalized image and the processed image with the detected contour are
+    written to `normalized` and `processed` if given.
+    """
+    if normalized is None:
+        normalized = empty(accumulator.shape, dtype=uint8)
+    if processed is None:
+        processed = empty(accumulator.shape, dtype=uint8)
+
+    # X and Y profiles
+    pool = band_pool()
+    vertical = cv2.normalize(pool.column_sums(accumulator), None, 1.0, 0, cv2.NORM_INF)
+    horizontal = cv2.normalize(pool.row_sums(accumulator), None, 1.0, 0, cv2.NORM_INF)
+
+    # Normalize entire image, the min-max normalization does not depend on the number of accumulated images
+    cv2.normalize(accumulator, normalized, 255.0, 0, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+    processed[...] = normalized
+
+    histogram = cv2.calcHist([normalized], [0], None, [256], [0, 256])
+
+    window = None
+    if pyramid > 0 and min(normalized.shape) >> pyramid >= MIN_PYRAMID_SIZE:
+        window = coarse_window(normalized, threshold, kernel, pyramid)
+    if window is not None:
+        x0, y0, x1, y1 = window
+        # Refine in full resolution, the window is mostly spot and background so that
+        # Otsu's method separates them well
+        applied, contours = find_contours(normalized[y0:y1, x0:x1], threshold, kernel, offset=(x0, y0))
+    else:
+        applied, contours = find_contours(normalized, threshold, kernel)
+
+    # Draw the two largest contours in ascending order, so that the largest is always last
+    ellipse = None
+    for contour in sorted(contours, key=cv2.contourArea)[-2:]:
+        if cv2.contourArea(contour) > MIN_CONTOUR_AREA:
+            fitted = cv2.fitEllipse(contour)
+            # (x_c, y_c), (width, height), angle = fitted # height: major axis, width: minor axis
+            ellipse = DetectedEllipse(*fitted[0], *fitted[1], fitted[2])
+            cv2.ellipse(processed, fitted, (255, 255, 255), 2)
+
+    return AnalysisResult(
+        vertical=vertical.reshape(vertical.shape[1]),
+        horizontal=horizontal.reshape(horizontal.shape[0]),
+        histogram=histogram.reshape(histogram.shape[0]),
+        threshold=applied,
+        ellipse=ellipse,
+        normalized=normalized,
+        processed=processed,
+    )
@@ -1,18 +1,28 @@
 # -*- coding: utf-8 -*-
 
 import logging
-from dataclasses import dataclass, field
 from datetime import date
-from math import nan, pi, sqrt
+from functools import partial
 from pathlib import Path
+from queue import Empty, SimpleQueue
+from time import perf_counter
+from typing import Optional
 
 import cv2
 from numpy import ndarray, save, zeros
-from PySide6.QtCore import QEventLoop, QObject, QRunnable, Signal, Slot
+from PySide6.QtCore import QObject, QRunnable, Signal, Slot
 
+from catalogue import catalogue
 from dirs import BASE_DATA_PATH
+from execution import BoundedInbox
+from image_processing.analysis import AnalysisResult, DetectedEllipse, analyze
 from image_processing.exceptions import ROIBoundsError
+from image_processing.offload import AnalysisProcess
+from image_processing.parallel import band_pool
+from image_processing.tracking import TrackingWindow
+from profiling import profiler
 from settings_manager import SettingsManager
+from tracing import tracer
 
 # Generate the appropriate paths for saving data
 DATA_PATH = BASE_DATA_PATH / date.today().isoformat()
@@ -20,43 +30,6 @@ DATA_PATH = BASE_DATA_PATH / date.today().isoformat()
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class DetectedEllipse:
-    """Data class representing a detected ellipse with its properties."""
-
-    x_c: float = nan
-    y_c: float = nan
-    minor: float = nan
-    major: float = nan
-    angle: float = nan
-    area: float = field(init=False)
-    perimeter: float = field(init=False)
-    circularity: float = field(init=False)
-    eccentricity: float = field(init=False)
-
-    def __post_init__(self) -> None:
-        self.area = self.calculate_area(self.major, self.minor)
-        self.perimeter = self.calculate_perimeter(self.major, self.minor)
-        self.circularity = self.calculate_circularity(self.area, self.perimeter)
-        self.eccentricity = self.calculate_eccentricity(self.major, self.minor)
-
-    def calculate_area(self, major: float, minor: float) -> float:
-        return 0.25 * pi * major * minor
-
-    def calculate_perimeter(self, major: float, minor: float) -> float:
-        return (
-            0.5
-            * pi
-            * (3 * (major + minor) - sqrt((3 * major + minor) * (major + 3 * minor)))
-        )
-
-    def calculate_circularity(self, area: float, perimeter: float) -> float:
-        return 4 * pi * area / perimeter**2
-
-    def calculate_eccentricity(self, major: float, minor: float) -> float:
-        return sqrt(1 - (minor / major) ** 2)
-
-
 class ImageProcessingSignals(QObject):
     """Signals for communicating image processing results."""
 
@@ -65,29 +38,69 @@ class ImageProcessingSignals(QObject):
     imageProcessingVert = Signal(ndarray)
     imageProcessingHor = Signal(ndarray)
     imageProcessingEllipse = Signal(DetectedEllipse)
+    evaluationDone = Signal(int, DetectedEllipse)
+    trackingWindowChanged = Signal(object)
+    burstCaptured = Signal(object, float)
+    sweepSample = Signal(float, DetectedEllipse)
+    thresholdChanged = Signal(int)
+    roiError = Signal()
 
 
 class ImageProcessing(QRunnable):
-    """Main image processing runnable that interfaces with the UI."""
+    """
+    Main image processing runnable that interfaces with the UI.
+
+    Frames are handed over by the camera thread, with the time they arrived, through a
+    bounded inbox which drops the oldest frame when the processing falls behind. Requests that change the state of
+    the pipeline are queued and applied between two frames by the processing thread.
+    """
+
+    INBOX_CAPACITY = 4
 
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
         self.parent = parent
         self.pipeline = ImageProcessingPipeline(parent)
         self.signals = self.pipeline.signals
+        self.inbox = BoundedInbox(self.INBOX_CAPACITY)
+        self.commands: SimpleQueue = SimpleQueue()
+        self.running = False
 
     @Slot()
     def run(self) -> None:
         """Run the image processing thread."""
         logger.info("Image processing started")
-        self.eventloop = QEventLoop()
-        self.eventloop.exec()
+        tracer.set_thread_name("Image processing")
+        self.running = True
+        while (item := self.inbox.get()) is not None:
+            self.executeCommands()
+            self.pipeline.frameTime, image = item
+            self.pipeline.imageProcessing(image)
+        self.running = False
+        self.pipeline.close()
+        if self.inbox.dropped:
+            logger.info(f"Dropped {self.inbox.dropped} frames while processing was busy")
         logger.info("Image processing terminated")
 
+    def stop(self) -> None:
+        """Terminate the processing thread after the current frame."""
+        self.inbox.close()
+
+    def executeCommands(self) -> None:
+        while True:
+            try:
+                command = self.commands.get_nowait()
+            except Empty:
+                return
+            command()
+
     @Slot(ndarray)
     def imageProcessing(self, image: ndarray) -> None:
-        """Process an incoming image."""
-        self.pipeline.imageProcessing(image)
+        """Queue an incoming image, called from the camera thread."""
+        with profiler.span("inbox put"):
+            queued = self.inbox.put((perf_counter(), image))
+        if not queued:
+            profiler.count("dropped frames")
 
     @Slot(int)
     def setNumberOfImagesToAccumulate(self, n: int) -> None:
@@ -101,16 +114,54 @@ class ImageProcessing(QRunnable):
             logger.info(f"Gaussian kernel set to ({k}, {k})")
             self.pipeline.kernelGaussianFiltering = (k, k)
 
+    @Slot(bool)
+    def setGaussianFiltering(self, value: bool) -> None:
+        """Enable the Gaussian filtering."""
+        self.pipeline.applyGaussianFiltering = value
+
     @Slot(int)
     def setThreshold(self, n: int) -> None:
         """Set the threshold value."""
         self.pipeline.threshold = n
 
+    @Slot(int)
+    def setPyramidLevels(self, index: int) -> None:
+        """Set the number of pyramid levels used to locate the spot."""
+        self.pipeline.pyramidLevels = self.parent.comboboxPyramid.itemData(index)
+
+    @Slot(bool)
+    def setAutoROI(self, value: bool) -> None:
+        """Enable the processing window following the beam spot."""
+        self.commands.put(partial(self.pipeline.setAutoROI, value))
+
+    @Slot(object)
+    def setCameraWindow(self, window) -> None:
+        """Set the window applied by the camera itself, None if the camera sends full frames."""
+        self.pipeline.tracking.pushed = window
+
     @Slot(bool)
     def setInAccumulation(self, value: bool) -> None:
         """Set whether to accumulate images."""
         self.pipeline.inAccumulation = value
 
+    @Slot(object)
+    def startEvaluation(self, request) -> None:
+        """Start accumulating images for an evaluation request of the minimizer."""
+        # Frames waiting in the inbox were taken before the new setpoint
+        self.inbox.clear()
+        self.commands.put(partial(self.pipeline.startEvaluation, request))
+
+    @Slot(int)
+    def captureBurst(self, frames: int) -> None:
+        """Capture the next `frames` frames without processing them, for the tuning of the detection."""
+        self.inbox.clear()
+        self.commands.put(partial(self.pipeline.startBurst, frames))
+
+    @Slot(bool)
+    def setSweeping(self, value: bool) -> None:
+        """Analyze every frame on its own and emit the detections with their time, during a current sweep."""
+        self.commands.put(partial(self.pipeline.setSweeping, value))
+
 
 class RunManager:
     """Manages run numbering for data organization."""
@@ -151,17 +202,113 @@ class ImageProcessingPipeline:
         self.numberOfRuns: int = RunManager.determine_run(DATA_PATH)
         self.image_data_path = DATA_PATH / f'run_{self.numberOfRuns:02}' / 'images'
         self.inAccumulation: bool = True
-        self.accumulator = zeros((self.parent.camera.height, self.parent.camera.width))
-        self.profile_vertical = zeros((1, self.parent.camera.width))
-        self.profile_horizontal = zeros((self.parent.camera.height, 1))
+        self.request = None
+        # Evaluation request answered by the last detection, for the catalogue of the saved images
+        self.answeredRequest = None
+        # Frames of a burst in progress and the time each of them was taken
+        self.burst: Optional[list[ndarray]] = None
+        self.burstSize: int = 0
+        self.burstTimes: list[float] = []
+        # Time the frame being processed arrived from the camera
+        self.frameTime: float = 0.0
+        # Number of images to accumulate to restore after a sweep, None if not sweeping
+        self.sweepRestore: Optional[int] = None
+        self.offload = AnalysisProcess(self.parent.camera.width, self.parent.camera.height) if self.parent.checkboxAnalysisProcess.isChecked() else None
+        self.accumulator = self.newAccumulator((self.parent.camera.height, self.parent.camera.width))
         self.numberOfImagesToAccumulate = self.parent.spinboxImagesToAccumulate.value()
         self.applyGaussianFiltering = self.parent.checkboxGaussianFiltering.isChecked()
         self.kernelGaussianFiltering = (self.parent.spinboxGaussianKernel.value(), self.parent.spinboxGaussianKernel.value())
         self.threshold = self.parent.spinboxThreshold.value()
+        self.pyramidLevels = self.parent.comboboxPyramid.currentData()
+        self.autoROI = self.parent.checkboxAutoROI.isChecked()
+        self.tracking = TrackingWindow(self.parent.camera.width, self.parent.camera.height)
         self.save_images = self.parent.checkboxSaveImages.isChecked()
         self.settings_manager = SettingsManager()
         self.settings_manager.saveUserSettings()
 
+    def setAutoROI(self, value: bool) -> None:
+        self.autoROI = value
+        self.accumulatedImages = 0
+        self.updateTrackingWindow(None)
+
+    def updateTrackingWindow(self, ellipse: Optional[DetectedEllipse]) -> None:
+        previous = self.tracking.window
+        if ellipse is None:
+            self.tracking.reset()
+        else:
+            self.tracking.update(ellipse)
+        if self.tracking.window != previous:
+            self.signals.trackingWindowChanged.emit(self.tracking.window)
+
+    def newAccumulator(self, shape: tuple[int, int]) -> ndarray:
+        if self.offload is not None:
+            return self.offload.accumulator(shape)
+        return zeros(shape)
+
+    def analyze(self) -> AnalysisResult:
+        kernel = self.kernelGaussianFiltering if self.applyGaussianFiltering else None
+        if self.offload is not None:
+            try:
+                return self.offload.analyze(self.threshold, kernel, self.pyramidLevels)
+            except Exception as e:
+                logger.error(f"Analysis process failed ({e!r}), analyzing in the processing thread")
+                self.accumulator = self.accumulator.copy()
+                self.close()
+        return analyze(self.accumulator, self.threshold, kernel, pyramid=self.pyramidLevels)
+
+    def close(self) -> None:
+        if self.offload is not None:
+            self.offload.close()
+            self.offload = None
+
+    def startEvaluation(self, request) -> None:
+        self.numberOfImagesToAccumulate = request.frames
+        self.accumulatedImages = 0
+        self.request = request
+        self.inAccumulation = True
+        profiler.mark("acquisition")
+
+    def startBurst(self, frames: int) -> None:
+        self.burst = []
+        self.burstSize = frames
+        self.burstTimes = []
+        self.accumulatedImages = 0
+        self.inAccumulation = True
+
+    def setSweeping(self, value: bool) -> None:
+        if value and self.sweepRestore is None:
+            self.sweepRestore = self.numberOfImagesToAccumulate
+            self.numberOfImagesToAccumulate = 1
+        elif not value and self.sweepRestore is not None:
+            self.numberOfImagesToAccumulate, self.sweepRestore = self.sweepRestore, None
+        self.accumulatedImages = 0
+        self.inAccumulation = True
+
+    def captureFrame(self, image: ndarray) -> None:
+        # The camera may reuse its buffers
+        self.burst.append(image.copy())
+        self.burstTimes.append(self.frameTime)
+        if len(self.burst) < self.burstSize:
+            return
+        frames, times = self.burst, self.burstTimes
+        self.burst, self.burstTimes = None, []
+        interval = (times[-1] - times[0]) / (len(times) - 1) if len(times) > 1 else 0.0
+        logger.info(f"Captured a burst of {len(frames)} frames, {1e3 * interval:.1f} ms apart")
+        self.signals.burstCaptured.emit(frames, interval)
+
+    def emitEllipse(self, ellipse: DetectedEllipse) -> None:
+        profiler.since("analysis", "image analysis")
+        profiler.mark("ellipse signal")
+        self.signals.imageProcessingEllipse.emit(ellipse)
+        if self.sweepRestore is not None:
+            self.signals.sweepSample.emit(self.frameTime, ellipse)
+        self.answeredRequest = self.request.id if self.request is not None else None
+        if self.request is not None:
+            # Answer the pending evaluation request and wait for the next one
+            request, self.request = self.request, None
+            self.inAccumulation = False
+            self.signals.evaluationDone.emit(request.id, ellipse)
+
     def imageProcessing(self, image: ndarray) -> None:
         if self.inAccumulation:
             if self.skippedImages != 0:
@@ -173,7 +320,16 @@ class ImageProcessingPipeline:
                 image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
             # Configure ROI
-            if self.parent.video_label.roi:
+            if self.autoROI:
+                image = self.tracking.crop(image)
+                if image is None:
+                    # Taken by the camera for a previous window
+                    profiler.count("stale frames")
+                    return None
+
+                if self.accumulatedImages == 0:
+                    self.accumulator = self.newAccumulator(image.shape[:2])
+            elif self.parent.video_label.roi:
                 x_i, y_i = self.parent.video_label.p_i.toTuple()
                 x_f, y_f = self.parent.video_label.p_f.toTuple()
 
@@ -181,27 +337,27 @@ class ImageProcessingPipeline:
                     x1, y1, x2, y2 = self.sanitize(x_i, y_i, x_f, y_f)
                 except ROIBoundsError:
                     logger.error("The specified ROI is too small")
-                    self.parent.improc_button.toggle()
-                    self.parent.imageProcessingROIErrorDialog()
+                    self.signals.roiError.emit()
                     return None
 
                 image = image[y1:y2, x1:x2]
 
                 if self.accumulatedImages == 0:
-                    self.accumulator = zeros((y2 - y1, x2 - x1))
-                    self.profile_vertical = zeros((1, x2 - x1))
-                    self.profile_horizontal = zeros((y2 - y1, 1))
+                    self.accumulator = self.newAccumulator((y2 - y1, x2 - x1))
             else:
                 if self.accumulatedImages == 0:
-                    self.accumulator = zeros((self.parent.camera.height, self.parent.camera.width))
-                    self.profile_vertical = zeros((1, self.parent.camera.width))
-                    self.profile_horizontal = zeros((self.parent.camera.height, 1))
+                    self.accumulator = self.newAccumulator((self.parent.camera.height, self.parent.camera.width))
+
+            if self.burst is not None:
+                self.captureFrame(image)
+                return None
 
             self.accumulatedImages += 1
             # print(f'Accumulated {self.accumulatedImages} images.', end='\r')
             
             try:
-                cv2.accumulate(image, self.accumulator)
+                with profiler.span("accumulate frame"):
+                    band_pool().accumulate(image, self.accumulator)
             except cv2.error:
                 logger.warning("ROI was changed while image processing was running")
 
@@ -214,77 +370,54 @@ class ImageProcessingPipeline:
                 return 
             else:
                 logger.info(f"Accumulated {self.accumulatedImages} images")
-
-                # X profile
-                self.profile_vertical = cv2.reduce(self.accumulator, 0, cv2.REDUCE_SUM, None, dtype=cv2.CV_64F)
-                vert = cv2.normalize(self.profile_vertical, None, 1.0, 0, cv2.NORM_INF)
-                self.signals.imageProcessingVert.emit(vert.reshape(vert.shape[1]))
-
-                # Y profile
-                self.profile_horizontal = cv2.reduce(self.accumulator, 1, cv2.REDUCE_SUM, None, dtype=cv2.CV_64F)
-                hor = cv2.normalize(self.profile_horizontal, None, 1.0, 0, cv2.NORM_INF)
-                self.signals.imageProcessingHor.emit(hor.reshape(hor.shape[0]))
-
-                # Normalize entire image
-                im = cv2.normalize(self.accumulator / self.accumulatedImages, None, 255.0, 0, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
-                im_copy = im.copy() # create a shallow copy that will be used in the following
-
-                hist = cv2.calcHist([im], [0], None, [256], [0, 256])
-                self.signals.imageProcessingHist.emit(hist.reshape(hist.shape[0]))
-
-                # First, optionally apply gaussian filtering
-                if self.applyGaussianFiltering:
-                    blur = cv2.GaussianBlur(im_copy, self.kernelGaussianFiltering, 0)
-                else:
-                    blur = None
-
-                # Apply binary thresholding
-                if self.threshold == -1:
-                    thresh_method = cv2.THRESH_BINARY + cv2.THRESH_OTSU
-                else:
-                    thresh_method = cv2.THRESH_BINARY
-
-                ret, thresh = cv2.threshold(blur if blur is not None else im_copy, self.threshold, 255, thresh_method)
-                logger.info(f"Applied threshold: {ret}")
-
-                # Detect the contours on the binary image
-                contours = cv2.findContours(
-                    image=thresh,
-                    # mode=cv2.RETR_TREE,
-                    mode=cv2.RETR_EXTERNAL, # Retrieve only the outer contours
-                    method=cv2.CHAIN_APPROX_NONE,
-                    # method=cv2.CHAIN_APPROX_SIMPLE, # Retrieves only the endpoints of contours
-                )[0]
-
-                # draw contours on the original image
-                # use only the two largest contours in ascending order
-                # so that the largest is always last 
-                for contour in sorted(contours, key=cv2.contourArea)[-2:]:
-                    area = cv2.contourArea(contour)
-                    if area > 100:
-                        ellipse = cv2.fitEllipse(contour)
-                        # (x_c, y_c), (width, height), angle = ellipse # height: major axis, width: minor axis
-                        detected_ellipse = DetectedEllipse(*ellipse[0], *ellipse[1], ellipse[2])
-                        cv2.ellipse(im_copy, ellipse, (255, 255, 255), 2)
-                        logger.info(detected_ellipse)
+                profiler.since("acquisition", "settle + acquisition")
+                profiler.mark("analysis")
+
+                result = self.analyze()
+                logger.info(f"Applied threshold: {result.threshold}")
+                im, im_copy = result.normalized, result.processed
+                if self.offload is not None:
+                    # The shared images are overwritten by the next analysis
+                    im, im_copy = im.copy(), im_copy.copy()
+
+                self.signals.imageProcessingVert.emit(result.vertical)
+                self.signals.imageProcessingHor.emit(result.horizontal)
+                self.signals.imageProcessingHist.emit(result.histogram)
+                if (detected_ellipse := result.ellipse) is not None:
+                    if self.autoROI:
+                        detected_ellipse = self.tracking.to_sensor(detected_ellipse)
+                        self.updateTrackingWindow(detected_ellipse)
+                    logger.info(detected_ellipse)
 
                 self.signals.imageProcessingDone.emit(im_copy)
-                try:
-                    self.signals.imageProcessingEllipse.emit(detected_ellipse)
-                except UnboundLocalError:
+                if detected_ellipse is None and self.sweepRestore is not None:
+                    # A frame without spot is a point of the sweep, not a reason to lower the threshold
+                    self.signals.sweepSample.emit(self.frameTime, DetectedEllipse())
+                    self.accumulatedImages = 0
+                    if self.autoROI and self.tracking.window is not None:
+                        self.updateTrackingWindow(None)
+                    return
+                if detected_ellipse is None and self.autoROI and self.tracking.window is not None:
+                    # The spot left the window, measure again on the full frame
+                    self.accumulatedImages = 0
+                    self.updateTrackingWindow(None)
+                    return
+                if detected_ellipse is None:
                     logger.warning("No ellipse detected...")
                     # Reset the counter
                     self.accumulatedImages = 0
                     # Retry with a decreased threshold value
                     if self.threshold > -1:
                         logger.info("Retrying with decreased threshold value")
-                        self.parent.spinboxThreshold.setValue(self.threshold - 1)
+                        self.threshold -= 1
+                        self.signals.thresholdChanged.emit(self.threshold)
                     else:
                         logger.critical("Could not detect any ellipses")
-                        self.signals.imageProcessingEllipse.emit(DetectedEllipse())
+                        self.emitEllipse(DetectedEllipse())
                         if self.parent.minimizationButton.isChecked():
                             self.parent.minimizerWorker.control = True
                     return
+                self.emitEllipse(detected_ellipse)
 
                 if self.save_images:
                     # Create the directory if it does not exist
@@ -295,9 +428,20 @@ class ImageProcessingPipeline:
                     filename_proc = f"Image_processed_{date.today()}_{self.numberOfImage:03}.npy"
 
                     # Save images
-                    for filename, data in zip((filename_norm, filename_proc), (im, im_copy)):
-                        save(self.image_data_path / filename, data)
-                        logger.info(f"Saved image: {self.image_data_path / filename}")
+                    for kind, filename, data in zip(("normalized", "processed"), (filename_norm, filename_proc), (im, im_copy)):
+                        path = self.image_data_path / filename
+                        save(path, data)
+                        logger.info(f"Saved image: {path}")
+                        catalogue.add_image(
+                            self.image_data_path.parent,
+                            self.numberOfImage,
+                            self.answeredRequest,
+                            kind,
+                            path,
+                            path.stat().st_size - data.nbytes,
+                            data.dtype.str,
+                            data.shape,
+                        )
 
                 logger.info(f"Finished processing of {self.accumulatedImages} images")
 
@@ -306,6 +450,7 @@ class ImageProcessingPipeline:
                 self.numberOfImage += 1
         else:
             self.skippedImages += 1
+            profiler.count("discarded frames")
             # print(f'Skipped {self.skippedImages} images.', end='\r')
 
     def sanitize(self, xi, yi, xf, yf):
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
+
+from numpy import dtype, float64, ndarray, uint8
+
+from image_processing.analysis import AnalysisResult, analyze
+from image_processing.parallel import default_budget, set_thread_budget
+
+logger = logging.getLogger(__name__)
+
+
+def frame_views(buffer, shape: tuple[int, int]) -> tuple[ndarray, ndarray, ndarray]:
+    """Accumulator, normalized and processed images laid out one after the other in `buffer`."""
+    size = shape[0] * shape[1]
+    accumulator = ndarray(shape, dtype=float64, buffer=buffer)
+    offset = size * dtype(float64).itemsize
+    normalized = ndarray(shape, dtype=uint8, buffer=buffer, offset=offset)
+    processed = ndarray(shape, dtype=uint8, buffer=buffer, offset=offset + size)
+    return accumulator, normalized, processed
+
+
+def serve(requests, results) -> None:
+    """Entry point of the analysis process, answers requests until it receives None."""
+    memory: dict[str, SharedMemory] = {}
+    set_thread_budget(default_budget())
+    try:
+        while (request := requests.get()) is not None:
+            name, shape, threshold, kernel, pyramid = request
+            try:
+                if name not in memory:
+                    memory[name] = SharedMemory(name=name)
+                accumulator, normalized, processed = frame_views(memory[name].buf, shape)
+                result = analyze(accumulator, threshold, kernel, normalized, processed, pyramid)
+                # The images stay in shared memory, only the compact record is sent back
+                result.normalized = result.processed = None
+                del accumulator, normalized, processed
+            except Exception as e:
+                result = e
+            results.put(result)
+    finally:
+        for shm in memory.values():
+            shm.close()
+
+
+class AnalysisProcess:
+    """
+    Image analysis in a separate process.
+
+    The accumulator and the output images live in a shared memory block sized for the
+    full sensor, so that frames are accumulated in place and never pickled. Only the
+    analysis parameters and the compact `AnalysisResult` cross the process boundary,
+    and the processing thread releases the GIL while it waits for the result.
+    """
+
+    def __init__(self, width: int, height: int, timeout: float = 10.0) -> None:
+        self.timeout = timeout
+        self.memory = SharedMemory(create=True, size=width * height * (dtype(float64).itemsize + 2))
+        context = mp.get_context("spawn")
+        self.requests = context.Queue()
+        self.results = context.Queue()
+        self.process = context.Process(
+            target=serve, args=(self.requests, self.results), name="uFocus analysis", daemon=True
+        )
+        self.process.start()
+        logger.info(f"Analysis process started (pid {self.process.pid})")
+        self.shape: Optional[tuple[int, int]] = None
+        self.views: tuple[ndarray, ...] = ()
+
+    def accumulator(self, shape: tuple[int, int]) -> ndarray:
+        """Return the zeroed accumulator in shared memory for images of the given shape."""
+        if shape != self.shape:
+            self.shape = shape
+            self.views = frame_views(self.memory.buf, shape)
+        self.views[0].fill(0.0)
+        return self.views[0]
+
+    def analyze(
+        self,
+        threshold: int,
+        kernel: Optional[tuple[int, int]] = None,
+        pyramid: int = 0,
+    ) -> AnalysisResult:
+        """Analyze the accumulator, raises queue.Empty if the process does not answer in time."""
+        self.requests.put((self.memory.name, self.shape, threshold, kernel, pyramid))
+        result = self.results.get(timeout=self.timeout)
+        if isinstance(result, Exception):
+            raise result
+        result.normalized, result.processed = self.views[1], self.views[2]
+        return result
+
+    def close(self) -> None:
+        self.requests.put(None)
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.views = ()
+        try:
+            self.memory.close()
+        except BufferError:
+            # Views handed out by `accumulator` are still alive, the block is freed with them
+            pass
+        self.memory.unlink()
+        logger.info("Analysis process terminated")
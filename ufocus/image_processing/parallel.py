@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import cv2
+from numpy import linspace, ndarray, vstack
+
+logger = logging.getLogger(__name__)
+
+
+def default_budget() -> int:
+    """Cores left for the image processing after reserving one for the acquisition and one for the GUI."""
+    return max(1, (os.cpu_count() or 1) - 2)
+
+
+class BandPool:
+    """
+    Row-band parallel kernels for large frames.
+
+    The frame is split into horizontal bands processed by a thread pool; OpenCV and
+    NumPy release the GIL inside the kernels, so the bands run on separate cores.
+    Frames smaller than `min_band_pixels` per thread are processed in the calling thread.
+    """
+
+    def __init__(self, threads: int, min_band_pixels: int = 256 * 1024) -> None:
+        self.threads = max(1, threads)
+        self.min_band_pixels = min_band_pixels
+        self.executor = (
+            ThreadPoolExecutor(self.threads, thread_name_prefix="Image band") if self.threads > 1 else None
+        )
+
+    def bands(self, shape: tuple[int, ...]) -> list[slice]:
+        rows, cols = shape[:2]
+        n = min(self.threads, rows, max(1, rows * cols // self.min_band_pixels))
+        edges = linspace(0, rows, n + 1).astype(int).tolist()
+        return [slice(start, stop) for start, stop in zip(edges[:-1], edges[1:])]
+
+    def map(self, func: Callable[[slice], object], shape: tuple[int, ...]) -> list:
+        bands = self.bands(shape)
+        if self.executor is None or len(bands) == 1:
+            return [func(band) for band in bands]
+        return list(self.executor.map(func, bands))
+
+    def accumulate(self, image: ndarray, accumulator: ndarray) -> None:
+        """`cv2.accumulate` in place, band by band."""
+        self.map(lambda band: cv2.accumulate(image[band], accumulator[band]), accumulator.shape)
+
+    def column_sums(self, image: ndarray) -> ndarray:
+        """Sum over the rows, as `cv2.reduce(image, 0, cv2.REDUCE_SUM)`."""
+        partial = self.map(
+            lambda band: cv2.reduce(image[band], 0, cv2.REDUCE_SUM, None, dtype=cv2.CV_64F), image.shape
+        )
+        return sum(partial[1:], partial[0])
+
+    def row_sums(self, image: ndarray) -> ndarray:
+        """Sum over the columns, as `cv2.reduce(image, 1, cv2.REDUCE_SUM)`."""
+        partial = self.map(
+            lambda band: cv2.reduce(image[band], 1, cv2.REDUCE_SUM, None, dtype=cv2.CV_64F), image.shape
+        )
+        return vstack(partial)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+
+_pool: Optional[BandPool] = None
+
+
+def set_thread_budget(threads: int) -> BandPool:
+    """Limit the band pool and OpenCV's own parallel kernels (e.g. GaussianBlur) to `threads`."""
+    global _pool
+    cv2.setNumThreads(threads)
+    if _pool is not None:
+        _pool.close()
+    _pool = BandPool(threads)
+    logger.info(f"Image processing thread budget: {threads}")
+    return _pool
+
+
+def band_pool() -> BandPool:
+    return _pool if _pool is not None else set_thread_budget(default_budget())
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m image_processing.parallel [width height]
+    import sys
+    import time
+
+    from numpy import allclose, zeros
+    from numpy.random import default_rng
+
+    width, height = (int(v) for v in sys.argv[1:3]) if len(sys.argv) > 2 else (1920, 1200)
+    frames = default_rng(0).integers(0, 256, (8, height, width), dtype="uint8")
+    reference = zeros((height, width))
+    for frame in frames:
+        cv2.accumulate(frame, reference)
+
+    print(f"Frame {width} x {height}, {os.cpu_count()} cores")
+    print(f"{'Threads':>7} {'Accumulate [ms]':>16} {'Reduce [ms]':>12} {'Speedup':>8}")
+    baseline = None
+    for threads in range(1, (os.cpu_count() or 1) + 1):
+        pool = set_thread_budget(threads)
+        accumulator = zeros((height, width))
+        start = time.perf_counter()
+        for _ in range(5):
+            accumulator.fill(0.0)
+            for frame in frames:
+                pool.accumulate(frame, accumulator)
+        t_accumulate = (time.perf_counter() - start) / (5 * len(frames))
+        assert allclose(accumulator, reference)
+
+        start = time.perf_counter()
+        for _ in range(20):
+            pool.column_sums(accumulator)
+            pool.row_sums(accumulator)
+        t_reduce = (time.perf_counter() - start) / 20
+        assert allclose(pool.column_sums(accumulator), cv2.reduce(accumulator, 0, cv2.REDUCE_SUM, None, dtype=cv2.CV_64F))
+
+        total = t_accumulate * len(frames) + t_reduce
+        baseline = baseline or total
+        print(f"{threads:>7} {1e3 * t_accumulate:>16.2f} {1e3 * t_reduce:>12.2f} {baseline / total:>7.2f}x")
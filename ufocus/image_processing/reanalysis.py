@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import logging
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import product
+from math import isnan, nan
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from dirs import BASE_DATA_PATH
+from image_processing.analysis import (
+    ELLIPSE_FIELDS,
+    DetectedEllipse,
+    analyze,
+    objective,
+)
+from image_processing.parallel import set_thread_budget
+from image_processing.saved_images import ImageLocation, RunImages, map_image
+
+# Batch re-analysis of the images saved during runs:
+#   python -m image_processing.reanalysis [RUN ...] [--all] --thresholds -1 100 --kernels 0 5 --pyramid 0 2
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DetectionParameters:
+    """One point of the grid of detection parameters, `kernel` 0 disables Gaussian filtering."""
+
+    threshold: int = -1
+    kernel: int = 0
+    pyramid: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"t{self.threshold}_k{self.kernel}_p{self.pyramid}"
+
+    def detect(self, image: np.ndarray) -> Optional[DetectedEllipse]:
+        kernel = (self.kernel, self.kernel) if self.kernel else None
+        return analyze(image, self.threshold, kernel, pyramid=self.pyramid).ellipse
+
+
+def parameter_grid(
+    thresholds: Iterable[int], kernels: Iterable[int], pyramids: Iterable[int]
+) -> list[DetectionParameters]:
+    return [DetectionParameters(*values) for values in product(thresholds, kernels, pyramids)]
+
+
+# Grid of the worker process, sent once by the pool initializer rather than with every image
+_grid: list[DetectionParameters] = []
+
+
+def init_worker(grid: list[DetectionParameters]) -> None:
+    global _grid
+    _grid = grid
+    # The pool already uses every core, one thread per worker avoids oversubscription
+    set_thread_budget(1)
+
+
+def detect_all(location: ImageLocation) -> Optional[list[Optional[DetectedEllipse]]]:
+    """Detect the spot on a saved image with every parameter set of the grid."""
+    image = map_image(location)
+    if image is None:
+        return None
+    # Read the single frame from the mapped file, the memory of the worker never holds a whole run
+    frame = np.array(image)
+    del image
+    return [parameters.detect(frame) for parameters in _grid]
+
+
+def find_runs(root: Path = BASE_DATA_PATH) -> list[Path]:
+    return sorted(path for path in root.glob("*/run_*") if (path / "images").is_dir())
+
+
+class ResultTables:
+    """One CSV table per parameter set with a row per image, and a summary of the best image of every run."""
+
+    def __init__(self, output: Path, grid: list[DetectionParameters], powers: list[tuple[float, float]]) -> None:
+        self.grid = grid
+        self.powers = powers
+        output.mkdir(parents=True, exist_ok=True)
+        self.output = output
+        self.files = [(output / f"{parameters.name}.csv").open(mode="w", newline="") for parameters in grid]
+        self.writers = [csv.writer(file) for file in self.files]
+        header = ["run", "number", "q1", "q2", "recorded", *ELLIPSE_FIELDS, *(f"f_{n:g}_{d:g}" for n, d in powers)]
+        for writer in self.writers:
+            writer.writerow(header)
+        # (run, parameters index, powers index) -> [images, detected, best value, best number, q1, q2]
+        self.summary: dict[tuple[str, int, int], list] = {}
+
+    def add(
+        self,
+        run: str,
+        number: int,
+        setpoint: tuple[float, float, float],
+        ellipses: list[Optional[DetectedEllipse]],
+    ) -> None:
+        for i, (writer, ellipse) in enumerate(zip(self.writers, ellipses)):
+            detected = ellipse if ellipse is not None else DetectedEllipse()
+            values = [objective(detected, n, d) for n, d in self.powers]
+            writer.writerow(
+                [run, number, *setpoint, *(getattr(detected, name) for name in ELLIPSE_FIELDS), *values]
+            )
+            for j, value in enumerate(values):
+                entry = self.summary.setdefault((run, i, j), [0, 0, nan, -1, nan, nan])
+                entry[0] += 1
+                if ellipse is None:
+                    continue
+                entry[1] += 1
+                if isnan(entry[2]) or value < entry[2]:
+                    entry[2:] = [value, number, *setpoint[:2]]
+
+    def close(self) -> Path:
+        for file in self.files:
+            file.close()
+        path = self.output / "summary.csv"
+        with path.open(mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["run", "parameters", "powers", "images", "detected", "best", "number", "q1", "q2"])
+            for (run, i, j), entry in sorted(self.summary.items()):
+                n, d = self.powers[j]
+                writer.writerow([run, self.grid[i].name, f"{n:g},{d:g}", *entry])
+        return path
+
+
+def reanalyze(
+    runs: list[Path],
+    grid: list[DetectionParameters],
+    powers: list[tuple[float, float]],
+    output: Path,
+    kind: str = "normalized",
+    workers: Optional[int] = None,
+) -> Path:
+    """
+    Detect the spot on every saved image of `runs` with every parameter set of `grid`.
+
+    The images are spread over a pool of processes, each of which maps one file at a
+    time, and the results are written in order as they arrive. Returns the summary table.
+    """
+    tasks: list[tuple[str, int, tuple[float, float, float], ImageLocation]] = []
+    for run_path in runs:
+        images = RunImages(run_path)
+        run = f"{run_path.parent.name}/{run_path.name}"
+        for index, number in enumerate(images.numbers):
+            if (location := images.location(index, kind)) is not None:
+                tasks.append((run, number, images.setpoint(index), location))
+    logger.info(f"Re-analyzing {len(tasks)} images of {len(runs)} runs with {len(grid)} parameter sets")
+
+    workers = workers or os.cpu_count() or 1
+    tables = ResultTables(output, grid, powers)
+    with ProcessPoolExecutor(
+        workers, mp_context=mp.get_context("spawn"), initializer=init_worker, initargs=(grid,)
+    ) as pool:
+        locations = [task[3] for task in tasks]
+        chunksize = max(1, len(tasks) // (8 * workers))
+        for (run, number, setpoint, _), ellipses in zip(tasks, pool.map(detect_all, locations, chunksize=chunksize)):
+            if ellipses is not None:
+                tables.add(run, number, setpoint, ellipses)
+    return tables.close()
+
+
+def parse_powers(value: str) -> tuple[float, float]:
+    numerator, denominator = value.split(",")
+    return float(numerator), float(denominator)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Re-analyze the saved images of runs over a grid of parameters.")
+    parser.add_argument("runs", nargs="*", type=Path, help="run directories, e.g. data/2024-05-01/run_03")
+    parser.add_argument("--all", action="store_true", help="every run in the data directory")
+    parser.add_argument("--thresholds", nargs="+", type=int, default=[-1], help="-1 selects Otsu's method")
+    parser.add_argument("--kernels", nargs="+", type=int, default=[0], help="Gaussian kernel sizes, 0 for none")
+    parser.add_argument("--pyramid", nargs="+", type=int, default=[0], help="pyramid levels")
+    parser.add_argument("--powers", nargs="+", type=parse_powers, default=[(1, 2)], help="objective powers n,d")
+    parser.add_argument("--kind", choices=RunImages.KINDS, default="normalized")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    runs = find_runs() if args.all else args.runs
+    if not runs:
+        parser.error("no run given")
+    output = args.output or BASE_DATA_PATH / "reanalysis" / datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+    start = time.perf_counter()
+    summary = reanalyze(
+        runs, parameter_grid(args.thresholds, args.kernels, args.pyramid), args.powers, output, args.kind, args.workers
+    )
+    print(f"Done in {time.perf_counter() - start:.1f} s, summary in {summary}")
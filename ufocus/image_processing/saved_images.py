@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+from math import nan
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from catalogue import catalogue
+
+logger = logging.getLogger(__name__)
+
+IMAGES = """
+SELECT i.number, i.kind, i.path, i.offset, i.dtype, i.shape, e.q1, e.q2, e.objective
+FROM images i LEFT JOIN evaluations e ON e.run_id = i.run_id AND e.request = i.request
+WHERE i.run_path = ?
+ORDER BY i.number
+"""
+
+# (path, data offset, dtype, shape), the last three are None if the .npy header has to be read
+ImageLocation = tuple[Path, Optional[int], Optional[str], Optional[tuple[int, ...]]]
+
+
+def map_image(location: ImageLocation) -> Optional[np.ndarray]:
+    """Memory-map a saved image, nothing is read until the data is accessed."""
+    path, offset, dtype, shape = location
+    try:
+        if offset is None:
+            return np.load(path, mmap_mode="r")
+        return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+    except (OSError, ValueError) as err:
+        logger.warning(f"Could not map {path}: {err}")
+        return None
+
+
+class RunImages:
+    """
+    Images saved in a run directory, memory-mapped one frame at a time.
+
+    The files are looked up in the catalogue, which also stores where the data starts
+    in every file and the setpoint of the evaluation of every image, and found by name
+    for the runs saved before the catalogue existed.
+    """
+
+    KINDS = ("normalized", "processed")
+
+    def __init__(self, run_path: Path) -> None:
+        self.run_path = run_path
+        self.frames: dict[int, dict[str, ImageLocation]] = {}
+        # Currents and objective of the evaluation of every image, if it was taken for one
+        self.setpoints: dict[int, tuple[float, float, float]] = {}
+        for row in catalogue.query(IMAGES, (str(run_path),)):
+            self.frames.setdefault(row["number"], {})[row["kind"]] = (
+                Path(row["path"]),
+                row["offset"],
+                row["dtype"],
+                tuple(json.loads(row["shape"])),
+            )
+            if row["q1"] is not None:
+                self.setpoints[row["number"]] = (row["q1"], row["q2"], row["objective"])
+        if not self.frames:
+            for kind in self.KINDS:
+                for path in (run_path / "images").glob(f"Image_{kind}_*.npy"):
+                    number = int(path.stem.rsplit("_", 1)[-1])
+                    self.frames.setdefault(number, {})[kind] = (path, None, None, None)
+        self.numbers = sorted(self.frames)
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def location(self, index: int, kind: str) -> Optional[ImageLocation]:
+        return self.frames[self.numbers[index]].get(kind)
+
+    def setpoint(self, index: int) -> tuple[float, float, float]:
+        return self.setpoints.get(self.numbers[index], (nan, nan, nan))
+
+    def load(self, index: int, kind: str) -> Optional[np.ndarray]:
+        location = self.location(index, kind)
+        return map_image(location) if location is not None else None
+
+    def evaluation_rows(self, key: str) -> dict[int, int]:
+        """
+        Map the numbers of the images taken for the evaluations of the minimization `key`
+        to the rows of these evaluations, which are the x index of the plots of its journal.
+        """
+        rows = {row["request"]: index for index, row in enumerate(catalogue.evaluations(key))}
+        mapping: dict[int, int] = {}
+        for row in catalogue.images(key=key):
+            if row["request"] is not None and (index := rows.get(row["request"])) is not None:
+                mapping.setdefault(row["number"], index)
+        return mapping
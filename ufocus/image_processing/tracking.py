@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from dataclasses import replace
+from math import cos, isfinite, radians, sin, sqrt
+from typing import Optional
+
+from numpy import ndarray
+
+from image_processing.analysis import DetectedEllipse
+
+logger = logging.getLogger(__name__)
+
+# Processing window (x1, y1, x2, y2) in sensor coordinates, the end is exclusive
+Window = tuple[int, int, int, int]
+
+
+class TrackingWindow:
+    """
+    Processing window following the beam spot.
+
+    After every detection the window is set to the bounding box of the ellipse, grown
+    by `margin` times its size on every side and clamped to the sensor. Without a
+    spot, the window falls back to the full frame. When the camera applies the window
+    itself (`pushed`), the frames already have the size of the window.
+    """
+
+    def __init__(self, width: int, height: int, margin: float = 0.5, min_size: int = 64) -> None:
+        self.width = width
+        self.height = height
+        self.margin = margin
+        self.min_size = min_size
+        self.window: Optional[Window] = None
+        self.pushed: Optional[Window] = None
+
+    @property
+    def offset(self) -> tuple[int, int]:
+        return (self.window[0], self.window[1]) if self.window is not None else (0, 0)
+
+    def reset(self) -> None:
+        if self.window is not None:
+            logger.info("Beam spot lost, processing the full frame")
+        self.window = None
+
+    def update(self, ellipse: DetectedEllipse) -> Optional[Window]:
+        """Center the window on the ellipse given in sensor coordinates."""
+        if not all(isfinite(v) for v in (ellipse.x_c, ellipse.y_c, ellipse.minor, ellipse.major, ellipse.angle)):
+            self.reset()
+            return self.window
+
+        # Half extents of the bounding box of the rotated ellipse (`minor` along the angle)
+        a, b = ellipse.minor / 2, ellipse.major / 2
+        c, s = cos(radians(ellipse.angle)), sin(radians(ellipse.angle))
+        half_x = max(sqrt((a * c) ** 2 + (b * s) ** 2) * (1 + 2 * self.margin), self.min_size / 2)
+        half_y = max(sqrt((a * s) ** 2 + (b * c) ** 2) * (1 + 2 * self.margin), self.min_size / 2)
+
+        window = (
+            max(0, int(ellipse.x_c - half_x)),
+            max(0, int(ellipse.y_c - half_y)),
+            min(self.width, int(ellipse.x_c + half_x) + 1),
+            min(self.height, int(ellipse.y_c + half_y) + 1),
+        )
+        if window != self.window:
+            logger.debug(f"Tracking window: {window}")
+        self.window = window
+        return self.window
+
+    def crop(self, image: ndarray) -> Optional[ndarray]:
+        """Return the part of the frame in the window, or None for a frame of a previous window."""
+        if self.window is None:
+            return image if image.shape[:2] == (self.height, self.width) else None
+        x1, y1, x2, y2 = self.window
+        if image.shape[:2] == (self.height, self.width):
+            return image[y1:y2, x1:x2]
+        if self.pushed == self.window and image.shape[:2] == (y2 - y1, x2 - x1):
+            return image
+        return None
+
+    def to_sensor(self, ellipse: DetectedEllipse) -> DetectedEllipse:
+        """Translate an ellipse detected in the window to sensor coordinates."""
+        x, y = self.offset
+        return replace(ellipse, x_c=ellipse.x_c + x, y_c=ellipse.y_c + y)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from math import isnan, nan
+from typing import Iterable, Optional
+
+import cv2
+import numpy as np
+
+from image_processing.analysis import objective
+from image_processing.parallel import default_budget
+from image_processing.reanalysis import DetectionParameters, parameter_grid
+
+logger = logging.getLogger(__name__)
+
+# Default grid of the tuning, the thresholds default to Otsu's method and the current one
+KERNELS = (0, 3, 5, 9)
+PYRAMID_LEVELS = (0, 1, 2)
+
+# Fewest accumulated images per candidate needed to estimate the spread of the objective
+MIN_SAMPLES = 3
+
+
+@dataclass(frozen=True)
+class TuningCandidate:
+    parameters: DetectionParameters
+    frames: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.parameters.name}_n{self.frames}"
+
+
+@dataclass
+class TuningResult:
+    """Spread of the objective of a candidate over the disjoint accumulations of a burst."""
+
+    candidate: TuningCandidate
+    samples: int
+    detected: int
+    mean: float
+    std: float
+    # Wall time of one analysis and estimated time of one evaluation, acquisition included
+    compute: float
+    cost: float
+
+    @property
+    def relative_std(self) -> float:
+        return self.std / abs(self.mean) if self.detected and self.mean else nan
+
+    @property
+    def reliable(self) -> bool:
+        return self.samples >= MIN_SAMPLES and self.detected == self.samples
+
+
+def accumulations(frames: list[np.ndarray], count: int) -> list[np.ndarray]:
+    """Sums of the consecutive, disjoint groups of `count` frames of the burst."""
+    sums = []
+    for start in range(0, len(frames) - count + 1, count):
+        accumulator = np.zeros(frames[start].shape, dtype=np.float64)
+        for frame in frames[start : start + count]:
+            cv2.accumulate(frame, accumulator)
+        sums.append(accumulator)
+    return sums
+
+
+def evaluate(
+    candidate: TuningCandidate,
+    sums: list[np.ndarray],
+    powers: tuple[float, float],
+    frame_interval: float,
+) -> TuningResult:
+    values = []
+    start = time.perf_counter()
+    for accumulator in sums:
+        ellipse = candidate.parameters.detect(accumulator)
+        if ellipse is not None:
+            values.append(objective(ellipse, *powers))
+    compute = (time.perf_counter() - start) / max(len(sums), 1)
+    mean = float(np.mean(values)) if values else nan
+    std = float(np.std(values, ddof=1)) if len(values) > 1 else nan
+    return TuningResult(
+        candidate, len(sums), len(values), mean, std, compute, candidate.frames * frame_interval + compute
+    )
+
+
+def tune(
+    frames: list[np.ndarray],
+    frame_interval: float,
+    thresholds: Iterable[int] = (-1,),
+    kernels: Iterable[int] = KERNELS,
+    pyramids: Iterable[int] = PYRAMID_LEVELS,
+    counts: Optional[Iterable[int]] = None,
+    powers: tuple[float, float] = (1, 2),
+    workers: Optional[int] = None,
+) -> list[TuningResult]:
+    """
+    Evaluate every combination of detection parameters and accumulation count on a burst
+    of frames taken at a fixed setpoint.
+
+    Every candidate analyzes the disjoint accumulations of its number of frames, so that
+    the spread of its objective is the noise the minimizer would see. The accumulations
+    are computed once per count and shared by the candidates, which run on a thread pool;
+    OpenCV releases the GIL, so they use every core.
+    """
+    if counts is None:
+        counts = [2**i for i in range(8) if 2**i * MIN_SAMPLES <= len(frames)]
+    counts = list(counts)
+    sums = {count: accumulations(frames, count) for count in counts}
+    candidates = [
+        TuningCandidate(parameters, count)
+        for parameters in parameter_grid(thresholds, kernels, pyramids)
+        for count in counts
+    ]
+    logger.info(f"Tuning {len(candidates)} candidates on a burst of {len(frames)} frames")
+
+    with ThreadPoolExecutor(workers or default_budget(), thread_name_prefix="Tuning") as pool:
+        return list(
+            pool.map(lambda candidate: evaluate(candidate, sums[candidate.frames], powers, frame_interval), candidates)
+        )
+
+
+def best(results: list[TuningResult], tolerance: float) -> Optional[TuningResult]:
+    """
+    The cheapest candidate whose relative spread of the objective is within `tolerance`,
+    or the most stable one if none is.
+    """
+    reliable = [r for r in results if r.reliable and not isnan(r.relative_std)]
+    if not reliable:
+        return None
+    stable = [r for r in reliable if r.relative_std <= tolerance]
+    if stable:
+        return min(stable, key=lambda r: (r.cost, r.relative_std))
+    return min(reliable, key=lambda r: (r.relative_std, r.cost))
+
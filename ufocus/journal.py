@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import logging
+import time
+from dataclasses import fields
+from pathlib import Path
+from queue import SimpleQueue
+from threading import Thread
+from typing import Optional
+
+import numpy as np
+
+from image_processing.analysis import ELLIPSE_FIELDS, DetectedEllipse
+from run_data import RunData
+
+logger = logging.getLogger(__name__)
+
+# Spans of the profiler stored with every evaluation
+TIMINGS = ("evaluation", "set currents", "wait for image processing")
+HEADER = (
+    "count",
+    "time",
+    *ELLIPSE_FIELDS,
+    "current1",
+    "current2",
+    "cost_func",
+    "frames",
+    *(f"t_{name.replace(' ', '_')}" for name in TIMINGS),
+)
+
+
+class RunJournal:
+    """
+    Append-only CSV journal of the evaluations of a run.
+
+    Every evaluation is written as one line as soon as it completes, by a background
+    thread so that neither the minimizer nor the GUI waits for the disk. The file is
+    line-buffered, so a crash loses at most the evaluation being written, and a
+    truncated last line is skipped by `read_journal`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.queue: SimpleQueue[Optional[tuple]] = SimpleQueue()
+        self.thread = Thread(target=self.run, name="Run journal", daemon=True)
+        self.count = 0
+        self.started = time.time()
+
+    def open(self) -> None:
+        self.started = time.time()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.thread.start()
+        logger.info(f"Writing the run journal to {self.path}")
+
+    def append(
+        self,
+        ellipse: DetectedEllipse,
+        currents: list[float],
+        objective: float,
+        frames: int,
+        timings: dict[str, float],
+    ) -> None:
+        self.queue.put(
+            (
+                self.count,
+                round(time.time() - self.started, 3),
+                *(getattr(ellipse, name) for name in ELLIPSE_FIELDS),
+                float(currents[0]),
+                float(currents[1]),
+                objective,
+                frames,
+                *(timings.get(name, 0.0) for name in TIMINGS),
+            )
+        )
+        self.count += 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write the pending evaluations and close the file."""
+        if not self.thread.is_alive():
+            return
+        self.queue.put(None)
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            logger.warning(f"The run journal {self.path} was not closed properly")
+
+    def run(self) -> None:
+        with self.path.open(mode="w", newline="", buffering=1) as file:
+            writer = csv.writer(file, lineterminator="\n")
+            writer.writerow(HEADER)
+            while (row := self.queue.get()) is not None:
+                writer.writerow(row)
+        logger.info(f"Closed the run journal {self.path} after {self.count} evaluations")
+
+
+def read_journal(path: Path) -> RunData:
+    """Load the evaluations of a run journal, ignoring a last line cut short by a crash."""
+    with path.open(mode="r") as file:
+        header = file.readline().rstrip("\n").split(",")
+        lines = [line for line in file if line.endswith("\n") and line.count(",") == len(header) - 1]
+
+    data = RunData()
+    if not lines:
+        return data
+    table = np.loadtxt(lines, delimiter=",", ndmin=2)
+    for f in fields(data):
+        if f.name in header:
+            getattr(data, f.name).extend(table[:, header.index(f.name)])
+    logger.info(f"Loaded {len(lines)} evaluations from {path}")
+    return data
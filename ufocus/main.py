@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import logging.config
+from multiprocessing import freeze_support
 
 from logging_config import LOGGING_CONFIG
 from main_window import main
@@ -9,6 +10,7 @@ logging.config.dictConfig(LOGGING_CONFIG)
 
 
 def run_main() -> int:
+    freeze_support()
     exit_code: int = main()
     return exit_code
 
@@ -16,5 +18,6 @@ def run_main() -> int:
 if __name__ == "__main__":
     import sys
 
+    freeze_support()
     exit_code = main()
     sys.exit(exit_code)
@@ -2,18 +2,17 @@
 
 import datetime as dt
 import logging
+import time
+from pathlib import Path
 from typing import Optional, Union
 
 import serial
 from pypylon import pylon
 from pyqtgraph import setConfigOptions
 from PySide6.QtCore import (
-    QMutex,
     QPoint,
     QSize,
     Qt,
-    QThreadPool,
-    QWaitCondition,
     Slot,
 )
 from PySide6.QtGui import (
@@ -56,12 +55,27 @@ from cameras.basler_camera import BaslerCamera
 from cameras.builtin_camera import BuiltInCamera
 from cameras.camera_base import Camera
 from cameras.exceptions import CameraConnectionError
-from dirs import BASE_PATH
+from cameras.simulated_camera import SimulatedCamera
+from catalogue import catalogue
+from dirs import BASE_DATA_PATH, BASE_PATH
 from event_filter import EventFilter
-from image_processing.image_processing import DetectedEllipse, ImageProcessing
+from execution import Executor, Role
+from image_processing.image_processing import ImageProcessing
+from minimizer.checkpoint import Checkpoint
+from minimizer.evaluation_cache import CachePolicy
+from minimizer.history import FocusHistory
 from minimizer.minimizer import Minimizer
+from minimizer.optimizers import OPTIMIZERS
 from ps_controller import PSController
 from settings_manager import SettingsManager
+from simulation.genesys_simulator import (
+    SIMULATED_PORT,
+    SimulatedPortInfo,
+    SimulatedSerial,
+    SimulatorTiming,
+    get_default_bus,
+)
+from tracing import tracer
 from version import get_latest_version, get_version
 from widgets import (
     FullScreenWidget,
@@ -71,6 +85,9 @@ from widgets import (
     LoggerWidget,
     PlottingWidget,
     PowerSupplyWidget,
+    RunBrowserWidget,
+    SweepWidget,
+    TuningWidget,
 )
 from workers.camera_worker_base import CameraWorker
 
@@ -158,7 +175,8 @@ class MainWindow(QMainWindow):
         self.serial_port = None
         self.devices = self.list_cameras()
         self.camera: Optional[Camera] = None
-        self.threadpool = QThreadPool.globalInstance()
+        self.executor = Executor()
+        tracer.set_thread_name("GUI")
         self.settings_manager = SettingsManager(self)
         self.initUI()
         self.settings_manager.setUserValues()
@@ -169,12 +187,24 @@ class MainWindow(QMainWindow):
         ports = comports()
         if ports:
             logger.info("Serial ports found")
-            return ports
         else:
             logger.warning("No serial ports in the system")
-            return []
+        # The simulated power supplies are always available for offline testing
+        return [*ports, SimulatedPortInfo()]
 
     def connect_port(self, port):
+        if port == SIMULATED_PORT:
+            settings = self.settings_manager.user_settings
+            bus = get_default_bus()
+            for supply in bus.supplies.values():
+                supply.slew_rate = settings["simulatorSlewRate"]
+            timing = SimulatorTiming(
+                processing_delay=settings["simulatorProcessingDelay"],
+                drop_probability=settings["simulatorDropProbability"],
+            )
+            logger.info(f"Connected to the simulated power supplies ({timing}, slew rate: {settings['simulatorSlewRate']} A/s)")
+            return SimulatedSerial(bus, timing)
+
         try:
             serial_port = serial.Serial(
                 port=port,
@@ -221,7 +251,11 @@ class MainWindow(QMainWindow):
             {
                 "name": "Generic (OpenCV)",
                 "class": BuiltInCamera,
-            }
+            },
+            {
+                "name": "Simulated microprobe",
+                "class": SimulatedCamera,
+            },
         ]
         return supported_cameras
 
@@ -237,6 +271,11 @@ class MainWindow(QMainWindow):
         self.imageProcessingFeed = ImageProcessingWidget(self)
         self.plotting = PlottingWidget(self)
         self.histograms = HistogramsWidget(self)
+        self.runBrowser = RunBrowserWidget(self)
+        self.runBrowser.frameChanged.connect(self.plotting.setEvaluationCursor)
+        self.plotting.cursorMoved.connect(self.runBrowser.setEvaluationRow)
+        self.tuning = TuningWidget(self)
+        self.lineSweep = SweepWidget(self)
         self.logging = LoggerWidget(self)
         logging.root.addHandler(self.logging.handler)
 
@@ -245,6 +284,9 @@ class MainWindow(QMainWindow):
         self.tabs.addTab(self.imageProcessingFeed, "Processed Feed")
         self.tabs.addTab(self.plotting, "Plotting")
         self.tabs.addTab(self.histograms, "Histograms")
+        self.tabs.addTab(self.runBrowser, "Run Browser")
+        self.tabs.addTab(self.tuning, "Tuning")
+        self.tabs.addTab(self.lineSweep, "Line Sweep")
         self.tabs.addTab(self.logging, "Logging")
 
         # Create and connect widgets
@@ -398,6 +440,49 @@ class MainWindow(QMainWindow):
         self.checkboxSaveImages.setChecked(False)
         self.checkboxSaveImages.setCursor(Qt.CursorShape.PointingHandCursor)
 
+        self.comboboxPyramid = QComboBox(self)
+        self.comboboxPyramid.addItem("Off", 0)
+        self.comboboxPyramid.addItem("2x", 1)
+        self.comboboxPyramid.addItem("4x", 2)
+        self.comboboxPyramid.setToolTip(
+            "<p>Locate the spot on a downsampled image and detect its contour "
+            "only in a full resolution window around it, faster for large ROIs</p>"
+        )
+        self.comboboxPyramid.currentIndexChanged.connect(
+            lambda v: self.settings_manager.user_settings.update({"comboboxPyramid": v})
+        )
+
+        self.checkboxAutoROI = QCheckBox("Auto ROI", self)
+        self.checkboxAutoROI.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.checkboxAutoROI.setToolTip(
+            "<p>Process only a window around the last detected spot, "
+            "falling back to the full frame when the spot is lost</p>"
+        )
+        self.checkboxAutoROI.toggled.connect(
+            lambda v: self.settings_manager.user_settings.update({"checkboxAutoROI": v})
+        )
+
+        self.checkboxCameraROI = QCheckBox("Apply ROI to Camera", self)
+        self.checkboxCameraROI.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.checkboxCameraROI.setToolTip("<p>Read out only the auto ROI window, if the camera supports it</p>")
+        self.checkboxCameraROI.setEnabled(False)
+        self.checkboxAutoROI.toggled.connect(self.checkboxCameraROI.setEnabled)
+        self.checkboxCameraROI.toggled.connect(
+            lambda v: self.settings_manager.user_settings.update({"checkboxCameraROI": v})
+        )
+        self.checkboxCameraROI.toggled.connect(self.onCameraROIStateChanged)
+
+        self.checkboxAnalysisProcess = QCheckBox("Analyze in Separate Process", self)
+        self.checkboxAnalysisProcess.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.checkboxAnalysisProcess.setToolTip(
+            "<p>Run the image analysis in a separate process on images in shared memory, "
+            "so that it does not compete with the GUI and the serial communication. "
+            "Applied when image processing starts.</p>"
+        )
+        self.checkboxAnalysisProcess.toggled.connect(
+            lambda v: self.settings_manager.user_settings.update({"checkboxAnalysisProcess": v})
+        )
+
         self.setupConnections()
 
         self.setupCameraOptions()
@@ -433,7 +518,11 @@ class MainWindow(QMainWindow):
         imageProcessingOptionsLayout.setWidget(1, QFormLayout.ItemRole.SpanningRole, self.checkboxGaussianFiltering)
         imageProcessingOptionsLayout.addRow("Kernel:", self.spinboxGaussianKernel)
         imageProcessingOptionsLayout.addRow("Threshold:", self.spinboxThreshold)
-        imageProcessingOptionsLayout.setWidget(4, QFormLayout.ItemRole.SpanningRole, self.checkboxSaveImages)
+        imageProcessingOptionsLayout.addRow("Pyramid:", self.comboboxPyramid)
+        imageProcessingOptionsLayout.setWidget(5, QFormLayout.ItemRole.SpanningRole, self.checkboxAutoROI)
+        imageProcessingOptionsLayout.setWidget(6, QFormLayout.ItemRole.SpanningRole, self.checkboxCameraROI)
+        imageProcessingOptionsLayout.setWidget(7, QFormLayout.ItemRole.SpanningRole, self.checkboxSaveImages)
+        imageProcessingOptionsLayout.setWidget(8, QFormLayout.ItemRole.SpanningRole, self.checkboxAnalysisProcess)
         
         mainImageProcessingLayout = QVBoxLayout()
         mainImageProcessingLayout.addLayout(imageProcessingOptionsLayout)
@@ -487,6 +576,8 @@ class MainWindow(QMainWindow):
         menuFile.addAction(self.actionResetCamera)
         menuFile.addSeparator()
         menuFile.addAction(self.plotting.actionSaveData)
+        menuFile.addAction(self.plotting.actionLoadJournal)
+        menuFile.addAction(self.plotting.actionLoadLandscape)
         menuFile.addAction(self.plotting.actionClearData)
         menuFile.addSeparator()
         menuFile.addAction('Save current settings', self.settings_manager.saveUserSettings, 'Ctrl+Alt+S')
@@ -499,6 +590,22 @@ class MainWindow(QMainWindow):
         self.actionStartCalibration.setStatusTip("Start camera calibration")
         self.actionStartCalibration.triggered.connect(self.calibrationDialogAction)
         menuTools.addAction(self.actionStartCalibration)
+        menuTools.addSeparator()
+        self.actionResumeMinimization = QAction("Resume Minimization...", self)
+        self.actionResumeMinimization.setStatusTip("Continue an interrupted minimization from its checkpoint")
+        self.actionResumeMinimization.triggered.connect(self.resumeMinimizationAction)
+        menuTools.addAction(self.actionResumeMinimization)
+        menuTools.addSeparator()
+        self.actionRecordTrace = QAction("Record Trace", self)
+        self.actionRecordTrace.setStatusTip("Record a timeline of the acquisition, processing and power supply threads")
+        self.actionRecordTrace.setCheckable(True)
+        self.actionRecordTrace.toggled.connect(self.recordTraceAction)
+        menuTools.addAction(self.actionRecordTrace)
+        self.actionSaveTrace = QAction("Save Trace", self)
+        self.actionSaveTrace.setStatusTip("Save the recorded timeline as a Chrome trace (Perfetto, chrome://tracing)")
+        self.actionSaveTrace.setEnabled(False)
+        self.actionSaveTrace.triggered.connect(self.saveTraceAction)
+        menuTools.addAction(self.actionSaveTrace)
 
         menuView = menu.addMenu("View")
         menuView.addAction(self.actionOpenInFullScreen)
@@ -513,6 +620,8 @@ class MainWindow(QMainWindow):
         submenuPlotting.addAction(self.plotting.dock_widget1.toggleViewAction())
         submenuPlotting.addAction(self.plotting.dock_widget2.toggleViewAction())
         submenuPlotting.addAction(self.plotting.dock_widget3.toggleViewAction())
+        submenuPlotting.addAction(self.plotting.dock_widget4.toggleViewAction())
+        submenuPlotting.addAction(self.plotting.dock_widget5.toggleViewAction())
         submenuHistograms = menuView.addMenu("Histograms")
         submenuHistograms.addAction(self.histograms.actionOpenInWindow)
         submenuHistograms.addAction(self.histograms.dock_widget1.toggleViewAction())
@@ -572,6 +681,59 @@ class MainWindow(QMainWindow):
         self.actionZoomOut.setEnabled(self.video_label.transform().m11() > 1.0)
         self.actionZoomRestore.setEnabled(self.video_label.transform().m11() != 1.0)
 
+    @Slot(bool)
+    def recordTraceAction(self, checked: bool) -> None:
+        if checked:
+            tracer.clear()
+        tracer.enabled = checked
+        self.actionSaveTrace.setEnabled(checked)
+
+    @Slot()
+    def saveTraceAction(self) -> None:
+        filename = tracer.dump(self.runDataPath(), f"{dt.date.today()}_{time.time_ns()}")
+        QMessageBox.information(
+            self,
+            "Trace saved",
+            f"Trace was successfully saved to {filename}.",
+            QMessageBox.StandardButton.Ok,
+        )
+
+    def resumeMinimizationAction(self) -> None:
+        if self.minimizationButton.isChecked():
+            return
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Resume Minimization", str(BASE_DATA_PATH), "Checkpoints (checkpoint_*.json);;All Files (*)"
+        )
+        if not filename:
+            return
+        try:
+            checkpoint = Checkpoint.load(Path(filename))
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            logger.error(f"Could not load the checkpoint {filename}: {err}")
+            QMessageBox.critical(
+                self,
+                "Invalid checkpoint",
+                f"The checkpoint {filename} could not be loaded.",
+                QMessageBox.StandardButton.Ok,
+            )
+            return
+        if checkpoint.finished or checkpoint.optimizer not in (o.name for o in OPTIMIZERS):
+            QMessageBox.warning(
+                self,
+                "Cannot resume",
+                f"The run of {filename} has already finished or used an unknown optimizer.",
+                QMessageBox.StandardButton.Ok,
+            )
+            return
+        self.resumeCheckpoint = checkpoint
+        self.minimizationButton.setChecked(True)
+
+    def runDataPath(self):
+        """Directory of the current run, or of the current day if image processing is not running."""
+        if hasattr(self, "imageProcessingWorker"):
+            return self.imageProcessingWorker.pipeline.image_data_path.parent
+        return BASE_DATA_PATH / dt.date.today().isoformat()
+
     def calibrationDialogAction(self, s) -> None:
         # if self.cal is not None:
         #     self.windowCalibration.stackedWidget.setCurrentWidget(self.windowCalibration.calibrationInfo)
@@ -806,6 +968,43 @@ class MainWindow(QMainWindow):
         self.spinboxMaxPS2.setRange(0.0, 100.0)
         self.spinboxMaxPS2.setSingleStep(0.1)
 
+        self.focusHistory = FocusHistory()
+        # Checkpoint of an interrupted run to continue with the next minimization
+        self.resumeCheckpoint: Optional[Checkpoint] = None
+
+        self.lineEditIon = QLineEdit()
+        self.lineEditIon.setPlaceholderText("e.g. 1H+")
+        self.lineEditIon.setToolTip("<p>Ion species, used to store and look up focus solutions</p>")
+        self.lineEditIon.textChanged.connect(
+            lambda v: self.settings_manager.user_settings.update({"lineEditIon": v})
+        )
+
+        self.spinboxBeamEnergy = QDoubleSpinBox()
+        self.spinboxBeamEnergy.setRange(0.0, 100.0)
+        self.spinboxBeamEnergy.setDecimals(3)
+        self.spinboxBeamEnergy.setSingleStep(0.1)
+        self.spinboxBeamEnergy.setKeyboardTracking(False)
+        self.spinboxBeamEnergy.valueChanged.connect(
+            lambda v: self.settings_manager.user_settings.update({"spinboxBeamEnergy": v})
+        )
+
+        self.lineEditLenses = QLineEdit()
+        self.lineEditLenses.setPlaceholderText("e.g. triplet")
+        self.lineEditLenses.setToolTip("<p>Lens configuration, used to store and look up focus solutions</p>")
+        self.lineEditLenses.textChanged.connect(
+            lambda v: self.settings_manager.user_settings.update({"lineEditLenses": v})
+        )
+
+        self.checkboxWarmStart = QCheckBox("Warm start from history", self)
+        self.checkboxWarmStart.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.checkboxWarmStart.setToolTip(
+            "<p>Start from the stored solution of the same ion and lenses with the closest energy, "
+            "with a small initial step</p>"
+        )
+        self.checkboxWarmStart.toggled.connect(
+            lambda v: self.settings_manager.user_settings.update({"checkboxWarmStart": v})
+        )
+
         self.spinboxXATol = QSpinBox()
         self.spinboxXATol.setRange(-4, 3)
         self.spinboxXATol.setValue(-4)
@@ -846,6 +1045,19 @@ class MainWindow(QMainWindow):
             lambda v: self.settings_manager.user_settings.update({"spinboxMaxFEval": v})
         )
 
+        self.spinboxMinImagesToAccumulate = QSpinBox()
+        self.spinboxMinImagesToAccumulate.setRange(0, 500)
+        self.spinboxMinImagesToAccumulate.setSpecialValueText("Fixed")
+        self.spinboxMinImagesToAccumulate.setKeyboardTracking(False)
+        self.spinboxMinImagesToAccumulate.setToolTip(
+            "<p>Images accumulated per evaluation far from the minimum. The number is increased up to "
+            "Images as the optimizer converges, and the best points are confirmed with Images.</p>"
+            "<p><b>Fixed</b>: always accumulate Images</p>"
+        )
+        self.spinboxMinImagesToAccumulate.valueChanged.connect(
+            lambda v: self.settings_manager.user_settings.update({"spinboxMinImagesToAccumulate": v})
+        )
+
         self.lineEditObjFuncPowers = QLineEdit()
         self.lineEditObjFuncPowers.setInputMask(r"\[9, 9\];_")
         self.lineEditObjFuncPowers.setToolTip("<p>List of powers to raise the objective function's numerator and denominator</p>")
@@ -853,6 +1065,53 @@ class MainWindow(QMainWindow):
             lambda v: self.settings_manager.user_settings.update({"lineEditObjFuncPowers": v})
         )
 
+        self.comboboxOptimizer = QComboBox()
+        for optimizer in OPTIMIZERS:
+            self.comboboxOptimizer.addItem(optimizer.name, optimizer)
+        self.comboboxOptimizer.setToolTip(
+            "<p>Optimization algorithm</p>"
+            "<p><b>Nelder-Mead</b>: downhill simplex, robust but needs many evaluations<br>"
+            "<b>Trust region</b>: local quadratic model of all the measured points, for a nearly quadratic focus<br>"
+            "<b>Bayesian (GP)</b>: Gaussian-process surrogate, for expensive and noisy evaluations<br>"
+            "<b>Landscape scan</b>: measures a grid over the bounds, max. func. evals. limits the grid size</p>"
+        )
+        self.comboboxOptimizer.currentIndexChanged.connect(
+            lambda v: self.settings_manager.user_settings.update({"comboboxOptimizer": v})
+        )
+
+        self.comboboxCachePolicy = QComboBox()
+        for policy in CachePolicy:
+            self.comboboxCachePolicy.addItem(policy.value, policy)
+        self.comboboxCachePolicy.setToolTip(
+            "<p>Reuse evaluations of setpoints that were already measured during the run</p>"
+            "<p><b>Reuse</b>: always reuse the measured value<br>"
+            "<b>Average</b>: re-measure until SAMPLES values are averaged<br>"
+            "<b>Expire</b>: re-measure if older than MAX AGE</p>"
+        )
+        self.comboboxCachePolicy.currentIndexChanged.connect(self.onCachePolicyChanged)
+        self.comboboxCachePolicy.currentIndexChanged.connect(
+            lambda v: self.settings_manager.user_settings.update({"comboboxCachePolicy": v})
+        )
+
+        self.spinboxCacheMaxAge = QDoubleSpinBox()
+        self.spinboxCacheMaxAge.setRange(1.0, 3600.0)
+        self.spinboxCacheMaxAge.setDecimals(0)
+        self.spinboxCacheMaxAge.setSuffix(" s")
+        self.spinboxCacheMaxAge.setKeyboardTracking(False)
+        self.spinboxCacheMaxAge.setToolTip("<p>Age after which a cached evaluation is measured again</p>")
+        self.spinboxCacheMaxAge.valueChanged.connect(
+            lambda v: self.settings_manager.user_settings.update({"spinboxCacheMaxAge": v})
+        )
+
+        self.spinboxCacheSamples = QSpinBox()
+        self.spinboxCacheSamples.setRange(2, 10)
+        self.spinboxCacheSamples.setKeyboardTracking(False)
+        self.spinboxCacheSamples.setToolTip("<p>Number of measurements averaged per cached setpoint</p>")
+        self.spinboxCacheSamples.valueChanged.connect(
+            lambda v: self.settings_manager.user_settings.update({"spinboxCacheSamples": v})
+        )
+        self.onCachePolicyChanged()
+
         minimizerOptionsPS1Layout = QFormLayout()
         minimizerOptionsPS1Layout.addRow("Initial [A]:", self.spinboxInitialPS1)
         minimizerOptionsPS1Layout.addRow("Min [A]:", self.spinboxMinPS1)
@@ -863,12 +1122,23 @@ class MainWindow(QMainWindow):
         minimizerOptionsPS2Layout.addRow("Min [A]:", self.spinboxMinPS2)
         minimizerOptionsPS2Layout.addRow("Max [A]:", self.spinboxMaxPS2)
 
+        minimizerBeamLayout = QFormLayout()
+        minimizerBeamLayout.addRow("Ion:", self.lineEditIon)
+        minimizerBeamLayout.addRow("Energy [MeV]:", self.spinboxBeamEnergy)
+        minimizerBeamLayout.addRow("Lenses:", self.lineEditLenses)
+        minimizerBeamLayout.setWidget(3, QFormLayout.ItemRole.SpanningRole, self.checkboxWarmStart)
+
         minimizerOtherOptionsLayout = QFormLayout()
+        minimizerOtherOptionsLayout.addRow("OPTIMIZER", self.comboboxOptimizer)
         minimizerOtherOptionsLayout.addRow("MAXITER", self.spinboxMaxIter)
         minimizerOtherOptionsLayout.addRow("MAXFEV", self.spinboxMaxFEval)
         minimizerOtherOptionsLayout.addRow("XATOL", self.spinboxXATol)
         minimizerOtherOptionsLayout.addRow("FATOL", self.spinboxFATol)
         minimizerOtherOptionsLayout.addRow("POWERS", self.lineEditObjFuncPowers)
+        minimizerOtherOptionsLayout.addRow("MIN IMAGES", self.spinboxMinImagesToAccumulate)
+        minimizerOtherOptionsLayout.addRow("CACHE", self.comboboxCachePolicy)
+        minimizerOtherOptionsLayout.addRow("MAX AGE", self.spinboxCacheMaxAge)
+        minimizerOtherOptionsLayout.addRow("SAMPLES", self.spinboxCacheSamples)
 
         mainMinimizerLayout = QVBoxLayout()
         mainMinimizerLayout.addWidget(QLabel("PS1 Settings"), alignment=Qt.AlignmentFlag.AlignCenter)
@@ -877,6 +1147,9 @@ class MainWindow(QMainWindow):
         mainMinimizerLayout.addWidget(QLabel("PS2 Settings"), alignment=Qt.AlignmentFlag.AlignCenter)
         mainMinimizerLayout.addLayout(minimizerOptionsPS2Layout)
         mainMinimizerLayout.addSpacing(5)
+        mainMinimizerLayout.addWidget(QLabel("Beam Settings"), alignment=Qt.AlignmentFlag.AlignCenter)
+        mainMinimizerLayout.addLayout(minimizerBeamLayout)
+        mainMinimizerLayout.addSpacing(5)
         mainMinimizerLayout.addWidget(QLabel("Other Settings"), alignment=Qt.AlignmentFlag.AlignCenter)
         mainMinimizerLayout.addLayout(minimizerOtherOptionsLayout)
         mainMinimizerLayout.addSpacing(5)
@@ -888,6 +1161,12 @@ class MainWindow(QMainWindow):
         self.spinboxInitialPS1.valueChanged.connect(self.setBounds)
         self.spinboxInitialPS2.valueChanged.connect(self.setBounds)
 
+    @Slot()
+    def onCachePolicyChanged(self) -> None:
+        policy = self.comboboxCachePolicy.currentData()
+        self.spinboxCacheMaxAge.setEnabled(policy is CachePolicy.EXPIRE)
+        self.spinboxCacheSamples.setEnabled(policy is CachePolicy.AVERAGE)
+
     @Slot(float)
     def setBounds(self, val: float) -> None:
         min, max = self.determineBounds(val)
@@ -956,7 +1235,7 @@ class MainWindow(QMainWindow):
             self.actionSaveImageAs.setEnabled(False)
 
             # Start the thread
-            self.threadpool.start(self.worker)
+            self.executor.start(Role.ACQUISITION, self.worker)
 
     @Slot()
     def onCameraFinished(self) -> None:
@@ -1074,11 +1353,18 @@ class MainWindow(QMainWindow):
             else:
                 self.imageProcessingWorker = ImageProcessing(self)
 
-                # Connect the signal from the camera worker directly to the image processing function
-                self.worker.signals.progress.connect(self.imageProcessingWorker.imageProcessing)
+                # Hand the frames over in the camera thread, the processing thread picks them up from its inbox
+                self.worker.signals.progress.connect(
+                    self.imageProcessingWorker.imageProcessing, Qt.ConnectionType.DirectConnection
+                )
                 self.spinboxImagesToAccumulate.valueChanged.connect(self.imageProcessingWorker.setNumberOfImagesToAccumulate)
                 self.spinboxGaussianKernel.valueChanged.connect(self.imageProcessingWorker.setGaussianKernel)
+                self.checkboxGaussianFiltering.toggled.connect(self.imageProcessingWorker.setGaussianFiltering)
                 self.spinboxThreshold.valueChanged.connect(self.imageProcessingWorker.setThreshold)
+                self.comboboxPyramid.currentIndexChanged.connect(self.imageProcessingWorker.setPyramidLevels)
+                self.checkboxAutoROI.toggled.connect(self.imageProcessingWorker.setAutoROI)
+                self.imageProcessingWorker.signals.trackingWindowChanged.connect(self.onTrackingWindowChanged)
+                self.imageProcessingWorker.signals.burstCaptured.connect(self.tuning.onBurstCaptured)
 
                 self.imageProcessingWorker.signals.imageProcessingDone.connect(self.imageProcessingFeed.video_label.setImage)
                 self.imageProcessingWorker.signals.imageProcessingEllipse.connect(self.plotting.updatePlotEllipseAxes)
@@ -1086,12 +1372,32 @@ class MainWindow(QMainWindow):
                 self.imageProcessingWorker.signals.imageProcessingHist.connect(self.histograms.updateHist)
                 self.imageProcessingWorker.signals.imageProcessingHor.connect(self.histograms.updateHistHor)
                 self.imageProcessingWorker.signals.imageProcessingVert.connect(self.histograms.updateHistVert)
-                self.threadpool.start(self.imageProcessingWorker)
+                self.imageProcessingWorker.signals.thresholdChanged.connect(self.spinboxThreshold.setValue)
+                self.imageProcessingWorker.signals.roiError.connect(self.improc_button.toggle)
+                self.imageProcessingWorker.signals.roiError.connect(self.imageProcessingROIErrorDialog)
+                self.executor.start(Role.PROCESSING, self.imageProcessingWorker)
         else:
             if hasattr(self, 'worker') and hasattr(self, 'imageProcessingWorker'):
-                if self.imageProcessingWorker.eventloop.isRunning():
+                if self.imageProcessingWorker.running:
                     self.worker.signals.progress.disconnect(self.imageProcessingWorker.imageProcessing)
-                    self.imageProcessingWorker.eventloop.exit()
+                    self.imageProcessingWorker.stop()
+                    self.onTrackingWindowChanged(None)
+
+    @Slot(object)
+    def onTrackingWindowChanged(self, window) -> None:
+        if self.checkboxCameraROI.isChecked() and self.camera is not None and self.camera.is_connected:
+            pushed = self.camera.set_roi(window)
+            self.imageProcessingWorker.setCameraWindow(window if pushed else None)
+
+    @Slot(bool)
+    def onCameraROIStateChanged(self, checked: bool) -> None:
+        if not hasattr(self, "imageProcessingWorker") or not self.imageProcessingWorker.running:
+            return
+        if checked:
+            self.onTrackingWindowChanged(self.imageProcessingWorker.pipeline.tracking.window)
+        elif self.camera is not None and self.camera.is_connected:
+            self.camera.set_roi(None)
+            self.imageProcessingWorker.setCameraWindow(None)
 
     def imageProcessingErrorDialog(self):
         QMessageBox.critical(
@@ -1112,15 +1418,16 @@ class MainWindow(QMainWindow):
         )
 
     @Slot()
-    def initializeMinimization(self):
-        self.mutex = QMutex()
-        self.condition = QWaitCondition()
-        self.minimizerWorker = Minimizer(self.pscontroller, self.mutex, self.condition, self)
-        self.imageProcessingWorker.signals.imageProcessingEllipse.connect(self.minimizerWorker.get_res)
+    def initializeMinimization(self, resume: Optional[Checkpoint] = None):
+        self.minimizerWorker = Minimizer(self.pscontroller, self, resume)
+        self.imageProcessingWorker.signals.evaluationDone.connect(self.minimizerWorker.onEvaluationDone)
+        self.minimizerWorker.signals.evaluationRequested.connect(self.imageProcessingWorker.startEvaluation)
         self.minimizerWorker.signals.boundsError.connect(self.minimizerBoundsError)
         self.minimizerWorker.signals.inAccumulation.connect(self.imageProcessingWorker.setInAccumulation)
+        self.minimizerWorker.signals.imagesToAccumulate.connect(self.imageProcessingWorker.setNumberOfImagesToAccumulate)
         self.minimizerWorker.signals.updateCurrent.connect(self.plotting.updatePlotCurrents)
         self.minimizerWorker.signals.updateFunction.connect(self.plotting.updatePlotFunction)
+        self.minimizerWorker.signals.landscapeUpdated.connect(self.plotting.updateLandscape)
         self.minimizerWorker.signals.updateStats.connect(self.imageProcessingFeed.onMinimizerFuncEvalUpdate)
         self.minimizerWorker.signals.controlTimer.connect(self.pscontroller.controlTimer)
         self.minimizerWorker.signals.finished.connect(
@@ -1132,11 +1439,12 @@ class MainWindow(QMainWindow):
         self.minimizerWorker.signals.finished.connect(self.minimizerFinished)
 
     def startMinimization(self):
+        resume, self.resumeCheckpoint = self.resumeCheckpoint, None
         if not self.start_button.isEnabled() and self.connectionButtonSerial.isChecked():
             if not self.improc_button.isChecked():
                 self.improc_button.setChecked(True)
-            self.initializeMinimization()
-            self.threadpool.start(self.minimizerWorker)
+            self.initializeMinimization(resume)
+            self.executor.start(Role.OPTIMIZATION, self.minimizerWorker)
             self.minimizationButton.setText("Stop Minimization")
         else:
             self.minimizationButton.setChecked(False)
@@ -1145,6 +1453,17 @@ class MainWindow(QMainWindow):
     @Slot()
     def onMinimizeStateChanged(self, checked):
         if checked:
+            if self.lineSweep.sweep is not None:
+                # The minimizer would wait for the sweep on the optimization thread
+                QMessageBox.warning(
+                    self,
+                    "Line sweep running",
+                    "The line sweep has to be stopped before starting the minimization.",
+                    QMessageBox.StandardButton.Ok,
+                )
+                self.resumeCheckpoint = None
+                self.minimizationButton.setChecked(False)
+                return
             if self.plotting.data.major:
                 result = QMessageBox.warning(
                 self,
@@ -1158,24 +1477,24 @@ class MainWindow(QMainWindow):
                     self.plotting.actionClearData.trigger()
                     self.startMinimization()
                 else:
+                    self.resumeCheckpoint = None
                     self.minimizationButton.setChecked(False)
             else:
                 self.startMinimization()
         else:
             if hasattr(self, 'minimizerWorker'):
-                self.minimizerWorker.control = True
+                self.minimizerWorker.stop()
             self.minimizationButton.setText("Start Minimization")
 
     @Slot()
     def minimizerFinished(self):
         if self.minimizerWorker.solution is not None:
-            status = self.minimizerWorker.solution.status
-            if status == 99:
-                reason = "Ended manually by user."
-            else:
-                reason = self.minimizerWorker.solution.message
+            reason = self.minimizerWorker.solution.message
             iterations = self.minimizerWorker.solution.nit
             evaluations = self.minimizerWorker.solution.nfev
+            measurements = self.minimizerWorker.measurements
+            hit_rate = self.minimizerWorker.cache.stats.hit_rate
+            frames_used = self.minimizerWorker.frames_used
             sol = self.minimizerWorker.solution.x
         
             result = QMessageBox.information(
@@ -1185,6 +1504,8 @@ class MainWindow(QMainWindow):
                 f"<p>Reason: {reason}<br>"
                 f"Iterations: {iterations}<br>"
                 f"Function evaluations: {evaluations}<br>"
+                f"Measured evaluations: {measurements} (cache hit rate: {100 * hit_rate:.1f}%)<br>"
+                f"Accumulated images: {frames_used}<br>"
                 f"Result: Q1 = {sol[0]:.4f} A, Q2/3 = {sol[1]:.4f} A</p>"
                 f"<p>Save current data?</p>",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
@@ -1193,7 +1514,7 @@ class MainWindow(QMainWindow):
 
             if result == QMessageBox.StandardButton.Yes:
                 # self.plotting.actionSaveData.trigger()
-                self.plotting.onActionSaveData(self.imageProcessingWorker.image_data_path.parent)
+                self.plotting.onActionSaveData(self.runDataPath())
 
     @Slot()
     def minimizerBoundsError(self):
@@ -1262,7 +1583,7 @@ class MainWindow(QMainWindow):
             self.pscontroller.signals.terminate.connect(
                 lambda: self.disconnect_port(self.serial_port)
             )
-            self.threadpool.start(self.pscontroller)
+            self.executor.start(Role.DEVICE_IO, self.pscontroller)
             self.pscontroller.signals.serialConnectionSuccessful.connect(self.onSerialConnectionSuccess)
             self.psLCD1.currentDial.valueChanged.connect(self.pscontroller.setPS1Current)
             self.psLCD2.currentDial.valueChanged.connect(self.pscontroller.setPS2Current)
@@ -1382,27 +1703,31 @@ class MainWindow(QMainWindow):
             # Clean up logging
             logging.root.removeHandler(self.logging.handler)
 
+            # Stop a running line sweep
+            if self.lineSweep.sweep is not None:
+                logger.info("Stopping the line sweep")
+                self.lineSweep.sweep.stop()
+
             # Clean up minimizer
             if hasattr(self, "minimizerWorker"):
                 logger.info("Shutting down minimizer")
-                self.minimizerWorker.control = True  # Signal to stop
                 self.minimizerWorker.forced_termination = True
 
                 # Disconnect signals
                 try:
-                    self.imageProcessingWorker.signals.imageProcessingEllipse.disconnect(self.minimizerWorker.get_res)
+                    self.imageProcessingWorker.signals.evaluationDone.disconnect(self.minimizerWorker.onEvaluationDone)
                     self.minimizerWorker.signals.finished.disconnect(self.minimizerFinished)
                 except (TypeError, RuntimeError):
                     # Already disconnected or invalid
                     pass
-                self.minimizerWorker.get_res(DetectedEllipse())  # Wakes up the thread
+                self.minimizerWorker.stop()  # Signal to stop and wake up the thread
 
             # Clean up image processing
             if hasattr(self, "imageProcessingWorker"):
                 logger.info("Shutting down image processing")
-                if hasattr(self.imageProcessingWorker, "eventloop") and self.imageProcessingWorker.eventloop.isRunning():
-                    logger.debug("Stopping image processing event loop")
-                    self.imageProcessingWorker.eventloop.exit()
+                if self.imageProcessingWorker.running:
+                    logger.debug("Stopping image processing thread")
+                    self.imageProcessingWorker.stop()
 
                     # Disconnect signals to prevent callbacks during shutdown
                     if hasattr(self, "worker") and hasattr(self.worker, "signals"):
@@ -1423,11 +1748,6 @@ class MainWindow(QMainWindow):
                     if hasattr(self.pscontroller, "loop") and self.pscontroller.loop.isRunning():
                         self.pscontroller.loop.exit()
 
-                    # Wait for queue thread to finish with timeout
-                    if hasattr(self.pscontroller, "queue_thread") and self.pscontroller.queue_thread.is_alive():
-                        logger.debug("Waiting for queue thread to terminate")
-                        self.pscontroller.queue_thread.join(timeout=0.5)
-
             # Clean up camera resources
             if self.camera is not None:
                 logger.info("Shutting down camera")
@@ -1445,14 +1765,11 @@ class MainWindow(QMainWindow):
                     self.camera.disconnect()
                     logger.info("Camera disconnected")
 
-            # Wait for all threadpool tasks to finish (with a reasonable timeout)
-            if hasattr(self, "threadpool"):
-                logger.info("Waiting for thread pool to finish")
-                self.threadpool.waitForDone(1000)  # 1 second timeout
-
-                # If threads are still running, log a warning
-                if not self.threadpool.waitForDone(0):
-                    logger.warning("Some threads did not terminate properly")
+            # Wait for the workers of every role to finish, the power supplies are switched off last
+            logger.info("Waiting for worker threads to finish")
+            self.runBrowser.stop()
+            self.executor.shutdown(timeout=2.0)
+            catalogue.close()
 
             logger.info("Application shutdown completed")
             event.accept()
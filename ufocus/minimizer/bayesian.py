@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from math import log, pi, sqrt
+from typing import Optional
+
+import numpy as np
+from scipy.linalg import LinAlgError, cho_factor, cho_solve
+from scipy.optimize import OptimizeResult, minimize
+from scipy.stats import norm, qmc
+
+from minimizer.optimizer_base import Optimizer, OptimizerOptions
+
+logger = logging.getLogger(__name__)
+
+
+class GaussianProcess:
+    """
+    Gaussian-process regression with an anisotropic Matérn 5/2 kernel and a learned noise term.
+
+    The hyperparameters (length scales, signal variance and noise variance) are
+    fitted by maximizing the log marginal likelihood. Inputs are expected in the
+    unit box and targets standardized.
+    """
+
+    # Bounds of the log-hyperparameters: length scales, signal variance, noise variance
+    LOG_BOUNDS = [(log(0.03), log(3.0)), (log(0.05), log(20.0)), (log(1e-6), log(1.0))]
+
+    def __init__(self, dim: int, seed: Optional[int] = None) -> None:
+        self.dim = dim
+        self.rng = np.random.default_rng(seed)
+        self.theta = np.array([log(0.3)] * dim + [0.0, log(1e-2)])
+        self.X = np.empty((0, dim))
+        self.y = np.empty(0)
+
+    def kernel(self, a: np.ndarray, b: np.ndarray, theta: np.ndarray) -> np.ndarray:
+        lengthscales = np.exp(theta[: self.dim])
+        d = np.sqrt((((a[:, None, :] - b[None, :, :]) / lengthscales) ** 2).sum(axis=-1))
+        s5 = sqrt(5) * d
+        return np.exp(theta[self.dim]) * (1 + s5 + s5**2 / 3) * np.exp(-s5)
+
+    def factorize(self, theta: np.ndarray):
+        K = self.kernel(self.X, self.X, theta)
+        K[np.diag_indices_from(K)] += np.exp(theta[self.dim + 1]) + 1e-9
+        return cho_factor(K, lower=True)
+
+    def negative_log_likelihood(self, theta: np.ndarray) -> float:
+        try:
+            factor = self.factorize(theta)
+        except LinAlgError:
+            return 1e10
+        alpha = cho_solve(factor, self.y)
+        return float(
+            0.5 * self.y @ alpha + np.log(np.diag(factor[0])).sum() + 0.5 * len(self.y) * log(2 * pi)
+        )
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> None:
+        self.X, self.y = X, y
+        bounds = self.LOG_BOUNDS[:1] * self.dim + self.LOG_BOUNDS[1:]
+        starts = [self.theta] + [
+            np.array([self.rng.uniform(*b) for b in bounds]) for _ in range(2)
+        ]
+        best = None
+        for start in starts:
+            res = minimize(self.negative_log_likelihood, start, method="L-BFGS-B", bounds=bounds)
+            if best is None or res.fun < best.fun:
+                best = res
+        self.theta = best.x
+        self.factor = self.factorize(self.theta)
+        self.alpha = cho_solve(self.factor, self.y)
+
+    def predict(self, Xs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return the posterior mean and standard deviation of the latent (noise-free) function."""
+        Ks = self.kernel(Xs, self.X, self.theta)
+        mean = Ks @ self.alpha
+        v = cho_solve(self.factor, Ks.T)
+        var = np.exp(self.theta[self.dim]) - (Ks * v.T).sum(axis=1)
+        return mean, np.sqrt(np.clip(var, 1e-12, None))
+
+    @property
+    def noise_std(self) -> float:
+        return sqrt(np.exp(self.theta[self.dim + 1]))
+
+
+class BayesianOptimizer(Optimizer):
+    """
+    Sample-efficient Bayesian optimization for the bounded current space.
+
+    A Gaussian-process surrogate is fitted to the logarithm of all the measured
+    objective values and the next setpoint maximizes the expected improvement
+    over the best posterior mean of the sampled points, so that a lucky noisy
+    measurement does not become the incumbent. The run stops after `maxfev`
+    evaluations, `maxiter` acquisitions, or when the proposed setpoints keep
+    landing within `xatol` of already measured ones.
+    """
+
+    name = "Bayesian (GP)"
+
+    def __init__(
+        self,
+        n_initial: Optional[int] = None,
+        max_evaluations: int = 40,
+        patience: int = 3,
+        min_improvement: float = 1e-4,
+        xi: float = 0.05,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.n_initial = n_initial
+        self.max_evaluations = max_evaluations
+        self.patience = patience
+        self.min_improvement = min_improvement
+        self.xi = xi
+        self.seed = seed
+
+    def minimize(self, fun, x0, bounds, callback=None, options=None) -> OptimizeResult:
+        options = options if options is not None else OptimizerOptions()
+        self.check_bounds(bounds)
+        rng = np.random.default_rng(self.seed)
+
+        lower = np.array([b[0] for b in bounds], dtype=float)
+        upper = np.array([b[1] for b in bounds], dtype=float)
+        span = np.where(upper > lower, upper - lower, 1.0)
+        dim = len(bounds)
+
+        def to_unit(x):
+            return (np.asarray(x, dtype=float) - lower) / span
+
+        def from_unit(u):
+            return lower + np.clip(u, 0.0, 1.0) * span
+
+        max_evaluations = options.maxfev or self.max_evaluations
+        n_initial = min(self.n_initial or 2 * dim + 1, max_evaluations)
+
+        # Space-filling initial design, always including the initial point
+        design = qmc.LatinHypercube(d=dim, seed=rng).random(n_initial - 1)
+        U = [np.clip(to_unit(x0), 0.0, 1.0), *design]
+        F = []
+        for u in U:
+            F.append(float(fun(from_unit(u))))
+
+        gp = GaussianProcess(dim, seed=self.seed)
+        nit = 0
+        stalled = 0
+        status, message = 1, "Maximum number of function evaluations has been exceeded."
+
+        while len(F) < max_evaluations:
+            if options.maxiter is not None and nit >= options.maxiter:
+                status, message = 2, "Maximum number of iterations has been exceeded."
+                break
+
+            X = np.array(U)
+            y = self.transform(np.array(F))
+            gp.fit(X, y)
+
+            mean, _ = gp.predict(X)
+            incumbent = mean.min()
+            u_next, ei = self.maximize_acquisition(gp, incumbent, dim, rng)
+
+            nit += 1
+            best = int(np.argmin(mean))
+            if callback is not None:
+                callback(OptimizeResult(x=from_unit(U[best]), fun=F[best], nit=nit, nfev=len(F)))
+
+            # Converged when the surrogate expects no improvement or keeps proposing measured setpoints.
+            # Neither is trusted before the surrogate has seen twice the initial design; until then a
+            # repeated proposal is replaced by the most uncertain candidate.
+            distance = np.min(np.abs((X - u_next) * span).max(axis=1))
+            stalled = stalled + 1 if distance <= options.xatol else 0
+            if len(F) >= 2 * n_initial:
+                if ei < self.min_improvement or stalled >= self.patience:
+                    status, message = 0, "Optimization terminated successfully."
+                    break
+            elif stalled:
+                u_next, stalled = self.explore(gp, dim, rng), 0
+
+            U.append(u_next)
+            F.append(float(fun(from_unit(u_next))))
+            logger.debug(f"Expected improvement: {ei:.4g}, noise std: {gp.noise_std:.4g}")
+
+        X = np.array(U)
+        gp.fit(X, self.transform(np.array(F)))
+        mean, _ = gp.predict(X)
+        best = int(np.argmin(mean))
+
+        return OptimizeResult(
+            x=from_unit(U[best]),
+            fun=F[best],
+            nit=nit,
+            nfev=len(F),
+            status=status,
+            success=status == 0,
+            message=message,
+        )
+
+    def transform(self, f: np.ndarray) -> np.ndarray:
+        """Standardize the objective, on a log scale since it spans orders of magnitude."""
+        f = f.copy()
+        finite = np.isfinite(f)
+        if not finite.any():
+            return np.zeros_like(f)
+        # Failed measurements are treated as the worst value observed so far
+        f[~finite] = f[finite].max()
+        if (f > 0).all():
+            f = np.log(f)
+        std = f.std()
+        return (f - f.mean()) / (std if std > 0 else 1.0)
+
+    def expected_improvement(self, gp: GaussianProcess, U: np.ndarray, incumbent: float) -> np.ndarray:
+        mean, std = gp.predict(U)
+        improvement = incumbent - mean - self.xi
+        z = improvement / std
+        return improvement * norm.cdf(z) + std * norm.pdf(z)
+
+    def explore(self, gp: GaussianProcess, dim: int, rng: np.random.Generator) -> np.ndarray:
+        candidates = qmc.Sobol(d=dim, seed=rng).random(256)
+        _, std = gp.predict(candidates)
+        return candidates[np.argmax(std)]
+
+    def maximize_acquisition(
+        self, gp: GaussianProcess, incumbent: float, dim: int, rng: np.random.Generator
+    ) -> tuple[np.ndarray, float]:
+        candidates = qmc.Sobol(d=dim, seed=rng).random(1024)
+        ei = self.expected_improvement(gp, candidates, incumbent)
+        best_u, best_ei = candidates[np.argmax(ei)], float(ei.max())
+
+        for start in candidates[np.argsort(ei)[-5:]]:
+            res = minimize(
+                lambda u: -self.expected_improvement(gp, u[None, :], incumbent)[0],
+                start,
+                method="L-BFGS-B",
+                bounds=[(0.0, 1.0)] * dim,
+            )
+            if -res.fun > best_ei:
+                best_u, best_ei = res.x, float(-res.fun)
+        return np.clip(best_u, 0.0, 1.0), best_ei
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from math import isnan
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RecordedEvaluation:
+    x: list[float]
+    value: float
+    frames: int
+    ellipse: dict = field(default_factory=dict)
+
+
+@dataclass
+class Checkpoint:
+    """
+    Everything needed to resume a minimization: the setup of the run and every measured evaluation.
+
+    The optimizer backends are deterministic for a given seed and sequence of objective
+    values, so their state (simplex, trust region or surrogate) is restored by running
+    them again from `x0` and answering with the recorded values, see `Replay`.
+    """
+
+    optimizer: str
+    seed: int
+    x0: list[float]
+    bounds: list[list[float]]
+    options: dict
+    powers: list[int]
+    fidelity: list[int]
+    beam: dict
+    evaluations: list[RecordedEvaluation] = field(default_factory=list)
+    finished: bool = False
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+    @property
+    def best(self) -> Optional[RecordedEvaluation]:
+        evaluations = [e for e in self.evaluations if not isnan(e.value)]
+        return min(evaluations, key=lambda e: e.value) if evaluations else None
+
+    def add(self, x, value: float, frames: int, ellipse: dict) -> None:
+        self.evaluations.append(RecordedEvaluation([float(v) for v in x], float(value), frames, ellipse))
+
+    def save(self, path: Path) -> None:
+        """Replace the checkpoint file atomically, so that a crash leaves either the old or the new one."""
+        data = asdict(self)
+        if (best := self.best) is not None:
+            # For the operator only, recomputed when loading
+            data["best"] = {"x": best.x, "value": best.value}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with tmp.open(mode="w") as file:
+            json.dump(data, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "Checkpoint":
+        with path.open(mode="r") as file:
+            data = json.load(file)
+        data.pop("best", None)
+        data["evaluations"] = [RecordedEvaluation(**e) for e in data["evaluations"]]
+        return cls(**data)
+
+
+class Replay:
+    """
+    Serves the recorded evaluations of a checkpoint while the optimizer retraces its steps.
+
+    As long as the optimizer requests the recorded setpoints in order, their values are
+    returned without measuring. At the first difference, e.g. an expired cache entry
+    that changed the path, the remaining records are dropped and measuring resumes.
+    """
+
+    def __init__(self, evaluations: list[RecordedEvaluation], tolerance: float = 1e-9) -> None:
+        self.pending = deque(evaluations)
+        self.tolerance = tolerance
+        self.replayed = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.pending)
+
+    def next(self, x, frames: int) -> Optional[RecordedEvaluation]:
+        if not self.pending:
+            return None
+        head = self.pending[0]
+        if head.frames == frames and max(abs(float(a) - b) for a, b in zip(x, head.x)) <= self.tolerance:
+            self.replayed += 1
+            return self.pending.popleft()
+
+        logger.warning(
+            f"The optimizer left the recorded path after {self.replayed} evaluations, "
+            f"dropping the {len(self.pending)} remaining ones"
+        )
+        self.pending.clear()
+        return None
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from dataclasses import dataclass
+from enum import Enum
+from math import isnan
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CachePolicy(Enum):
+    OFF = "Off"
+    REUSE = "Reuse"
+    AVERAGE = "Average"
+    EXPIRE = "Expire"
+
+
+@dataclass
+class CachedEvaluation:
+    value: float
+    samples: int
+    timestamp: float
+    frames: int = 1
+
+
+@dataclass
+class CacheStatistics:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+class EvaluationCache:
+    """
+    Cache of objective function evaluations keyed on the quantized (PS1, PS2) setpoint.
+
+    The power supplies resolve the currents to `resolution` amperes, so every point
+    proposed by the optimizer that rounds to an already measured setpoint can be
+    served from the cache instead of being measured again:
+
+    - REUSE: always reuse the stored value.
+    - AVERAGE: re-measure until `max_samples` measurements have been averaged, then reuse the mean.
+    - EXPIRE: reuse the stored value only if it is younger than `max_age` seconds.
+
+    Evaluations also carry the number of accumulated images they were measured with,
+    and are only reused for requests of at most the same number of images.
+    """
+
+    def __init__(
+        self,
+        policy: CachePolicy = CachePolicy.REUSE,
+        resolution: float = 0.01,
+        max_age: float = 60.0,
+        max_samples: int = 3,
+    ) -> None:
+        self.policy = policy
+        self.resolution = resolution
+        self.max_age = max_age
+        self.max_samples = max_samples
+        self.entries: dict[tuple[int, ...], CachedEvaluation] = {}
+        self.stats = CacheStatistics()
+
+    def key(self, x) -> tuple[int, ...]:
+        return tuple(round(float(v) / self.resolution) for v in x)
+
+    def lookup(self, x, frames: int = 1) -> Optional[float]:
+        """Return the cached objective value for the setpoint of `x`, or None if it has to be measured."""
+        if self.policy is CachePolicy.OFF:
+            return None
+
+        entry = self.entries.get(self.key(x))
+        if entry is None or entry.frames < frames:
+            reusable = False
+        elif self.policy is CachePolicy.AVERAGE:
+            reusable = entry.samples >= self.max_samples
+        elif self.policy is CachePolicy.EXPIRE:
+            reusable = time.monotonic() - entry.timestamp <= self.max_age
+        else:
+            reusable = True
+
+        if reusable:
+            self.stats.hits += 1
+            return entry.value
+        self.stats.misses += 1
+        return None
+
+    def store(self, x, value: float, frames: int = 1) -> float:
+        """Store a new measurement of the setpoint of `x` and return the value to report to the optimizer."""
+        if self.policy is CachePolicy.OFF or isnan(value):
+            return value
+
+        key = self.key(x)
+        entry = self.entries.get(key)
+        if self.policy is CachePolicy.AVERAGE and entry is not None:
+            # Weighted by the number of accumulated images of each measurement
+            entry.value = (entry.value * entry.frames + value * frames) / (entry.frames + frames)
+            entry.samples += 1
+            entry.frames += frames
+            entry.timestamp = time.monotonic()
+        else:
+            entry = self.entries[key] = CachedEvaluation(value, 1, time.monotonic(), frames)
+        return entry.value
+
+    def log_statistics(self) -> None:
+        logger.info(
+            f"Evaluation cache ({self.policy.value}): {self.stats.hits} hits, {self.stats.misses} misses, "
+            f"hit rate {100 * self.stats.hit_rate:.1f}%"
+        )
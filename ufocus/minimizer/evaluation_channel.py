@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from concurrent.futures import CancelledError, Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from itertools import count
+from math import nan
+from threading import Lock
+from typing import Optional
+
+from image_processing.image_processing import DetectedEllipse
+from minimizer.exceptions import EvaluationCancelledError, EvaluationTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EvaluationRequest:
+    """Request to measure the beam spot at a setpoint with a number of accumulated images."""
+
+    id: int
+    setpoint: list[float]
+    frames: int
+    submitted: float = field(default_factory=time.monotonic)
+    completed: float = nan
+
+    @property
+    def latency(self) -> float:
+        return self.completed - self.submitted
+
+
+class EvaluationChannel:
+    """
+    Request/response channel between the minimizer and the image processing pipeline.
+
+    Every request gets an id and a future. The pipeline answers with the id of the
+    request it measured, so late answers of timed out or cancelled requests are
+    dropped instead of being taken for the answer of the next request, and an answer
+    that arrives before the minimizer starts waiting is never lost. Once `cancel_all`
+    has been called the channel is closed and refuses any new request.
+    """
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.ids = count(1)
+        self.pending: dict[int, tuple[EvaluationRequest, Future]] = {}
+        self.completed: list[EvaluationRequest] = []
+        self.closed = False
+
+    def submit(self, setpoint, frames: int) -> tuple[EvaluationRequest, Future]:
+        request = EvaluationRequest(next(self.ids), [float(v) for v in setpoint], frames)
+        future: Future = Future()
+        with self.lock:
+            if self.closed:
+                raise EvaluationCancelledError(f"Evaluation request {request.id} was submitted after the channel was closed")
+            self.pending[request.id] = (request, future)
+        logger.debug(f"Submitted evaluation request {request.id}: {request.setpoint}, {frames} images")
+        return request, future
+
+    def resolve(self, request_id: int, ellipse: DetectedEllipse) -> None:
+        with self.lock:
+            entry = self.pending.pop(request_id, None)
+        if entry is None:
+            logger.warning(f"Dropped the result of evaluation request {request_id}, it is no longer pending")
+            return
+        request, future = entry
+        request.completed = time.monotonic()
+        self.completed.append(request)
+        future.set_result(ellipse)
+        logger.debug(f"Evaluation request {request_id} completed in {request.latency:.3f} s")
+
+    def result(self, request: EvaluationRequest, future: Future, timeout: Optional[float] = None) -> DetectedEllipse:
+        """Wait for the result of a request, cancelling it if it does not arrive within `timeout` seconds."""
+        if self.closed and not future.done():
+            raise EvaluationCancelledError(f"Evaluation request {request.id} was cancelled")
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            self.cancel(request.id)
+            raise EvaluationTimeoutError(f"Evaluation request {request.id} timed out after {timeout:.1f} s")
+        except CancelledError:
+            raise EvaluationCancelledError(f"Evaluation request {request.id} was cancelled")
+
+    def cancel(self, request_id: int) -> None:
+        with self.lock:
+            entry = self.pending.pop(request_id, None)
+        if entry is not None:
+            entry[1].cancel()
+
+    def cancel_all(self) -> None:
+        """Cancel the pending requests and close the channel."""
+        with self.lock:
+            self.closed = True
+            entries = list(self.pending.values())
+            self.pending.clear()
+        for _, future in entries:
+            future.cancel()
+        if entries:
+            logger.info(f"Cancelled {len(entries)} pending evaluation requests")
@@ -0,0 +1,10 @@
+class EvaluationTimeoutError(Exception):
+    """Exception raised when an objective function evaluation is not answered in time."""
+
+    pass
+
+
+class EvaluationCancelledError(Exception):
+    """Exception raised when a pending objective function evaluation is cancelled."""
+
+    pass
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from collections import deque
+from math import log
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class FidelitySchedule:
+    """
+    Number of images to accumulate per objective function evaluation.
+
+    The spread of the last `window` evaluated setpoints tracks the size of the
+    simplex (or trust region) of the optimizer: while it is larger than
+    `coarse_spread` the objective differences are large and `min_frames` are
+    enough; as it shrinks towards `fine_spread` the accumulation is increased
+    geometrically up to `max_frames`, where the noise matters.
+    """
+
+    def __init__(
+        self,
+        min_frames: int,
+        max_frames: int,
+        coarse_spread: float,
+        fine_spread: float,
+        window: int = 3,
+    ) -> None:
+        self.min_frames = max(1, min(min_frames, max_frames))
+        self.max_frames = max_frames
+        self.coarse_spread = coarse_spread
+        self.fine_spread = min(fine_spread, coarse_spread)
+        self.recent: deque[np.ndarray] = deque(maxlen=window)
+
+    @classmethod
+    def for_bounds(
+        cls,
+        min_frames: int,
+        max_frames: int,
+        bounds: list[tuple[float, float]],
+        coarse: float = 0.25,
+        fine: float = 0.05,
+    ) -> "FidelitySchedule":
+        """Schedule with the coarse and fine spreads given as fractions of the smallest bound span."""
+        span = max(min(upper - lower for lower, upper in bounds), 1e-6)
+        return cls(min_frames, max_frames, coarse * span, fine * span)
+
+    @property
+    def enabled(self) -> bool:
+        return self.min_frames < self.max_frames
+
+    def observe(self, x) -> None:
+        self.recent.append(np.asarray(x, dtype=float))
+
+    def spread(self) -> float:
+        if len(self.recent) < 2:
+            return self.coarse_spread
+        points = np.array(self.recent)
+        return float((points.max(axis=0) - points.min(axis=0)).max())
+
+    def frames(self) -> int:
+        if not self.enabled:
+            return self.max_frames
+        spread = self.spread()
+        if spread >= self.coarse_spread:
+            return self.min_frames
+        if spread <= self.fine_spread:
+            return self.max_frames
+        t = log(self.coarse_spread / spread) / log(self.coarse_spread / self.fine_spread)
+        return round(self.min_frames * (self.max_frames / self.min_frames) ** t)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+from bisect import bisect_left, insort
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from math import isfinite, sqrt
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+from dirs import BASE_PATH
+from image_processing.image_processing import DetectedEllipse
+
+HISTORY_PATH: Path = BASE_PATH / "focus_history.jsonl"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BeamParameters:
+    """Beam and lens configuration entered by the operator."""
+
+    ion: str = ""
+    energy: float = 0.0  # MeV
+    lenses: str = ""
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.ion.strip().lower(), self.lenses.strip().lower()
+
+
+@dataclass
+class FocusRecord:
+    """Outcome of a completed focusing run."""
+
+    beam: BeamParameters
+    currents: list[float]
+    objective: float
+    ellipse: dict = field(default_factory=dict)
+    optimizer: str = ""
+    nfev: int = 0
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FocusRecord":
+        return cls(**{**data, "beam": BeamParameters(**data["beam"])})
+
+    @staticmethod
+    def ellipse_to_dict(ellipse: DetectedEllipse) -> dict:
+        return {k: getattr(ellipse, k) for k in ("x_c", "y_c", "minor", "major", "angle")}
+
+
+@dataclass
+class WarmStart:
+    """Initial point and step size derived from a past solution."""
+
+    x0: list[float]
+    initial_step: float
+    record: FocusRecord
+
+
+class FocusHistory:
+    """
+    Persistent history of focus solutions, one JSON record per line.
+
+    Records are indexed by (ion, lens configuration) and sorted by energy, so that
+    the solution of the closest energy is found with a binary search. The file is
+    only ever appended to, so that a crash cannot corrupt past records.
+    """
+
+    def __init__(self, path: Path = HISTORY_PATH) -> None:
+        self.path = path
+        self.lock = Lock()
+        self.index: dict[tuple[str, str], list[tuple[float, str, FocusRecord]]] = {}
+        self.load()
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self.index.values())
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        with open(self.path, "r") as file:
+            for n, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    self.insert(FocusRecord.from_dict(json.loads(line)))
+                except (json.JSONDecodeError, KeyError, TypeError) as err:
+                    logger.warning(f"Ignoring invalid record at line {n} of {self.path}: {err}")
+        logger.info(f"Loaded {len(self)} focus solutions from {self.path}")
+
+    def insert(self, record: FocusRecord) -> None:
+        insort(
+            self.index.setdefault(record.beam.key, []),
+            (record.beam.energy, record.timestamp, record),
+            key=lambda item: item[:2],
+        )
+
+    def add(self, record: FocusRecord) -> None:
+        """Store a new solution, in memory and on disk."""
+        with self.lock:
+            self.insert(record)
+            with open(self.path, "a") as file:
+                file.write(json.dumps(asdict(record)) + "\n")
+        logger.info(f"Stored focus solution {record.currents} for {record.beam}")
+
+    def nearest(self, beam: BeamParameters) -> Optional[FocusRecord]:
+        """Return the solution with the closest energy for the same ion and lenses, the latest one on ties."""
+        records = self.index.get(beam.key)
+        if not records:
+            return None
+        i = bisect_left(records, beam.energy, key=lambda item: item[0])
+        candidates = records[max(i - 1, 0) : i + 1]
+        distance = min(abs(energy - beam.energy) for energy, _, _ in candidates)
+        return max(
+            (item for item in candidates if abs(item[0] - beam.energy) == distance),
+            key=lambda item: item[1],
+        )[2]
+
+    def warm_start(self, beam: BeamParameters, min_step: float = 0.02) -> Optional[WarmStart]:
+        """
+        Derive the initial point and step size for `beam` from the closest past solution.
+
+        The quadrupole strength scales with the magnetic rigidity, i.e. with the square root
+        of the energy for non-relativistic ions, so the currents of a solution at a different
+        energy are rescaled and the step grows with the size of the correction.
+        """
+        record = self.nearest(beam)
+        if record is None:
+            return None
+        if record.beam.energy > 0 and beam.energy > 0:
+            scale = sqrt(beam.energy / record.beam.energy)
+        else:
+            scale = 1.0
+        x0 = [scale * c for c in record.currents]
+        correction = max(abs(a - b) for a, b in zip(x0, record.currents))
+        step = max(min_step, 0.5 * correction)
+        if not all(isfinite(c) for c in x0):
+            return None
+        return WarmStart(x0, step, record)
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from math import isqrt
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+from scipy.optimize import OptimizeResult
+
+from minimizer.history import BeamParameters, FocusRecord, WarmStart
+from minimizer.optimizer_base import Optimizer, OptimizerOptions
+
+logger = logging.getLogger(__name__)
+
+
+def serpentine(shape: tuple[int, int], start: tuple[int, int] = (0, 0)) -> Iterator[tuple[int, int]]:
+    """
+    Indices (row, column) of a grid, row by row and alternating the direction of the rows,
+    starting from the corner `start`, so that every step only moves one power supply by
+    one grid step.
+    """
+    rows, columns = shape
+    row_order = range(rows) if start[0] == 0 else range(rows - 1, -1, -1)
+    forward = start[1] == 0
+    for row in row_order:
+        for column in range(columns) if forward else range(columns - 1, -1, -1):
+            yield row, column
+        forward = not forward
+
+
+@dataclass
+class Landscape:
+    """
+    Objective measured over a grid of (Q1, Q2/3) currents, rows along Q2/3.
+
+    Points that were not measured are NaN, like those where no spot was detected. A saved
+    landscape serves as an offline test objective, interpolated in log space, and as
+    the warm start of a minimization.
+    """
+
+    q1: np.ndarray
+    q2: np.ndarray
+    values: Optional[np.ndarray] = None
+    measured: Optional[np.ndarray] = None
+    # Images accumulated per point
+    frames: int = 0
+    beam: dict = field(default_factory=dict)
+    powers: list[float] = field(default_factory=lambda: [1, 2])
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    interpolator: Optional[RegularGridInterpolator] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        shape = (len(self.q2), len(self.q1))
+        if self.values is None:
+            self.values = np.full(shape, np.nan)
+        if self.measured is None:
+            self.measured = np.zeros(shape, dtype=bool)
+
+    @classmethod
+    def grid(cls, bounds, points: int, **kwargs) -> "Landscape":
+        (lower1, upper1), (lower2, upper2) = bounds
+        return cls(np.linspace(lower1, upper1, points), np.linspace(lower2, upper2, points), **kwargs)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.values.shape
+
+    def point(self, row: int, column: int) -> np.ndarray:
+        return np.array([self.q1[column], self.q2[row]])
+
+    def best(self) -> Optional[tuple[np.ndarray, float]]:
+        if np.isnan(self.values).all():
+            return None
+        row, column = np.unravel_index(np.nanargmin(self.values), self.shape)
+        return self.point(row, column), float(self.values[row, column])
+
+    def snapshot(self) -> "Landscape":
+        """Copy of the measured values, which can be handed over to another thread."""
+        return replace(self, values=self.values.copy(), measured=self.measured.copy())
+
+    def __call__(self, x) -> float:
+        """Objective interpolated between the grid points, for testing optimizers offline."""
+        if self.interpolator is None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                log_values = np.log(self.values)
+            finite = np.isfinite(log_values)
+            if not finite.any():
+                return np.nan
+            # Points of the grid without a detected spot are as bad as the worst measured one
+            log_values[~finite] = log_values[finite].max()
+            self.interpolator = RegularGridInterpolator((self.q2, self.q1), log_values)
+        x = np.clip(np.asarray(x, dtype=float), [self.q1[0], self.q2[0]], [self.q1[-1], self.q2[-1]])
+        return float(np.exp(self.interpolator([[x[1], x[0]]])[0]))
+
+    def warm_start(self) -> Optional[WarmStart]:
+        """Start a minimization at the best grid point, with steps of one grid spacing."""
+        best = self.best()
+        if best is None:
+            return None
+        x, value = best
+        step = float(max(np.diff(self.q1).max(initial=0.0), np.diff(self.q2).max(initial=0.0)))
+        record = FocusRecord(
+            BeamParameters(**self.beam), [float(v) for v in x], value, optimizer=LandscapeScan.name, timestamp=self.timestamp
+        )
+        return WarmStart([float(v) for v in x], step, record)
+
+    def save(self, path: Path) -> None:
+        """Replace the landscape file atomically, it is saved after every row of the scan."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        metadata = {"frames": self.frames, "beam": self.beam, "powers": self.powers, "timestamp": self.timestamp}
+        with tmp.open(mode="wb") as file:
+            np.savez(
+                file, q1=self.q1, q2=self.q2, values=self.values, measured=self.measured, metadata=json.dumps(metadata)
+            )
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "Landscape":
+        with np.load(path) as data:
+            metadata = json.loads(str(data["metadata"]))
+            return cls(data["q1"], data["q2"], data["values"], data["measured"], **metadata)
+
+
+class LandscapeScan(Optimizer):
+    """
+    Measure the objective on a regular grid spanning the bounds instead of minimizing it.
+
+    The grid is traversed in serpentine order from the corner closest to `x0`, so that
+    the power supplies only make small steps and settle quickly. The grid is the
+    largest square one with at most `maxfev` points, `points` per axis by default.
+    The landscape is passed to `on_update` after every point and to `on_row` after
+    every row, and the best grid point is returned as the solution. `metadata` is
+    stored with the landscape.
+    """
+
+    name = "Landscape scan"
+    # Every point is measured with the full number of images, so that the surface is uniform
+    adaptive_fidelity = False
+
+    def __init__(self, points: int = 15) -> None:
+        self.points = points
+        self.landscape: Optional[Landscape] = None
+        self.metadata: dict = {}
+        self.on_update: Optional[Callable[[Landscape], None]] = None
+        self.on_row: Optional[Callable[[Landscape], None]] = None
+
+    def minimize(self, fun, x0, bounds, callback=None, options=None) -> OptimizeResult:
+        options = options if options is not None else OptimizerOptions()
+        self.check_bounds(bounds)
+        points = max(2, isqrt(options.maxfev)) if options.maxfev else self.points
+        landscape = self.landscape = Landscape.grid(bounds, points, **self.metadata)
+        logger.info(f"Scanning the objective on a {points} x {points} grid")
+
+        # Start from the corner closest to the initial point
+        start = (
+            int(abs(x0[1] - landscape.q2[-1]) < abs(x0[1] - landscape.q2[0])),
+            int(abs(x0[0] - landscape.q1[-1]) < abs(x0[0] - landscape.q1[0])),
+        )
+        nfev = nit = 0
+        for row, column in serpentine(landscape.shape, start):
+            landscape.values[row, column] = fun(landscape.point(row, column))
+            landscape.measured[row, column] = True
+            nfev += 1
+            if self.on_update is not None:
+                self.on_update(landscape)
+            if nfev % points == 0:
+                nit += 1
+                if self.on_row is not None:
+                    self.on_row(landscape)
+                if callback is not None and (best := landscape.best()) is not None:
+                    callback(OptimizeResult(x=best[0], fun=best[1], nit=nit, nfev=nfev))
+
+        best = landscape.best()
+        if best is None:
+            return OptimizeResult(
+                x=np.asarray(x0, dtype=float), fun=np.nan, nit=nit, nfev=nfev, status=3, success=False,
+                message="No spot was detected anywhere on the grid.",
+            )
+        return OptimizeResult(
+            x=best[0], fun=best[1], nit=nit, nfev=nfev, status=0, success=True, message="Landscape scan completed."
+        )
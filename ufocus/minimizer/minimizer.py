@@ -1,22 +1,38 @@
 # -*- coding: utf-8 -*-
 
 import logging
-from dataclasses import dataclass
+import time
+from dataclasses import asdict, dataclass
+from datetime import date
 from math import inf, isnan, nan
+from random import getrandbits
+from typing import Optional
 
 from PySide6.QtCore import (
-    QMutex,
     QObject,
     QRunnable,
-    QWaitCondition,
     Signal,
     Slot,
 )
-from scipy.optimize import OptimizeResult, minimize
+from scipy.optimize import OptimizeResult
 
+from catalogue import catalogue
+from image_processing.analysis import objective
 from image_processing.image_processing import DetectedEllipse
+from journal import RunJournal
+from minimizer.checkpoint import Checkpoint, RecordedEvaluation, Replay
+from minimizer.evaluation_cache import EvaluationCache
+from minimizer.evaluation_channel import EvaluationChannel, EvaluationRequest
+from minimizer.exceptions import EvaluationCancelledError, EvaluationTimeoutError
+from minimizer.fidelity import FidelitySchedule
+from minimizer.history import BeamParameters, FocusRecord
+from minimizer.landscape import Landscape, LandscapeScan
+from minimizer.optimizer_base import Optimizer, OptimizerOptions
+from minimizer.optimizers import OPTIMIZERS
+from profiling import profiled, profiler
 from ps_controller import PSController
 from settings_manager import SettingsManager
+from tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -50,8 +66,11 @@ class MinimizerSignals(QObject):
     updateCurrent = Signal(list)
     updateFunction = Signal(float)
     inAccumulation = Signal(bool)
+    imagesToAccumulate = Signal(int)
+    evaluationRequested = Signal(EvaluationRequest)
     controlTimer = Signal(bool)
     updateStats = Signal(PSCurrentsInfo, ObjectiveFunctionInfo)
+    landscapeUpdated = Signal(Landscape)
     finished = Signal()
 
 
@@ -59,17 +78,18 @@ class Minimizer(QRunnable):
     def __init__(
         self,
         pscontroller: PSController,
-        mutex: QMutex,
-        condition: QWaitCondition,
         parent=None,
+        resume: Optional[Checkpoint] = None,
     ) -> None:
         super().__init__(parent)
         self.parent = parent
         self.pscontroller = pscontroller
         self.control = False
-        self.res = None
-        self.mutex = mutex
-        self.condition = condition
+        self.channel = EvaluationChannel()
+        # Time allowed for the settling of the spot and the accumulation of the images of an evaluation
+        self.evaluation_timeout = 10.0
+        self.evaluation_timeout_per_frame = 1.0
+        self.stop_reason = "Ended manually by user."
         self.solution = None
         self.settings_manager = SettingsManager()
         self.settings_manager.saveUserSettings()
@@ -79,12 +99,71 @@ class Minimizer(QRunnable):
         self.forced_termination = False
         self.numerator_pow = 1
         self.denominator_pow = 2
+        self.cache = EvaluationCache(
+            policy=self.parent.comboboxCachePolicy.currentData(),
+            max_age=self.parent.spinboxCacheMaxAge.value(),
+            max_samples=self.parent.spinboxCacheSamples.value(),
+        )
+        self.measurements = 0
+        self.resume = resume
+        self.replay = None
+        self.warm_start = None
+        if resume is not None:
+            # The run continues with the setup of the checkpoint, whatever the current options
+            self.optimizer: Optimizer = next(o for o in OPTIMIZERS if o.name == resume.optimizer)()
+            self.beam = BeamParameters(**resume.beam)
+            self.seed = resume.seed
+            self.bounds = [tuple(b) for b in resume.bounds]
+            min_frames, max_frames = resume.fidelity
+            self.replay = Replay(resume.evaluations)
+        else:
+            self.optimizer: Optimizer = self.parent.comboboxOptimizer.currentData()()
+            self.beam = BeamParameters(
+                ion=self.parent.lineEditIon.text(),
+                energy=self.parent.spinboxBeamEnergy.value(),
+                lenses=self.parent.lineEditLenses.text(),
+            )
+            self.seed = getrandbits(31)
+            self.bounds = [
+                (self.parent.spinboxMinPS1.value(), self.parent.spinboxMaxPS1.value()),
+                (self.parent.spinboxMinPS2.value(), self.parent.spinboxMaxPS2.value()),
+            ]
+            min_frames = self.parent.spinboxMinImagesToAccumulate.value() or self.parent.spinboxImagesToAccumulate.value()
+            max_frames = self.parent.spinboxImagesToAccumulate.value()
+            if self.parent.checkboxWarmStart.isChecked():
+                self.warm_start = self.landscape_warm_start() or self.parent.focusHistory.warm_start(self.beam)
+                if self.warm_start is None:
+                    logger.info(f"No previous solution found for {self.beam}")
+            if not self.optimizer.adaptive_fidelity:
+                min_frames = max_frames
+        self.optimizer.seed = self.seed
+        self.best_ellipse = DetectedEllipse()
+        self.fidelity = FidelitySchedule.for_bounds(min_frames=min_frames, max_frames=max_frames, bounds=self.bounds)
+        self.frames = self.fidelity.max_frames
+        self.frames_used = 0
+        self.confirmations = 3
+        # Relative change of the best objective value tolerated when resuming from a checkpoint
+        self.verify_tolerance = 0.5
+        self.evaluations: list[tuple[list[float], float, int]] = []
+        # Key of the run in the journal and checkpoint filenames and in the catalogue
+        self.key = f"{date.today()}_{time.time_ns()}"
+        self.run_path = self.parent.runDataPath()
+        self.journal = RunJournal(self.run_path / f"journal_{self.key}.csv")
+        self.checkpoint = None
+        self.checkpoint_path = self.run_path / f"checkpoint_{self.key}.json"
+        self.landscape_path = self.run_path / f"landscape_{self.key}.npz"
+        self.request_id = None
 
         logger.info("Minimizer initialized")
         self.signals.updateStats.emit(self.ps_currents_stats, self.obj_func_stats)
 
     def run(self) -> None:
-        logger.info("Minimizer started")
+        logger.info(f"Minimizer started ({self.optimizer.name})")
+        tracer.set_thread_name("Minimizer")
+        # A fresh channel for this run, closed right away if it was stopped before it started
+        self.channel = EvaluationChannel()
+        if self.control:
+            self.channel.cancel_all()
         self.signals.controlTimer.emit(True)
         self.signals.inAccumulation.emit(False)
 
@@ -92,10 +171,15 @@ class Minimizer(QRunnable):
             self.parent.spinboxInitialPS1.value(),
             self.parent.spinboxInitialPS2.value(),
         ]
-        bounds = [
-            (self.parent.spinboxMinPS1.value(), self.parent.spinboxMaxPS1.value()),
-            (self.parent.spinboxMinPS2.value(), self.parent.spinboxMaxPS2.value()),
-        ]
+        bounds = self.bounds
+        initial_step = None
+        if self.warm_start is not None:
+            initial = [min(max(x, lower), upper) for x, (lower, upper) in zip(self.warm_start.x0, bounds)]
+            initial_step = self.warm_start.initial_step
+            logger.info(
+                f"Warm start from the solution of {self.warm_start.record.timestamp} "
+                f"({self.warm_start.record.beam}): x0 = {initial}, initial step = {initial_step:.3f} A"
+            )
         try:
             self.numerator_pow, self.denominator_pow = eval(self.parent.lineEditObjFuncPowers.text())
         except (SyntaxError, ValueError) as err:
@@ -103,44 +187,120 @@ class Minimizer(QRunnable):
             logger.warning(f"Falling back to default values [{self.numerator_pow}, {self.denominator_pow}] "
                 "for the numerator and the denominator, respectively"
             )
+        options = OptimizerOptions(
+            xatol=float(self.parent.spinboxXATol.text()),
+            fatol=float(self.parent.spinboxFATol.text()),
+            maxiter=self.parent.spinboxMaxIter.value() if self.parent.spinboxMaxIter.value() != 0 else None,
+            maxfev=self.parent.spinboxMaxFEval.value() if self.parent.spinboxMaxFEval.value() != 0 else None,
+            initial_step=initial_step,
+        )
+        if self.resume is not None:
+            initial = self.resume.x0
+            options = OptimizerOptions(**self.resume.options)
+            self.numerator_pow, self.denominator_pow = self.resume.powers
+        self.checkpoint = Checkpoint(
+            optimizer=self.optimizer.name,
+            seed=self.seed,
+            x0=[float(x) for x in initial],
+            bounds=[list(b) for b in bounds],
+            options=asdict(options),
+            powers=[self.numerator_pow, self.denominator_pow],
+            fidelity=[self.fidelity.min_frames, self.fidelity.max_frames],
+            beam=asdict(self.beam),
+        )
 
+        profiler.reset()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
         try:
-            self.solution: OptimizeResult = minimize(
+            # Inside the try, so that the GUI is released even if the run data cannot be written
+            self.journal.open()
+            catalogue.begin_run(
+                self.key, self.run_path, self.optimizer.name, self.seed, asdict(self.beam), self.settings_manager.user_settings
+            )
+            if isinstance(self.optimizer, LandscapeScan):
+                self.setup_scan()
+            if self.resume is not None:
+                self.verify_checkpoint()
+            self.solution: OptimizeResult = self.optimizer.minimize(
                 fun=self.function,
                 x0=initial,
-                method="Nelder-Mead",
                 bounds=bounds,
                 callback=self.callback,
-                options={
-                    "return_all": True,
-                    "xatol": float(self.parent.spinboxXATol.text()),
-                    "fatol": float(self.parent.spinboxFATol.text()),
-                    "maxiter": self.parent.spinboxMaxIter.value() if self.parent.spinboxMaxIter.value() != 0 else None,
-                    "maxfev": self.parent.spinboxMaxFEval.value() if self.parent.spinboxMaxFEval.value() != 0 else None,
-                    "disp": True,
-                },
+                options=options,
             )
+            self.confirm_solution()
         except StopIteration:
             logger.warning("Early stopping")
             self.solution = OptimizeResult(
-                fun=nan, nit=0, nfev=0, status=99, x=[nan, nan]
+                fun=nan, nit=0, nfev=0, status=99, x=[nan, nan], message=self.stop_reason
             )
         except ValueError:
             logger.error(f"Incorrect bounds: {bounds}")
             self.signals.boundsError.emit()
+        except OSError as err:
+            logger.error(f"Could not write the run data to {self.run_path}: {err}")
+            self.solution = OptimizeResult(
+                fun=nan, nit=0, nfev=0, status=99, x=[nan, nan], message="The run data could not be written."
+            )
         else:
             logger.info(f"Solution: {self.solution.x}")
+            logger.info(
+                f"Minimization took {time.perf_counter() - wall_start:.2f} s "
+                f"({time.process_time() - cpu_start:.2f} s CPU) for {self.solution.nfev} function evaluations, "
+                f"{self.measurements} of them measured with {self.frames_used} images in total"
+            )
+            self.cache.log_statistics()
+            profiler.log_summary()
             if not self.forced_termination:
-                self.signals.setCurrent.emit(self.solution.x)
+                self.setPSCurrents(self.solution.x)
+                self.store_solution()
+                self.checkpoint.finished = True
+                self.checkpoint.save(self.checkpoint_path)
         finally:
             if not self.forced_termination:
                 self.pscontroller.refreshGUI()
                 self.pscontroller.updateDialValue(self.pscontroller.ps1, self.parent.psLCD1)
                 self.pscontroller.updateDialValue(self.pscontroller.ps2, self.parent.psLCD2)
+            self.signals.imagesToAccumulate.emit(self.fidelity.max_frames)
+            self.journal.close()
+            if isinstance(self.optimizer, LandscapeScan) and self.optimizer.landscape is not None:
+                self.optimizer.landscape.save(self.landscape_path)
+            solution = self.solution if self.solution is not None else OptimizeResult(fun=nan, nfev=0, x=[nan, nan], message="")
+            catalogue.end_run(
+                self.key,
+                self.checkpoint.finished,
+                solution.message,
+                int(solution.nfev),
+                self.measurements,
+                solution.x,
+                solution.fun,
+                self.best_ellipse,
+            )
             logger.info("Minimization process finished")
             self.signals.controlTimer.emit(False)
             self.signals.finished.emit()
 
+    def landscape_warm_start(self):
+        """Warm start from the best point of the landscape shown in the plots, if it was scanned with the same beam."""
+        landscape = self.parent.plotting.landscapeView.landscape
+        if landscape is None or isinstance(self.optimizer, LandscapeScan):
+            return None
+        beam = BeamParameters(**landscape.beam)
+        if beam.key != self.beam.key or beam.energy != self.beam.energy:
+            return None
+        return landscape.warm_start()
+
+    def setup_scan(self) -> None:
+        """Stream the landscape of the scan to the heatmap and save it after every row."""
+        self.optimizer.metadata = dict(
+            frames=self.fidelity.max_frames,
+            beam=asdict(self.beam),
+            powers=[self.numerator_pow, self.denominator_pow],
+        )
+        self.optimizer.on_update = lambda landscape: self.signals.landscapeUpdated.emit(landscape.snapshot())
+        self.optimizer.on_row = lambda landscape: landscape.save(self.landscape_path)
+
     def callback(self, intermediate_result: OptimizeResult) -> None:
         logger.info(
             f"=== ITERATION ENDED ===\n"
@@ -160,38 +320,40 @@ class Minimizer(QRunnable):
             logger.info(
                 f"Obj. Func. called with parameters: {x[0]:.4f} A, {x[1]:.4f} A"
             )
-            # These values are to be sent to the power supplies
-            self.signals.updateCurrent.emit(x)
-
-            # Set currents to the power supplies
-            # Blocks until the function returns
-            self.setPSCurrents(x)
-
-            # time.sleep(0.1)
-            # Retrieve the values of what is to be minimized
-            self.mutex.lock()
-            try:
-                logger.debug("Lock acquired from minimizer")
-                self.signals.inAccumulation.emit(True)
-                self.condition.wait(self.mutex)
-                ellipse = self.set_res()
-            finally:
-                self.mutex.unlock()
-                logger.debug("Lock released from minimizer")
-                self.signals.inAccumulation.emit(False)
+            self.fidelity.observe(x)
+            frames = self.fidelity.frames()
+            if (cached := self.cache.lookup(x, frames)) is not None:
+                logger.info(f"Obj. Func. return value from cache: {cached:.2f}")
+                return cached
+            if self.replay and (recorded := self.replay.next(x, frames)) is not None:
+                return self.replay_evaluation(x, recorded)
 
             # The function evaluation happens at this step and this is what the minimizer
             # uses to decide the next step. At this point maybe the value could be sent
             # to someplace else inside the code. The same functionality could be achieved
             # with the callback function.
-            res = ellipse.area**self.numerator_pow / ellipse.circularity**self.denominator_pow
+            profiler.begin_evaluation()
+            try:
+                res, ellipse = self.measure(x, frames)
+                self.checkpoint.add(x, res, frames, FocusRecord.ellipse_to_dict(ellipse))
+                with profiler.span("checkpoint"):
+                    self.checkpoint.save(self.checkpoint_path)
+                res = self.cache.store(x, res, frames)
+                self.evaluations.append(([float(v) for v in x], res, frames))
 
-            self.signals.updateFunction.emit(res)
+                profiler.mark("function signal")
+                self.signals.updateFunction.emit(res)
 
-            self.update_statistics(x, res)
-            self.signals.updateStats.emit(self.ps_currents_stats, self.obj_func_stats)
+                self.update_statistics(x, res)
+                if res == self.obj_func_stats.min_val:
+                    self.best_ellipse = ellipse
+                self.signals.updateStats.emit(self.ps_currents_stats, self.obj_func_stats)
 
-            self.pscontroller.refreshGUI()
+                with profiler.span("refresh status"):
+                    self.pscontroller.refreshGUI()
+            finally:
+                profiler.end_evaluation()
+            self.record(x, res, frames, ellipse)
 
             logger.info(f"Obj. Func. return value: {res:.2f}")
             logger.info(f"Objective funcion statistics: {self.obj_func_stats}")
@@ -200,16 +362,154 @@ class Minimizer(QRunnable):
             raise StopIteration
         return res
 
-    @Slot(DetectedEllipse)
-    def get_res(self, ellipse_data: DetectedEllipse) -> None:
-        logger.debug("Got values from image processing")
-        self.res = ellipse_data
-        self.condition.wakeAll()
+    def replay_evaluation(self, x, recorded: RecordedEvaluation) -> float:
+        """Feed a recorded evaluation of the resumed run to the optimizer, as if it was measured."""
+        self.checkpoint.add(x, recorded.value, recorded.frames, recorded.ellipse)
+        if not self.replay:
+            self.checkpoint.save(self.checkpoint_path)
+            logger.info(f"Replayed the {self.replay.replayed} evaluations of the checkpoint")
+        res = self.cache.store(x, recorded.value, recorded.frames)
+        self.evaluations.append(([float(v) for v in x], res, recorded.frames))
 
-    def set_res(self) -> DetectedEllipse:
-        logger.debug("Set values to minimizer")
-        return self.res
+        self.signals.updateCurrent.emit(x)
+        self.signals.updateFunction.emit(res)
+        self.update_statistics(x, res)
+        if res == self.obj_func_stats.min_val:
+            self.best_ellipse = DetectedEllipse(**recorded.ellipse)
+        self.signals.updateStats.emit(self.ps_currents_stats, self.obj_func_stats)
+
+        logger.info(f"Obj. Func. return value from checkpoint: {res:.2f}")
+        return res
+
+    def verify_checkpoint(self) -> None:
+        """Measure the best point of the resumed run once, to check that the beam did not change meanwhile."""
+        best = self.resume.best
+        if best is None:
+            return
+        logger.info(
+            f"Resuming from {len(self.resume.evaluations)} evaluations of {self.resume.timestamp}, "
+            f"best: {best.x[0]:.4f} A, {best.x[1]:.4f} A (Obj. Func. = {best.value:.2f})"
+        )
+        profiler.begin_evaluation()
+        try:
+            res, ellipse = self.measure(best.x, self.fidelity.max_frames)
+        finally:
+            profiler.end_evaluation()
+        self.record(best.x, res, self.fidelity.max_frames, ellipse)
+        self.signals.updateFunction.emit(res)
+
+        logger.info(f"Best point re-measured: Obj. Func. = {res:.2f}")
+        if isnan(res) or abs(res - best.value) > self.verify_tolerance * best.value:
+            logger.warning(
+                f"The objective of the best point changed by more than {100 * self.verify_tolerance:.0f}% "
+                "since the checkpoint, the beam may have changed"
+            )
+
+    def record(self, x, value: float, frames: int, ellipse: DetectedEllipse) -> None:
+        """Write a measured evaluation to the run journal and to the catalogue."""
+        timings = profiler.last_evaluation()
+        self.journal.append(ellipse, x, value, frames, timings)
+        catalogue.add_evaluation(
+            self.key, self.request_id, x, value, frames, ellipse, timings.get(profiler.EVALUATION, 0.0)
+        )
+
+    def measure(self, x, frames: int) -> tuple[float, DetectedEllipse]:
+        """Set the currents and measure the objective function with `frames` accumulated images."""
+        if frames != self.frames:
+            logger.info(f"Accumulating {frames} images per evaluation")
+            self.frames = frames
+            self.signals.imagesToAccumulate.emit(frames)
+
+        # These values are to be sent to the power supplies
+        self.signals.updateCurrent.emit(x)
+
+        # Set currents to the power supplies
+        # Blocks until the function returns
+        self.setPSCurrents(x)
+
+        # Retrieve the values of what is to be minimized
+        try:
+            request, future = self.channel.submit(x, frames)
+            self.request_id = request.id
+            self.signals.evaluationRequested.emit(request)
+            with profiler.span("wait for image processing"):
+                ellipse = self.channel.result(
+                    request, future, self.evaluation_timeout + self.evaluation_timeout_per_frame * frames
+                )
+        except EvaluationTimeoutError as err:
+            logger.error(err)
+            self.stop_reason = "No image processing result within the timeout."
+            self.signals.inAccumulation.emit(False)
+            raise StopIteration
+        except EvaluationCancelledError as err:
+            logger.info(err)
+            raise StopIteration
+
+        self.measurements += 1
+        self.frames_used += frames
+        return objective(ellipse, self.numerator_pow, self.denominator_pow), ellipse
+
+    def confirm_solution(self) -> None:
+        """Re-measure the best setpoints at full fidelity and keep the best of them."""
+        if not self.fidelity.enabled:
+            return
+
+        candidates = {}
+        for x, value, frames in sorted(self.evaluations, key=lambda e: e[1]):
+            if not isnan(value):
+                candidates.setdefault(self.cache.key(x), (x, value, frames))
+            if len(candidates) == self.confirmations:
+                break
+
+        best = None
+        for x, value, frames in candidates.values():
+            if self.control:
+                return
+            if frames < self.fidelity.max_frames:
+                logger.info(f"Confirming {x[0]:.4f} A, {x[1]:.4f} A (Obj. Func. = {value:.2f} with {frames} images)")
+                profiler.begin_evaluation()
+                try:
+                    res, ellipse = self.measure(x, self.fidelity.max_frames)
+                finally:
+                    profiler.end_evaluation()
+                value = self.cache.store(x, res, self.fidelity.max_frames)
+                self.record(x, value, self.fidelity.max_frames, ellipse)
+                self.signals.updateFunction.emit(value)
+            if best is None or value < best[1]:
+                best = (x, value)
+
+        if best is not None:
+            logger.info(f"Confirmed solution: {best[0]} (Obj. Func. = {best[1]:.2f})")
+            self.solution.x, self.solution.fun = best
+
+    @Slot(int, DetectedEllipse)
+    def onEvaluationDone(self, request_id: int, ellipse_data: DetectedEllipse) -> None:
+        logger.debug(f"Got values of evaluation request {request_id} from image processing")
+        self.channel.resolve(request_id, ellipse_data)
+
+    def stop(self) -> None:
+        """Stop the minimization, without waiting for the pending evaluation."""
+        self.control = True
+        self.channel.cancel_all()
+
+    def store_solution(self) -> None:
+        if not self.beam.ion.strip():
+            logger.info("Solution not stored in the focus history, the beam parameters are not set")
+            return
+        if isnan(self.solution.fun):
+            return
+        self.parent.focusHistory.add(
+            FocusRecord(
+                beam=self.beam,
+                currents=[float(c) for c in self.solution.x],
+                objective=float(self.solution.fun),
+                ellipse=FocusRecord.ellipse_to_dict(self.best_ellipse),
+                optimizer=self.optimizer.name,
+                nfev=int(self.solution.nfev),
+            )
+        )
 
+    @profiled("set currents")
     def setPSCurrents(self, x: list[float]) -> None:
         logger.info(f"Setting Q1 current to: {x[0]}")
         self.pscontroller.setPS1Current(x[0] * 100)
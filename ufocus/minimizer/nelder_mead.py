@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from scipy.optimize import OptimizeResult, minimize
+
+from minimizer.optimizer_base import Optimizer, OptimizerOptions
+
+
+class NelderMeadOptimizer(Optimizer):
+    """Downhill simplex method of scipy, the default backend of the `Minimizer`."""
+
+    name = "Nelder-Mead"
+
+    def minimize(self, fun, x0, bounds, callback=None, options=None) -> OptimizeResult:
+        options = options if options is not None else OptimizerOptions()
+        initial_simplex = None
+        if options.initial_step is not None:
+            initial_simplex = self.initial_simplex(x0, bounds, options.initial_step)
+        return minimize(
+            fun=fun,
+            x0=x0,
+            method="Nelder-Mead",
+            bounds=bounds,
+            callback=callback,
+            options={
+                "return_all": True,
+                "xatol": options.xatol,
+                "fatol": options.fatol,
+                "maxiter": options.maxiter,
+                "maxfev": options.maxfev,
+                "initial_simplex": initial_simplex,
+                "disp": True,
+            },
+        )
+
+    @staticmethod
+    def initial_simplex(x0, bounds, step: float) -> np.ndarray:
+        """Right-angled simplex with edges of length `step`, pointing away from the closer bounds."""
+        x0 = np.asarray(x0, dtype=float)
+        simplex = np.tile(x0, (len(x0) + 1, 1))
+        for i, (lower, upper) in enumerate(bounds):
+            simplex[i + 1, i] += step if upper - x0[i] >= x0[i] - lower else -step
+        return simplex
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Optional
+
+from scipy.optimize import OptimizeResult
+
+
+@dataclass
+class OptimizerOptions:
+    xatol: float = 1e-4
+    fatol: float = 1e-4
+    maxiter: Optional[int] = None
+    maxfev: Optional[int] = None
+    # Size of the first moves away from x0, None for the backend default.
+    # Backends that do not take steps from x0 ignore it.
+    initial_step: Optional[float] = None
+
+
+class Optimizer(ABC):
+    """
+    Interface of the optimization backends used by the `Minimizer`.
+
+    Backends minimize `fun` inside the box `bounds` starting from `x0`, call
+    `callback` with an intermediate `OptimizeResult` after every iteration and
+    return an `OptimizeResult` with at least `x`, `fun`, `nit`, `nfev`, `status`
+    and `message`. `StopIteration` raised by `fun` or `callback` must propagate.
+    """
+
+    name: str = ""
+    # Seed of the backends drawing random numbers, so that a run can be replayed
+    seed: Optional[int] = None
+    # Whether the number of images per evaluation may follow the `FidelitySchedule`
+    adaptive_fidelity: bool = True
+
+    @abstractmethod
+    def minimize(
+        self,
+        fun: Callable[[Sequence[float]], float],
+        x0: Sequence[float],
+        bounds: Sequence[tuple[float, float]],
+        callback: Optional[Callable[[OptimizeResult], None]] = None,
+        options: Optional[OptimizerOptions] = None,
+    ) -> OptimizeResult: ...
+
+    @staticmethod
+    def check_bounds(bounds: Sequence[tuple[float, float]]) -> None:
+        for lower, upper in bounds:
+            if lower > upper:
+                raise ValueError(f"An upper bound is less than the corresponding lower bound: {bounds}")
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+from minimizer.bayesian import BayesianOptimizer
+from minimizer.landscape import LandscapeScan
+from minimizer.nelder_mead import NelderMeadOptimizer
+from minimizer.optimizer_base import Optimizer
+from minimizer.trust_region import TrustRegionOptimizer
+
+# Backends selectable in the minimizer options, the first one is the default
+OPTIMIZERS: list[type[Optimizer]] = [
+    NelderMeadOptimizer,
+    TrustRegionOptimizer,
+    BayesianOptimizer,
+    LandscapeScan,
+]
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from PySide6.QtCore import QObject, QRunnable, Signal, Slot
+
+from image_processing.analysis import ELLIPSE_FIELDS, DetectedEllipse, objective
+from profiling import profiler
+from ps_controller import PSController
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SweepResult:
+    """Response of the beam spot along a current ramp of one power supply."""
+
+    axis: int
+    fixed: float
+    rate: float
+    powers: tuple[float, float]
+    # Read back output current of the swept supply and the time it was read
+    readback_time: np.ndarray = field(default_factory=lambda: np.empty(0))
+    readback: np.ndarray = field(default_factory=lambda: np.empty(0))
+    # Time of the analyzed frames, current interpolated at that time, detected spots (NaN without spot) and their objective
+    time: np.ndarray = field(default_factory=lambda: np.empty(0))
+    current: np.ndarray = field(default_factory=lambda: np.empty(0))
+    ellipses: list[DetectedEllipse] = field(default_factory=list)
+    values: np.ndarray = field(default_factory=lambda: np.empty(0))
+
+    def __len__(self) -> int:
+        return len(self.ellipses)
+
+    def best(self) -> Optional[tuple[float, float]]:
+        """Current and objective of the smallest spot."""
+        if np.isnan(self.values).all():
+            return None
+        i = int(np.nanargmin(self.values))
+        return float(self.current[i]), float(self.values[i])
+
+    def attribute(self, name: str) -> np.ndarray:
+        return np.array([getattr(ellipse, name) for ellipse in self.ellipses])
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open(mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["time", "current1", "current2", *ELLIPSE_FIELDS, "cost_func"])
+            t0 = self.readback_time[0] if len(self.readback_time) else 0.0
+            for t, current, ellipse, value in zip(self.time, self.current, self.ellipses, self.values):
+                currents = (current, self.fixed) if self.axis == 0 else (self.fixed, current)
+                writer.writerow(
+                    [f"{t - t0:.4f}", *currents, *(getattr(ellipse, name) for name in ELLIPSE_FIELDS), value]
+                )
+
+
+class SweepSignals(QObject):
+    sweeping = Signal(bool)
+    controlTimer = Signal(bool)
+    progress = Signal(int)
+    finished = Signal(object)
+
+
+class LineSweep(QRunnable):
+    """
+    Ramp the current of one power supply at a constant rate while the camera streams frames.
+
+    The programmed current is stepped every `interval` along the ramp and the output
+    current is read back with the time of every reading. Meanwhile the image processing
+    analyzes every frame on its own and sends the detected spot, empty if there is none,
+    with the time its frame arrived; once the ramp is done every frame is tagged with
+    the output current interpolated at that time. This gives a dense response curve in
+    a single pass, instead of paying the settling time at every point.
+    """
+
+    def __init__(
+        self,
+        pscontroller: PSController,
+        axis: int,
+        start: float,
+        stop: float,
+        rate: float,
+        fixed: float,
+        powers: tuple[float, float] = (1, 2),
+        settle: float = 1.0,
+        interval: float = 0.05,
+    ) -> None:
+        super().__init__()
+        self.pscontroller = pscontroller
+        self.axis = axis
+        self.start = start
+        self.stop_current = stop
+        self.rate = abs(rate)
+        self.fixed = fixed
+        self.powers = powers
+        self.settle = settle
+        self.interval = interval
+        self.signals = SweepSignals()
+        self.samples: list[tuple[float, DetectedEllipse]] = []
+        self.cancelled = False
+
+    @property
+    def supply(self):
+        return self.pscontroller.ps1 if self.axis == 0 else self.pscontroller.ps2
+
+    def setCurrent(self, current: float) -> None:
+        if self.axis == 0:
+            self.pscontroller.setPS1Current(current * 100)
+        else:
+            self.pscontroller.setPS2Current(current * 100)
+
+    @Slot(float, DetectedEllipse)
+    def onSample(self, timestamp: float, ellipse: DetectedEllipse) -> None:
+        """Called in the image processing thread for every frame analyzed during the sweep."""
+        self.samples.append((timestamp, ellipse))
+
+    def stop(self) -> None:
+        self.cancelled = True
+
+    def run(self) -> None:
+        tracer.set_thread_name("Line sweep")
+        axis = "Q1" if self.axis == 0 else "Q2/3"
+        logger.info(f"Sweeping {axis} from {self.start} A to {self.stop_current} A at {self.rate} A/s")
+        self.signals.controlTimer.emit(True)
+        readback_time: list[float] = []
+        readback: list[float] = []
+        try:
+            # Start from a settled beam at the beginning of the ramp
+            if self.axis == 0:
+                self.pscontroller.setPS1Current(self.start * 100)
+                self.pscontroller.setPS2Current(self.fixed * 100)
+            else:
+                self.pscontroller.setPS1Current(self.fixed * 100)
+                self.pscontroller.setPS2Current(self.start * 100)
+            time.sleep(self.settle)
+
+            self.signals.sweeping.emit(True)
+            span = self.stop_current - self.start
+            duration = abs(span) / self.rate if self.rate > 0 else 0.0
+            t0 = time.perf_counter()
+            while not self.cancelled:
+                elapsed = time.perf_counter() - t0
+                fraction = min(elapsed / duration, 1.0) if duration > 0 else 1.0
+                with profiler.span("set currents"):
+                    self.setCurrent(self.start + fraction * span)
+                before = time.perf_counter()
+                current = self.pscontroller.measuredCurrent(self.supply)
+                readback_time.append(0.5 * (before + time.perf_counter()))
+                readback.append(current)
+                self.signals.progress.emit(len(self.samples))
+                if fraction >= 1.0:
+                    break
+                time.sleep(max(0.0, self.interval - (time.perf_counter() - t0 - elapsed)))
+        finally:
+            self.signals.sweeping.emit(False)
+            self.signals.controlTimer.emit(False)
+
+        result = self.result(np.array(readback_time), np.array(readback))
+        logger.info(f"Sweep finished with {len(result)} frames over {len(readback)} current readings")
+        self.signals.finished.emit(result)
+
+    def result(self, readback_time: np.ndarray, readback: np.ndarray) -> SweepResult:
+        result = SweepResult(self.axis, self.fixed, self.rate, self.powers, readback_time, readback)
+        valid = np.isfinite(readback)
+        if valid.sum() < 2:
+            return result
+        readback_time, readback = readback_time[valid], readback[valid]
+        # Only the frames taken during the ramp can be tagged with a current
+        samples = [(t, e) for t, e in self.samples if readback_time[0] <= t <= readback_time[-1]]
+        result.time = np.array([t for t, _ in samples])
+        result.current = np.interp(result.time, readback_time, readback)
+        result.ellipses = [e for _, e in samples]
+        result.values = np.array([objective(e, *self.powers) for e in result.ellipses])
+        return result
+
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from itertools import combinations
+
+import numpy as np
+from scipy.optimize import OptimizeResult, minimize
+
+from minimizer.optimizer_base import Optimizer, OptimizerOptions
+
+logger = logging.getLogger(__name__)
+
+
+class QuadraticModel:
+    """Quadratic `c + g·s + ½ sᵀHs` in the displacement `s` from a center point."""
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+        self.pairs = [(i, i) for i in range(dim)] + list(combinations(range(dim), 2))
+        self.c = 0.0
+        self.g = np.zeros(dim)
+        self.H = np.zeros((dim, dim))
+
+    @property
+    def n_terms(self) -> int:
+        return 1 + self.dim + len(self.pairs)
+
+    def design(self, S: np.ndarray) -> np.ndarray:
+        quadratic = [S[:, i] * S[:, j] * (0.5 if i == j else 1.0) for i, j in self.pairs]
+        return np.column_stack([np.ones(len(S)), S, *quadratic])
+
+    def fit(self, S: np.ndarray, f: np.ndarray, weights: np.ndarray) -> bool:
+        """Weighted least-squares fit, returns False if the points do not determine the model."""
+        A = self.design(S) * weights[:, None]
+        coef, _, rank, _ = np.linalg.lstsq(A, f * weights, rcond=None)
+        if rank < self.n_terms:
+            return False
+        self.c = coef[0]
+        self.g = coef[1 : 1 + self.dim]
+        for (i, j), h in zip(self.pairs, coef[1 + self.dim :]):
+            self.H[i, j] = self.H[j, i] = h
+        return True
+
+    def __call__(self, s: np.ndarray) -> float:
+        return float(self.c + self.g @ s + 0.5 * s @ self.H @ s)
+
+    def gradient(self, s: np.ndarray) -> np.ndarray:
+        return self.g + self.H @ s
+
+
+class TrustRegionOptimizer(Optimizer):
+    """
+    Derivative-free trust-region method in the spirit of BOBYQA.
+
+    A quadratic model of the objective is fitted to every point measured during the
+    run, weighted by the distance from the current best point, and minimized inside
+    the intersection of the trust region and the bounds. The ratio between the actual
+    and the predicted reduction decides whether the region grows or shrinks. Since
+    the objective spans orders of magnitude, the model is fitted to its logarithm.
+    The run stops when the radius falls below `xatol`, or after `maxfev`/`maxiter`.
+    """
+
+    name = "Trust region"
+
+    def __init__(
+        self,
+        initial_radius: float = 0.2,
+        max_evaluations: int = 60,
+        eta: float = 0.1,
+    ) -> None:
+        """`initial_radius` is a fraction of the smallest bound span."""
+        self.initial_radius = initial_radius
+        self.max_evaluations = max_evaluations
+        self.eta = eta
+
+    def minimize(self, fun, x0, bounds, callback=None, options=None) -> OptimizeResult:
+        options = options if options is not None else OptimizerOptions()
+        self.check_bounds(bounds)
+
+        lower = np.array([b[0] for b in bounds], dtype=float)
+        upper = np.array([b[1] for b in bounds], dtype=float)
+        dim = len(bounds)
+        max_evaluations = options.maxfev or self.max_evaluations
+        radius_end = max(options.xatol, 1e-6)
+        if options.initial_step is not None:
+            radius = max(options.initial_step, radius_end)
+        else:
+            radius = max(self.initial_radius * float((upper - lower).min()), radius_end)
+
+        X: list[np.ndarray] = []
+        F: list[float] = []
+
+        def evaluate(x) -> float:
+            x = np.clip(x, lower, upper)
+            X.append(x)
+            F.append(float(fun(x)))
+            return F[-1]
+
+        # Initial stencil: the center, two steps along every axis and one along every pair of
+        # axes, just enough points to determine a full quadratic
+        center = np.clip(np.asarray(x0, dtype=float), lower, upper)
+        evaluate(center)
+        steps = []
+        for i in range(dim):
+            step = np.zeros(dim)
+            # Step away from the closer bound
+            step[i] = radius if upper[i] - center[i] >= center[i] - lower[i] else -radius
+            steps.append(step)
+            evaluate(center + step)
+            # The opposite step gives the curvature, or a second step further away on a bound
+            opposite = np.clip(center - step, lower, upper)
+            evaluate(opposite if abs(opposite[i] - center[i]) > 0.5 * radius else center + 2 * step)
+        for i, j in combinations(range(dim), 2):
+            evaluate(center + steps[i] + steps[j])
+
+        model = QuadraticModel(dim)
+        nit = 0
+        status, message = 1, "Maximum number of function evaluations has been exceeded."
+
+        while len(F) < max_evaluations:
+            if options.maxiter is not None and nit >= options.maxiter:
+                status, message = 2, "Maximum number of iterations has been exceeded."
+                break
+            if radius <= radius_end:
+                status, message = 0, "Optimization terminated successfully."
+                break
+
+            y = self.transform(np.array(F))
+            best = int(np.argmin(y))
+            center = X[best]
+            S = np.array(X) - center
+            # Points far outside the trust region are kept, but barely influence the local model
+            distance = np.abs(S).max(axis=1) / radius
+            weights = 1.0 / (1.0 + distance**2)
+
+            nit += 1
+            if callback is not None:
+                callback(OptimizeResult(x=center, fun=F[best], nit=nit, nfev=len(F)))
+
+            if not model.fit(S, y, weights):
+                evaluate(self.geometry_point(center, S, radius, lower, upper))
+                continue
+
+            step = self.solve_subproblem(model, center, radius, lower, upper)
+            predicted = model(np.zeros(dim)) - model(step)
+            if predicted <= 0 or np.abs(step).max() < radius_end:
+                # The model does not promise any progress in the region, refine it
+                radius *= 0.5
+                logger.debug(f"Trust region radius shrunk to {radius:.4g}")
+                continue
+
+            evaluate(center + step)
+            actual = y[best] - self.transform(np.array(F))[-1]
+            ratio = actual / predicted
+
+            if ratio < self.eta:
+                radius *= 0.5
+                # A poor model may just lack points near the center
+                if np.count_nonzero(distance <= 1.0) < model.n_terms:
+                    evaluate(self.geometry_point(center, S, radius, lower, upper))
+            elif ratio > 0.75 and np.abs(step).max() >= 0.99 * radius:
+                radius = min(2.0 * radius, float((upper - lower).max()))
+            logger.debug(f"Trust region ratio: {ratio:.3g}, radius: {radius:.4g}")
+
+        best = int(np.argmin(self.transform(np.array(F))))
+        return OptimizeResult(
+            x=X[best],
+            fun=F[best],
+            nit=nit,
+            nfev=len(F),
+            status=status,
+            success=status == 0,
+            message=message,
+        )
+
+    def transform(self, f: np.ndarray) -> np.ndarray:
+        f = f.copy()
+        finite = np.isfinite(f)
+        if not finite.any():
+            return np.zeros_like(f)
+        # Failed measurements are treated as the worst value observed so far
+        f[~finite] = f[finite].max()
+        return np.log(f) if (f > 0).all() else f
+
+    def solve_subproblem(
+        self,
+        model: QuadraticModel,
+        center: np.ndarray,
+        radius: float,
+        lower: np.ndarray,
+        upper: np.ndarray,
+    ) -> np.ndarray:
+        """Minimize the model in the box given by the trust region and the bounds."""
+        box = list(zip(np.maximum(lower - center, -radius), np.minimum(upper - center, radius)))
+        starts = [np.zeros(model.dim)]
+        try:
+            # Unconstrained Newton step, useful when the model is convex
+            starts.append(np.clip(np.linalg.solve(model.H, -model.g), *np.array(box).T))
+        except np.linalg.LinAlgError:
+            pass
+
+        best = starts[0]
+        for start in starts:
+            res = minimize(model, start, jac=model.gradient, method="L-BFGS-B", bounds=box)
+            if model(res.x) < model(best):
+                best = res.x
+        return best
+
+    def geometry_point(
+        self,
+        center: np.ndarray,
+        S: np.ndarray,
+        radius: float,
+        lower: np.ndarray,
+        upper: np.ndarray,
+    ) -> np.ndarray:
+        """Return the vertex of the trust region farthest from the points already measured."""
+        dim = len(center)
+        vertices = np.array(np.meshgrid(*[[-radius, radius]] * dim)).reshape(dim, -1).T
+        axes = np.vstack([np.eye(dim) * radius, -np.eye(dim) * radius])
+        candidates = np.clip(center + np.vstack([vertices, axes]), lower, upper) - center
+        spread = np.abs(candidates[:, None, :] - S[None, :, :]).max(axis=-1).min(axis=1)
+        return center + candidates[np.argmax(spread)]
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import wraps
+from math import inf
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpanStatistics:
+    count: int = 0
+    total: float = 0.0
+    min: float = inf
+    max: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        self.min = min(self.min, duration)
+        self.max = max(self.max, duration)
+
+
+class Profiler:
+    """
+    Thread-safe span profiler for the focusing loop.
+
+    Spans are timed with `span()` (or the `profiled` decorator) from any thread and
+    aggregated per run, and per objective function evaluation between
+    `begin_evaluation()` and `end_evaluation()`. Since a single evaluation is in flight
+    at any time, spans of the camera, processing and power supply threads are
+    attributed to the evaluation that is running when they end. Signal hops are
+    measured with `mark()` on the emitting side and `since()` on the receiving side.
+    Every span is also passed on to the tracer.
+    """
+
+    EVALUATION = "evaluation"
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.enabled = True
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.run: dict[str, SpanStatistics] = {}
+            self.counters: dict[str, int] = {}
+            self.evaluations: list[dict[str, float]] = []
+            self.current: Optional[dict[str, float]] = None
+            self.evaluation_start = 0.0
+            self.marks: dict[str, float] = {}
+
+    def record(self, name: str, duration: float, start: Optional[float] = None) -> None:
+        tracer.complete(name, start if start is not None else time.perf_counter() - duration, duration)
+        with self.lock:
+            self.run.setdefault(name, SpanStatistics()).add(duration)
+            if self.current is not None:
+                self.current[name] = self.current.get(name, 0.0) + duration
+
+    @contextmanager
+    def span(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, start)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            if self.current is not None:
+                self.current[name] = self.current.get(name, 0) + n
+            total = self.counters[name]
+        tracer.counter(name, total)
+
+    def mark(self, key: str) -> None:
+        self.marks[key] = time.perf_counter()
+
+    def since(self, key: str, name: str) -> None:
+        """Record the time elapsed since `mark(key)` as a span, e.g. the latency of a queued signal."""
+        if (start := self.marks.pop(key, None)) is not None:
+            self.record(name, time.perf_counter() - start, start)
+
+    def begin_evaluation(self) -> None:
+        with self.lock:
+            self.current = {}
+            self.evaluation_start = time.perf_counter()
+
+    def end_evaluation(self) -> None:
+        duration = time.perf_counter() - self.evaluation_start
+        with self.lock:
+            if self.current is None:
+                return
+            tracer.complete(self.EVALUATION, self.evaluation_start, duration, {"index": len(self.evaluations)})
+            self.run.setdefault(self.EVALUATION, SpanStatistics()).add(duration)
+            self.current[self.EVALUATION] = duration
+            self.evaluations.append(self.current)
+            self.current = None
+
+    def last_evaluation(self) -> dict[str, float]:
+        """Return a copy of the breakdown of the last completed evaluation."""
+        with self.lock:
+            return dict(self.evaluations[-1]) if self.evaluations else {}
+
+    def snapshot(self) -> tuple[dict[str, SpanStatistics], list[dict[str, float]]]:
+        """Return copies of the run statistics and of the per-evaluation breakdowns."""
+        with self.lock:
+            run = {name: SpanStatistics(**vars(stats)) for name, stats in self.run.items()}
+            return run, [dict(e) for e in self.evaluations]
+
+    def log_summary(self) -> None:
+        run, _ = self.snapshot()
+        reference = run[self.EVALUATION].total if self.EVALUATION in run else 0.0
+        for name, stats in sorted(run.items(), key=lambda item: -item[1].total):
+            share = f" ({100 * stats.total / reference:.1f}%)" if reference else ""
+            logger.info(
+                f"{name}: {stats.count} x {1e3 * stats.mean:.1f} ms = {stats.total:.2f} s{share}"
+            )
+        for name, n in self.counters.items():
+            logger.info(f"{name}: {n}")
+
+    def export_csv(self, path: Path, stem: str) -> list[Path]:
+        """Write the run summary and the per-evaluation breakdown next to the run data."""
+        run, evaluations = self.snapshot()
+        summary = path / f"timing_summary_{stem}.csv"
+        with summary.open(mode="w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["Span", "Count", "Total [s]", "Mean [ms]", "Min [ms]", "Max [ms]"])
+            for name, stats in run.items():
+                writer.writerow(
+                    [name, stats.count, stats.total, 1e3 * stats.mean, 1e3 * stats.min, 1e3 * stats.max]
+                )
+            for name, n in self.counters.items():
+                writer.writerow([name, n])
+
+        breakdown = path / f"timing_evaluations_{stem}.csv"
+        names = sorted({name for e in evaluations for name in e})
+        with breakdown.open(mode="w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["Count", *names])
+            for row, evaluation in enumerate(evaluations):
+                writer.writerow([row, *(evaluation.get(name, 0.0) for name in names)])
+        return [summary, breakdown]
+
+
+profiler = Profiler()
+
+
+def profiled(name: str):
+    """Decorator timing every call of the decorated function as the span `name`."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiler.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,13 +1,16 @@
 # -*- coding: utf-8 -*-
 
 import logging
+from math import nan
 from queue import Queue
 from re import compile
-from threading import Thread
 
 from PySide6.QtCore import QEventLoop, QObject, QRunnable, QTimer, Signal, Slot
 
+from execution import Role
 from genesys import Genesys
+from profiling import profiler
+from tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -35,12 +38,13 @@ class PSController(QRunnable):
         }
         self.successfull = {'PS1': False, 'PS2': False}
         self.queue = Queue()
-        self.queue_thread = None
+        self.queue_runnable = None
         self.control = True
         self.signals = PSControllerSignals(self.parent)
 
 
     def run(self):
+        tracer.set_thread_name("PS controller")
         # Create the objects controlling the power supplies
         self.ps1 = Genesys(6, self.serial_port)
         self.ps2 = Genesys(7, self.serial_port)
@@ -78,8 +82,8 @@ class PSController(QRunnable):
             self.signals.endRefreshTimer.connect(self.refreshTimer.stop)
 
             # Start the thread that manages the queue and update the GUI
-            self.queue_thread = Thread(target=self.commandWorker, daemon=True)
-            self.queue_thread.start()
+            self.queue_runnable = QRunnable.create(self.commandWorker)
+            self.parent.executor.start(Role.DEVICE_IO, self.queue_runnable)
             self.refreshGUI()
             
             # Start the timer and the event loop
@@ -100,6 +104,8 @@ class PSController(QRunnable):
             self.queue.put((self.ps2.set_power_status, 'OFF'))
             self.queue.join()
             logger.info(f"PS2: {self.response}")
+            # Terminate the command thread
+            self.queue.put(None)
             self.parent.psLCD1.setEnabled(False)
             self.parent.psLCD2.setEnabled(False)
         elif any(self.successfull.values()):
@@ -116,15 +122,17 @@ class PSController(QRunnable):
         self.signals.terminate.emit()
     
     def commandWorker(self):
-        while self.control or self.queue.empty():
-            func, val = self.queue.get()
+        tracer.set_thread_name("PS commands")
+        while (command := self.queue.get()) is not None:
+            func, val = command
             logger.debug("Command sent. Waiting on response...")
-            if val is None:
-                self.response_st = func()
-                logger.debug(f"Response: {self.response_st}")
-            else:
-                self.response = func(val)
-                logger.debug(f"Response: {self.response}")
+            with profiler.span(f"serial: {func.__name__}"):
+                if val is None:
+                    self.response_st = func()
+                    logger.debug(f"Response: {self.response_st}")
+                else:
+                    self.response = func(val)
+                    logger.debug(f"Response: {self.response}")
             self.queue.task_done()
 
     @Slot()
@@ -160,6 +168,15 @@ class PSController(QRunnable):
         self.queue.put((self.ps2.set_programmed_current, value / 100))
         self.queue.join()
 
+    def measuredCurrent(self, ps) -> float:
+        """Read back the output current of `ps`, NaN if the reply cannot be parsed."""
+        self.queue.put((ps.get_measured_current, None))
+        self.queue.join()
+        try:
+            return float(self.pattern.findall(self.response_st)[0])
+        except IndexError:
+            return nan
+
     @Slot(bool)
     def controlTimer(self, b) -> None:
         """Control the refresh timer."""
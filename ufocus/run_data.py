@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+from dataclasses import dataclass, field, fields
+
+import numpy as np
+
+from image_processing.analysis import DetectedEllipse
+
+
+class Column:
+    """
+    Growable float column backed by a NumPy array.
+
+    Appends are amortized O(1): the capacity doubles when the array is full. `values`
+    and `index` are views of the filled part, so they can be handed to the plot items
+    without copying.
+    """
+
+    def __init__(self, capacity: int = 256) -> None:
+        self._data = np.full(capacity, np.nan)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        return iter(self.values)
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[: self._size]
+
+    @property
+    def index(self) -> np.ndarray:
+        return _arange(self._size)
+
+    def append(self, value: float) -> None:
+        if self._size == len(self._data):
+            grown = np.full(2 * len(self._data), np.nan)
+            grown[: self._size] = self._data
+            self._data = grown
+        self._data[self._size] = value
+        self._size += 1
+
+    def extend(self, values: np.ndarray) -> None:
+        needed = self._size + len(values)
+        if needed > len(self._data):
+            grown = np.full(max(needed, 2 * len(self._data)), np.nan)
+            grown[: self._size] = self._data[: self._size]
+            self._data = grown
+        self._data[self._size : needed] = values
+        self._size = needed
+
+    def clear(self) -> None:
+        self._size = 0
+
+
+_counts = np.arange(0)
+
+
+def _arange(n: int) -> np.ndarray:
+    """Return a view of 0..n-1, shared by all columns."""
+    global _counts
+    if n > len(_counts):
+        _counts = np.arange(max(n, 2 * len(_counts), 256), dtype=float)
+    return _counts[:n]
+
+
+@dataclass
+class RunData:
+    x_c: Column = field(default_factory=Column)
+    y_c: Column = field(default_factory=Column)
+    minor: Column = field(default_factory=Column)
+    major: Column = field(default_factory=Column)
+    angle: Column = field(default_factory=Column)
+    area: Column = field(default_factory=Column)
+    perimeter: Column = field(default_factory=Column)
+    circularity: Column = field(default_factory=Column)
+    eccentricity: Column = field(default_factory=Column)
+    current1: Column = field(default_factory=Column)
+    current2: Column = field(default_factory=Column)
+    cost_func: Column = field(default_factory=Column)
+
+    def append_data(self, data: DetectedEllipse) -> None:
+        for f in fields(data):
+            getattr(self, f.name).append(getattr(data, f.name))
+
+    def clear_data(self) -> None:
+        for f in fields(self):
+            getattr(self, f.name).clear()
@@ -10,6 +10,7 @@ from dirs import BASE_PATH
 
 DEFAULT_SETTINGS = {
     "spinboxImagesToAccumulate": 30,
+    "spinboxMinImagesToAccumulate": 0,
     "spinboxThreshold": -1,
     "spinboxGaussianKernel": 11,
     "spinboxInitialPS1": 0.0,
@@ -18,6 +19,9 @@ DEFAULT_SETTINGS = {
     "spinboxFATol": 6,
     "spinboxMaxIter": 100,
     "spinboxMaxFEval": 100,
+    "spinboxCacheMaxAge": 60.0,
+    "spinboxCacheSamples": 3,
+    "spinboxBeamEnergy": 0.0,
     "p_i": None,
     "p_f": None,
     "roi": False,
@@ -32,7 +36,19 @@ DEFAULT_SETTINGS = {
     "draw_scan_x16": False,
     "comboboxSerial": 0,
     "comboboxCamera": 0,
+    "comboboxCachePolicy": 1,
+    "comboboxOptimizer": 0,
+    "comboboxPyramid": 0,
     "lineEditObjFuncPowers": [1, 2],
+    "lineEditIon": "",
+    "lineEditLenses": "",
+    "checkboxWarmStart": False,
+    "checkboxAnalysisProcess": False,
+    "checkboxAutoROI": False,
+    "checkboxCameraROI": False,
+    "simulatorProcessingDelay": 0.01,
+    "simulatorDropProbability": 0.0,
+    "simulatorSlewRate": 10.0,
 }
 
 SETTINGS_T1 = (
@@ -53,10 +69,29 @@ SETTINGS_T1 = (
 SETTINGS_T2 = (
     "comboboxSerial",
     "comboboxCamera",
+    "comboboxCachePolicy",
+    "comboboxOptimizer",
+    "comboboxPyramid",
 )
 
 SETTINGS_T3 = (
-    "lineEditObjFuncPowers"
+    "lineEditObjFuncPowers",
+    "lineEditIon",
+    "lineEditLenses",
+)
+
+SETTINGS_T4 = (
+    "checkboxWarmStart",
+    "checkboxAnalysisProcess",
+    "checkboxAutoROI",
+    "checkboxCameraROI",
+)
+
+# Only set in user_settings.json, they have no widget
+SETTINGS_SIMULATOR = (
+    "simulatorProcessingDelay",
+    "simulatorDropProbability",
+    "simulatorSlewRate",
 )
 
 logger = logging.getLogger(__name__)
@@ -104,7 +139,9 @@ class SettingsManager(metaclass=SettingsManagerMeta):
 
     def setDefaultValues(self):
         for key, value in DEFAULT_SETTINGS.items():
-            if key in SETTINGS_T1:
+            if key in SETTINGS_SIMULATOR:
+                continue
+            elif key in SETTINGS_T1:
                 setattr(self.parent.video_label, key, value)
             elif key in SETTINGS_T2:
                 atr = getattr(self.parent, key)
@@ -112,6 +149,9 @@ class SettingsManager(metaclass=SettingsManagerMeta):
             elif key in SETTINGS_T3:
                 atr = getattr(self.parent, key)
                 atr.setText(str(value))
+            elif key in SETTINGS_T4:
+                atr = getattr(self.parent, key)
+                atr.setChecked(value)
             else:
                 atr = getattr(self.parent, key)
                 atr.setValue(value)
@@ -123,7 +163,8 @@ class SettingsManager(metaclass=SettingsManagerMeta):
             logger.info("Found existing user settings")
             with open(f"{BASE_PATH}/user_settings.json", "r") as file:
                 user_settings = json.load(file, cls=JSONSpecialDecoder)
-            return user_settings
+            # Settings introduced after the file was written fall back to their defaults
+            return {**DEFAULT_SETTINGS, **user_settings}
         else:
             logger.info("Using the default settings")
             with open(f"{BASE_PATH}/user_settings.json", "w") as file:
@@ -134,7 +175,9 @@ class SettingsManager(metaclass=SettingsManagerMeta):
         if self.user_settings is not None:
             for key, value in self.user_settings.items():
                 try:
-                    if key in SETTINGS_T1:
+                    if key in SETTINGS_SIMULATOR:
+                        continue
+                    elif key in SETTINGS_T1:
                         setattr(self.parent.video_label, key, value)
                     elif key in SETTINGS_T2:
                         atr = getattr(self.parent, key)
@@ -142,6 +185,9 @@ class SettingsManager(metaclass=SettingsManagerMeta):
                     elif key in SETTINGS_T3:
                         atr = getattr(self.parent, key)
                         atr.setText(str(value))
+                    elif key in SETTINGS_T4:
+                        atr = getattr(self.parent, key)
+                        atr.setChecked(value)
                     else:
                         atr = getattr(self.parent, key)
                         atr.setValue(value)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from dataclasses import dataclass, field
+from math import cos, radians, sin, sqrt
+from typing import Optional
+
+import numpy as np
+
+
+@dataclass
+class QuadrupoleFocusingModel:
+    """
+    Linearised model of the beam spot of a quadrupole doublet/triplet on the screen.
+
+    The spot is a 2D Gaussian whose widths grow with the distance of the lens currents
+    from the focusing currents, `sigma = sqrt(sigma_0**2 + (A @ dI)**2)`, where `A`
+    couples the Q1 and Q2/3 currents to the x and y planes. Lengths are in pixels and
+    currents in amperes.
+    """
+
+    focus_currents: tuple[float, float] = (10.0, 12.0)
+    sigma_0: tuple[float, float] = (6.0, 5.0)
+    response: tuple[tuple[float, float], tuple[float, float]] = ((30.0, -10.0), (-8.0, 28.0))
+    steering: tuple[tuple[float, float], tuple[float, float]] = ((3.0, 0.0), (0.0, -2.0))
+    center: tuple[float, float] = (0.5, 0.5)
+    angle: float = 0.0
+    jitter: float = 0.5
+    peak: float = 200.0
+    min_peak: float = 20.0
+    background: float = 10.0
+    noise: float = 3.0
+    seed: Optional[int] = None
+    rng: np.random.Generator = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.rng = np.random.default_rng(self.seed)
+
+    def spot(self, currents: tuple[float, float]) -> tuple[float, float, float, float]:
+        """Return the centre offset and the widths (dx, dy, sigma_x, sigma_y) of the spot."""
+        d1 = currents[0] - self.focus_currents[0]
+        d2 = currents[1] - self.focus_currents[1]
+        (a11, a12), (a21, a22) = self.response
+        (s11, s12), (s21, s22) = self.steering
+        sigma_x = sqrt(self.sigma_0[0] ** 2 + (a11 * d1 + a12 * d2) ** 2)
+        sigma_y = sqrt(self.sigma_0[1] ** 2 + (a21 * d1 + a22 * d2) ** 2)
+        return s11 * d1 + s12 * d2, s21 * d1 + s22 * d2, sigma_x, sigma_y
+
+    def render(
+        self,
+        width: int,
+        height: int,
+        currents: tuple[float, float],
+        window: Optional[tuple[int, int, int, int]] = None,
+    ) -> np.ndarray:
+        """
+        Render a Mono8 frame of the spot for the given lens currents.
+
+        If a window (x, y, w, h) is given, only that part of the sensor is rendered.
+        """
+        dx, dy, sigma_x, sigma_y = self.spot(currents)
+        x_c = self.center[0] * width + dx + self.rng.normal(0.0, self.jitter)
+        y_c = self.center[1] * height + dy + self.rng.normal(0.0, self.jitter)
+
+        # The same beam current is spread over a larger area when the spot is defocused
+        amplitude = max(self.peak * self.sigma_0[0] * self.sigma_0[1] / (sigma_x * sigma_y), self.min_peak)
+
+        x0, y0, w, h = window if window is not None else (0, 0, width, height)
+        x = np.arange(x0, x0 + w, dtype=np.float32) - np.float32(x_c)
+        y = np.arange(y0, y0 + h, dtype=np.float32) - np.float32(y_c)
+
+        if self.angle == 0.0:
+            # Separable case, much cheaper for large frames
+            gx = np.exp(-0.5 * (x / sigma_x) ** 2, dtype=np.float32)
+            gy = np.exp(-0.5 * (y / sigma_y) ** 2, dtype=np.float32)
+            frame = np.outer(gy * np.float32(amplitude), gx)
+        else:
+            c, s = cos(radians(self.angle)), sin(radians(self.angle))
+            xx, yy = np.meshgrid(x, y)
+            u = (c * xx + s * yy) / sigma_x
+            v = (-s * xx + c * yy) / sigma_y
+            frame = amplitude * np.exp(-0.5 * (u**2 + v**2), dtype=np.float32)
+
+        frame += np.float32(self.background)
+        if self.noise > 0:
+            frame += self.rng.standard_normal(frame.shape, dtype=np.float32) * np.float32(self.noise)
+        return np.clip(frame, 0, 255).astype(np.uint8)
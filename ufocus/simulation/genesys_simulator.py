@@ -0,0 +1,453 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from math import inf
+from threading import Condition, Event, Lock, Thread
+from typing import Optional
+
+SIMULATED_PORT = "sim://genesys"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SimulatedPortInfo:
+    """Stand-in for the pyserial port info of the simulated bus."""
+
+    name: str = SIMULATED_PORT
+    device: str = SIMULATED_PORT
+    description: str = "Simulated Genesys power supplies"
+
+
+@dataclass
+class SimulatorTiming:
+    """Timing and reliability model of the simulated serial link."""
+
+    baudrate: int = 9600
+    processing_delay: float = 0.01
+    drop_probability: float = 0.0
+    time_scale: float = 1.0
+    seed: Optional[int] = None
+
+    def transmission_time(self, n_bytes: int) -> float:
+        # Each byte is framed by a start and a stop bit (8N1)
+        return 10 * n_bytes / self.baudrate * self.time_scale
+
+    def response_time(self) -> float:
+        return self.processing_delay * self.time_scale
+
+
+@dataclass
+class SimulatedSupply:
+    """State of a single simulated TDK-Lambda Genesys power supply."""
+
+    address: int
+    serial_number: str = "SIM-000000"
+    model: str = "GEN6-100"
+    rated_voltage: float = 6.0
+    rated_current: float = 100.0
+    load_resistance: float = 0.05
+    slew_rate: float = 10.0
+    current_noise: float = 0.002
+    voltage_noise: float = 0.0005
+    output: bool = False
+    remote: str = "REM"
+    programmed_voltage: float = 6.0
+    programmed_current: float = 0.0
+    _current: float = field(default=0.0, repr=False)
+    _updated: float = field(default_factory=time.monotonic, repr=False)
+
+    def target_current(self) -> float:
+        if not self.output:
+            return 0.0
+        # The supply crosses over to CV operation if the load cannot sink the programmed current
+        return min(self.programmed_current, self.programmed_voltage / self.load_resistance)
+
+    def actual_current(self) -> float:
+        now = time.monotonic()
+        target = self.target_current()
+        if self.slew_rate == inf:
+            self._current = target
+        else:
+            step = self.slew_rate * (now - self._updated)
+            if abs(target - self._current) <= step:
+                self._current = target
+            else:
+                self._current += step if target > self._current else -step
+        self._updated = now
+        return self._current
+
+    def actual_voltage(self) -> float:
+        return min(self.actual_current() * self.load_resistance, self.programmed_voltage)
+
+    def mode(self) -> str:
+        if not self.output:
+            return "OFF"
+        if self.programmed_current * self.load_resistance <= self.programmed_voltage:
+            return "CC"
+        return "CV"
+
+
+class GenesysBus:
+    """
+    Multi-drop RS-232/RS-485 bus with simulated Genesys power supplies attached.
+
+    Every command is heard by all the devices, but only the currently addressed
+    one executes it and replies.
+    """
+
+    def __init__(self, supplies: Optional[list[SimulatedSupply]] = None, seed: Optional[int] = None) -> None:
+        if supplies is None:
+            supplies = [
+                SimulatedSupply(6, serial_number="SIM-000006"),
+                SimulatedSupply(7, serial_number="SIM-000007"),
+            ]
+        self.supplies: dict[int, SimulatedSupply] = {s.address: s for s in supplies}
+        self.selected: Optional[int] = None
+        self.last_command: dict[int, str] = {}
+        self.rng = random.Random(seed)
+        self.lock = Lock()
+
+    def __getitem__(self, address: int) -> SimulatedSupply:
+        return self.supplies[address]
+
+    def handle(self, line: str) -> Optional[str]:
+        """Execute a single command line and return the reply of the addressed device, if any."""
+        with self.lock:
+            line = line.strip()
+            if not line:
+                return None
+
+            if line.startswith("ADR"):
+                try:
+                    address = int(line[3:])
+                except ValueError:
+                    return "C03" if self.selected is not None else None
+                self.selected = address if address in self.supplies else None
+                return "OK" if self.selected is not None else None
+
+            if self.selected is None:
+                return None
+
+            if line == "\\":
+                line = self.last_command.get(self.selected, "")
+            else:
+                self.last_command[self.selected] = line
+            return self.execute(self.supplies[self.selected], line)
+
+    def execute(self, ps: SimulatedSupply, line: str) -> str:
+        command, _, argument = line.partition(" ")
+        argument = argument.strip()
+
+        match command:
+            case "IDN?":
+                return f"LAMBDA,{ps.model}"
+            case "SN?":
+                return ps.serial_number
+            case "MS?":
+                return "1"
+            case "RMT?":
+                return ps.remote
+            case "RMT":
+                if argument not in ("LOC", "REM", "LLO", "0", "1", "2"):
+                    return "C03"
+                ps.remote = {"0": "LOC", "1": "REM", "2": "LLO"}.get(argument, argument)
+                return "OK"
+            case "OUT?":
+                return "ON" if ps.output else "OFF"
+            case "OUT":
+                if argument not in ("ON", "OFF", "1", "0"):
+                    return "C03"
+                ps.actual_current()
+                ps.output = argument in ("ON", "1")
+                return "OK"
+            case "MODE?":
+                return ps.mode()
+            case "PV":
+                return self.program(ps, "programmed_voltage", argument, ps.rated_voltage)
+            case "PV?":
+                return f"{ps.programmed_voltage:.3f}"
+            case "MV?":
+                return f"{self.measured_voltage(ps):.3f}"
+            case "PC":
+                return self.program(ps, "programmed_current", argument, ps.rated_current)
+            case "PC?":
+                return f"{ps.programmed_current:.2f}"
+            case "MC?":
+                return f"{self.measured_current(ps):.2f}"
+            case "DVC?":
+                return (
+                    f"{self.measured_voltage(ps):.3f},{ps.programmed_voltage:.3f},"
+                    f"{self.measured_current(ps):.2f},{ps.programmed_current:.2f},"
+                    f"{1.05 * ps.rated_voltage:.2f},0.00"
+                )
+            case "STT?":
+                return (
+                    f"MV({self.measured_voltage(ps):.3f}),PV({ps.programmed_voltage:.3f}),"
+                    f"MC({self.measured_current(ps):.2f}),PC({ps.programmed_current:.2f}),"
+                    f"SR({'30' if ps.output else '00'}),FR(00)"
+                )
+            case "RST":
+                ps.actual_current()
+                ps.output = False
+                ps.programmed_voltage = 0.0
+                ps.programmed_current = 0.0
+                return "OK"
+            case "CLS":
+                return "OK"
+            case _:
+                return "C01"
+
+    def program(self, ps: SimulatedSupply, attribute: str, argument: str, rating: float) -> str:
+        if not argument:
+            return "C02"
+        try:
+            value = float(argument)
+        except ValueError:
+            return "C03"
+        if not 0.0 <= value <= 1.05 * rating:
+            return "E01"
+        ps.actual_current()
+        setattr(ps, attribute, round(value, 3))
+        return "OK"
+
+    def measured_current(self, ps: SimulatedSupply) -> float:
+        return max(ps.actual_current() + self.rng.gauss(0.0, ps.current_noise), 0.0)
+
+    def measured_voltage(self, ps: SimulatedSupply) -> float:
+        return max(ps.actual_voltage() + self.rng.gauss(0.0, ps.voltage_noise), 0.0)
+
+    def currents(self) -> dict[int, float]:
+        """Return the output current of every supply on the bus, without measurement noise."""
+        with self.lock:
+            return {address: ps.actual_current() for address, ps in self.supplies.items()}
+
+
+_default_bus: Optional[GenesysBus] = None
+_default_bus_lock = Lock()
+
+
+def get_default_bus() -> GenesysBus:
+    """Return the bus shared by the simulated devices of the application."""
+    global _default_bus
+    with _default_bus_lock:
+        if _default_bus is None:
+            _default_bus = GenesysBus()
+        return _default_bus
+
+
+class SimulatedSerial:
+    """
+    Loopback replacement for `serial.Serial` connected to a `GenesysBus`.
+
+    Only the subset of the pyserial API used by the application is implemented.
+    Replies become readable after the time it takes to transmit the command,
+    process it and transmit the reply at the configured baud rate.
+    """
+
+    def __init__(
+        self,
+        bus: Optional[GenesysBus] = None,
+        timing: Optional[SimulatorTiming] = None,
+        port: str = SIMULATED_PORT,
+        timeout: Optional[float] = 0.5,
+        write_timeout: Optional[float] = 0.5,
+    ) -> None:
+        self.timing = timing if timing is not None else SimulatorTiming()
+        self.bus = bus if bus is not None else GenesysBus(seed=self.timing.seed)
+        self.port = port
+        self.name = port
+        self.baudrate = self.timing.baudrate
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.is_open = True
+        self.rng = random.Random(self.timing.seed)
+        self._pending = bytearray()
+        self._replies: list[tuple[float, bytes]] = []
+        self._buffer = bytearray()
+        self._line_free_at = 0.0
+        self._condition = Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def open(self) -> None:
+        self.is_open = True
+
+    def close(self) -> None:
+        self.is_open = False
+        with self._condition:
+            self._condition.notify_all()
+
+    def write(self, data: bytes) -> int:
+        if not self.is_open:
+            raise OSError("Attempting to use a port that is not open")
+        now = time.monotonic()
+        self._pending.extend(data)
+        *lines, rest = self._pending.split(b"\r")
+        self._pending = bytearray(rest)
+
+        with self._condition:
+            # The command occupies the line before the device can start processing it
+            start = max(now, self._line_free_at) + self.timing.transmission_time(len(data))
+            for line in lines:
+                reply = self.bus.handle(line.decode("utf-8", errors="replace"))
+                if reply is None:
+                    continue
+                if self.rng.random() < self.timing.drop_probability:
+                    logger.debug(f"Dropped reply to {line!r}")
+                    continue
+                payload = f"{reply}\r".encode("utf-8")
+                start += self.timing.response_time() + self.timing.transmission_time(len(payload))
+                self._replies.append((start, payload))
+            self._line_free_at = start
+            self._condition.notify_all()
+        return len(data)
+
+    def _collect(self) -> None:
+        now = time.monotonic()
+        while self._replies and self._replies[0][0] <= now:
+            self._buffer.extend(self._replies.pop(0)[1])
+
+    def _next_reply_in(self) -> Optional[float]:
+        if self._replies:
+            return max(self._replies[0][0] - time.monotonic(), 0.0)
+        return None
+
+    @property
+    def in_waiting(self) -> int:
+        with self._condition:
+            self._collect()
+            return len(self._buffer)
+
+    def read(self, size: int = 1) -> bytes:
+        return self._read(lambda buffer: len(buffer) >= size, size)
+
+    def read_until(self, expected: bytes = b"\n", size: Optional[int] = None) -> bytes:
+        def complete(buffer: bytearray) -> bool:
+            return expected in buffer or (size is not None and len(buffer) >= size)
+
+        def length(buffer: bytearray) -> int:
+            index = buffer.find(expected)
+            n = index + len(expected) if index >= 0 else len(buffer)
+            return n if size is None else min(n, size)
+
+        return self._read(complete, length)
+
+    def _read(self, complete, length) -> bytes:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                self._collect()
+                if complete(self._buffer) or not self.is_open:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                wait = self._next_reply_in()
+                if wait is None or (remaining is not None and remaining < wait):
+                    wait = remaining
+                self._condition.wait(wait)
+
+            n = length(self._buffer) if callable(length) else min(length, len(self._buffer))
+            data = bytes(self._buffer[:n])
+            del self._buffer[:n]
+            return data
+
+    def reset_input_buffer(self) -> None:
+        with self._condition:
+            self._replies.clear()
+            self._buffer.clear()
+
+    def reset_output_buffer(self) -> None:
+        self._pending.clear()
+
+    def flush(self) -> None:
+        pass
+
+
+class PtyBridge:
+    """
+    Expose a `GenesysBus` through a pseudo-terminal (POSIX only).
+
+    The slave side of the pty can be opened with any serial client,
+    e.g. `serial.Serial(bridge.port)`, to talk to the simulated supplies.
+    """
+
+    def __init__(self, bus: Optional[GenesysBus] = None, timing: Optional[SimulatorTiming] = None) -> None:
+        import tty
+
+        self.timing = timing if timing is not None else SimulatorTiming()
+        self.bus = bus if bus is not None else GenesysBus(seed=self.timing.seed)
+        self.rng = random.Random(self.timing.seed)
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.stopped = Event()
+        self.thread = Thread(target=self.serve, daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+        logger.info(f"Simulated Genesys bus listening on {self.port}")
+
+    def stop(self) -> None:
+        self.stopped.set()
+        os.close(self.slave)
+        self.thread.join(timeout=1.0)
+        os.close(self.master)
+
+    def serve(self) -> None:
+        pending = b""
+        while not self.stopped.is_set():
+            try:
+                chunk = os.read(self.master, 1024)
+            except OSError:
+                break
+            if not chunk:
+                break
+            time.sleep(self.timing.transmission_time(len(chunk)))
+            *lines, pending = (pending + chunk).split(b"\r")
+            for line in lines:
+                reply = self.bus.handle(line.decode("utf-8", errors="replace"))
+                if reply is None or self.rng.random() < self.timing.drop_probability:
+                    continue
+                payload = f"{reply}\r".encode("utf-8")
+                time.sleep(self.timing.response_time() + self.timing.transmission_time(len(payload)))
+                os.write(self.master, payload)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve simulated TDK-Lambda Genesys power supplies on a pty.")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--processing-delay", type=float, default=0.01, help="device response delay [s]")
+    parser.add_argument("--drop-probability", type=float, default=0.0, help="probability of a dropped reply")
+    parser.add_argument("--slew-rate", type=float, default=10.0, help="output current slew rate [A/s]")
+    parser.add_argument("--addresses", type=int, nargs="+", default=[6, 7], help="addresses of the supplies")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+    bus = GenesysBus(
+        [SimulatedSupply(a, serial_number=f"SIM-{a:06}", slew_rate=args.slew_rate) for a in args.addresses],
+        seed=args.seed,
+    )
+    bridge = PtyBridge(
+        bus,
+        SimulatorTiming(args.baudrate, args.processing_delay, args.drop_probability, seed=args.seed),
+    )
+    bridge.start()
+    print(bridge.port, flush=True)
+    try:
+        bridge.thread.join()
+    except KeyboardInterrupt:
+        bridge.stop()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Tracer:
+    """
+    Low-overhead event tracer writing the Chrome trace-event format.
+
+    Events are appended as plain tuples to a bounded ring buffer, which is
+    thread-safe without a lock, and are only converted to JSON when the trace is
+    dumped, so that it can be opened in Perfetto or chrome://tracing. Recording is
+    off by default; the spans of the profiler are traced while it is enabled.
+    """
+
+    def __init__(self, capacity: int = 200_000) -> None:
+        self.enabled = False
+        self.events: deque[tuple] = deque(maxlen=capacity)
+        self.thread_names: dict[int, str] = {}
+        self.epoch = time.perf_counter()
+        self.pid = os.getpid()
+
+    def set_thread_name(self, name: str) -> None:
+        """Name the calling thread in the trace."""
+        self.thread_names[threading.get_ident()] = name
+
+    def thread_id(self) -> int:
+        tid = threading.get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        return tid
+
+    def complete(self, name: str, start: float, duration: float, args: Optional[dict] = None) -> None:
+        """Record a slice that started at `start` (perf_counter) and lasted `duration` seconds."""
+        if self.enabled:
+            self.events.append(("X", name, start, duration, self.thread_id(), args))
+
+    def counter(self, name: str, value: float) -> None:
+        if self.enabled:
+            self.events.append(("C", name, time.perf_counter(), 0.0, self.thread_id(), {name: value}))
+
+    def instant(self, name: str, args: Optional[dict] = None) -> None:
+        if self.enabled:
+            self.events.append(("i", name, time.perf_counter(), 0.0, self.thread_id(), args))
+
+    def clear(self) -> None:
+        self.events.clear()
+
+    def to_json(self) -> dict:
+        # Copying the deque happens in a single step under the GIL, appends can continue
+        events = list(self.events)
+        trace = [
+            {"ph": "M", "name": "process_name", "pid": self.pid, "tid": 0, "args": {"name": "μFocus"}},
+            *(
+                {"ph": "M", "name": "thread_name", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                for tid, name in list(self.thread_names.items())
+            ),
+        ]
+        for ph, name, start, duration, tid, args in events:
+            event = {"ph": ph, "name": name, "pid": self.pid, "tid": tid, "ts": 1e6 * (start - self.epoch)}
+            if ph == "X":
+                event["dur"] = 1e6 * duration
+            elif ph == "i":
+                event["s"] = "t"
+            if args:
+                event["args"] = args
+            trace.append(event)
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def dump(self, path: Path, stem: str) -> Path:
+        """Write the trace to `path` as trace_<stem>.json."""
+        path.mkdir(parents=True, exist_ok=True)
+        filename = path / f"trace_{stem}.json"
+        with filename.open(mode="w") as file:
+            json.dump(self.to_json(), file)
+        logger.info(f"Saved {len(self.events)} trace events to {filename}")
+        return filename
+
+
+tracer = Tracer()
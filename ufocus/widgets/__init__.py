@@ -7,3 +7,7 @@ from widgets.live_camera_feed_widget import LiveCameraFeedWidget
 from widgets.logging_widget import LoggerWidget
 from widgets.plotting_widget import PlottingWidget
 from widgets.power_supply_widget import PowerSupplyWidget
+from widgets.run_browser_widget import RunBrowserWidget
+from widgets.sweep_widget import SweepWidget
+from widgets.timing_widget import TimingWidget
+from widgets.tuning_widget import TuningWidget
@@ -1,5 +1,5 @@
 import PySide6QtAds as QtAds
-from numpy import ndarray
+from numpy import arange, ndarray
 from pyqtgraph import PlotWidget, mkPen
 from PySide6.QtCore import QSize, Slot
 from PySide6.QtGui import QAction, QIcon, QPixmap
@@ -11,6 +11,7 @@ from PySide6.QtWidgets import (
 
 import resources  # noqa: F401
 from widgets.floating_widget import FloatingWidget
+from widgets.render_scheduler import RenderScheduler
 
 
 class HistogramsWidget(QWidget):
@@ -20,12 +21,17 @@ class HistogramsWidget(QWidget):
         self.hor_data = []
         self.vert_data = []
         self.hist_data = []
+        # Bin edges of each step plot, rebuilt only when the number of bins changes
+        self.edges = {}
+        self.scheduler = RenderScheduler(self)
 
         manager = QtAds.CDockManager()
 
         self.pw1 = PlotWidget()
         self.graph1 = self.pw1.getPlotItem()
         self.graph1.showAxes(True)
+        self.graph1.setClipToView(True)
+        self.graph1.setDownsampling(auto=True, mode="peak")
         self.graph1.setTitle("Y Profile")
         self.graph1.setLabels(left="Normalized Intensity", bottom="Pixel Y")
         self.item1 = self.graph1.plot(
@@ -41,11 +47,14 @@ class HistogramsWidget(QWidget):
         self.dock_widget1 = QtAds.CDockWidget("Y Profile")
         self.dock_widget1.setContentsMargins(5, 5, 10, 5)
         self.dock_widget1.setWidget(self.pw1)
+        self.dock_widget1.visibilityChanged.connect(self.scheduler.wake)
         manager.addDockWidget(QtAds.LeftDockWidgetArea, self.dock_widget1)
 
         self.pw2 = PlotWidget()
         self.graph2 = self.pw2.getPlotItem()
         self.graph2.showAxes(True)
+        self.graph2.setClipToView(True)
+        self.graph2.setDownsampling(auto=True, mode="peak")
         self.graph2.setTitle("X Profile")
         self.graph2.setLabels(left="Normalized Intensity", bottom="Pixel X")
         self.item2 = self.graph2.plot(
@@ -61,11 +70,14 @@ class HistogramsWidget(QWidget):
         self.dock_widget2 = QtAds.CDockWidget("X Profile")
         self.dock_widget2.setContentsMargins(5, 5, 10, 5)
         self.dock_widget2.setWidget(self.pw2)
+        self.dock_widget2.visibilityChanged.connect(self.scheduler.wake)
         manager.addDockWidget(QtAds.RightDockWidgetArea, self.dock_widget2)
 
         self.pw3 = PlotWidget()
         self.graph3 = self.pw3.getPlotItem()
         self.graph3.showAxes(True)
+        self.graph3.setClipToView(True)
+        self.graph3.setDownsampling(auto=True, mode="peak")
         self.graph3.setTitle("ROI Histogram")
         self.graph3.setLabels(left="Counts", bottom="Intensity")
         self.graph3.setLogMode(x=False, y=True)
@@ -82,6 +94,7 @@ class HistogramsWidget(QWidget):
         self.dock_widget3 = QtAds.CDockWidget("ROI Histogram")
         self.dock_widget3.setContentsMargins(5, 5, 10, 5)
         self.dock_widget3.setWidget(self.pw3)
+        self.dock_widget3.visibilityChanged.connect(self.scheduler.wake)
         manager.addDockWidget(QtAds.BottomDockWidgetArea, self.dock_widget3)
 
         self.toolbar = QToolBar(self)
@@ -111,20 +124,34 @@ class HistogramsWidget(QWidget):
 
         self.setLayout(layout)
 
+        self.scheduler.register("hor", self.pw1, lambda: self.renderStep(self.item1, self.hor_data))
+        self.scheduler.register("vert", self.pw2, lambda: self.renderStep(self.item2, self.vert_data))
+        self.scheduler.register("hist", self.pw3, lambda: self.renderStep(self.item3, self.hist_data))
+
+    def showEvent(self, event) -> None:
+        super().showEvent(event)
+        self.scheduler.wake()
+
+    def renderStep(self, item, data) -> None:
+        edges = self.edges.get(item)
+        if edges is None or len(edges) != len(data) + 1:
+            edges = self.edges[item] = arange(len(data) + 1)
+        item.setData(edges, data)
+
     @Slot(ndarray)
     def updateHistHor(self, h) -> None:
         self.hor_data = h
-        self.item1.setData(range(len(self.hor_data) + 1), self.hor_data)
+        self.scheduler.schedule("hor")
 
     @Slot(ndarray)
     def updateHistVert(self, v) -> None:
         self.vert_data = v
-        self.item2.setData(range(len(self.vert_data) + 1), self.vert_data)
+        self.scheduler.schedule("vert")
 
     @Slot(ndarray)
     def updateHist(self, v) -> None:
         self.hist_data = v
-        self.item3.setData(range(len(self.hist_data) + 1), self.hist_data)
+        self.scheduler.schedule("hist")
 
     @Slot()
     def onActionOpenWindowClicked(self, checked) -> None:
@@ -148,6 +175,7 @@ class HistogramsWidget(QWidget):
         self.vert_data = []
         self.hist_data = []
 
+        self.scheduler.pending.clear()
         self.item1.setData(self.hor_data)
         self.item2.setData(self.vert_data)
         self.item3.setData(self.hist_data)
@@ -0,0 +1,77 @@
+from typing import Optional
+
+import numpy as np
+from pyqtgraph import (
+    ColorBarItem,
+    ImageItem,
+    PlotWidget,
+    ScatterPlotItem,
+    colormap,
+    mkBrush,
+    mkPen,
+)
+from PySide6.QtCore import QRectF, Slot
+from PySide6.QtWidgets import QVBoxLayout, QWidget
+
+from minimizer.landscape import Landscape
+from profiling import profiler
+
+
+class LandscapeWidget(QWidget):
+    """Heatmap of the objective over (Q1, Q2/3), in log scale, filled in as a landscape scan progresses."""
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.parent = parent
+        self.landscape: Optional[Landscape] = None
+
+        self.pw = PlotWidget()
+        self.graph = self.pw.getPlotItem()
+        self.graph.showAxes(True)
+        self.graph.setTitle("Objective Landscape")
+        self.graph.setLabels(left="Q2/3 [A]", bottom="Q1 [A]")
+        self.image = ImageItem(axisOrder="row-major")
+        self.graph.addItem(self.image)
+        self.colorbar = ColorBarItem(colorMap=colormap.get("viridis"), label="log₁₀ Obj. Func.", interactive=False)
+        self.colorbar.setImageItem(self.image, insert_in=self.graph)
+        self.best = ScatterPlotItem(symbol="x", size=12, pen=mkPen({"color": "#d62728", "width": 2}), brush=mkBrush(None))
+        self.graph.addItem(self.best)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.pw)
+        self.setLayout(layout)
+
+    @Slot(Landscape)
+    def setLandscape(self, landscape: Landscape) -> None:
+        self.landscape = landscape
+
+    def renderLandscape(self) -> None:
+        """Draw the current landscape, called by the render scheduler of the plots."""
+        if self.landscape is None:
+            return
+        with profiler.span("plot update"):
+            landscape = self.landscape
+            with np.errstate(divide="ignore", invalid="ignore"):
+                image = np.log10(landscape.values)
+            image[~np.isfinite(image)] = np.nan
+            self.image.setImage(image, autoLevels=False)
+            if np.isfinite(image).any():
+                self.colorbar.setLevels((float(np.nanmin(image)), float(np.nanmax(image))))
+
+            # Every pixel is centered on its grid point
+            d1 = (landscape.q1[-1] - landscape.q1[0]) / max(len(landscape.q1) - 1, 1)
+            d2 = (landscape.q2[-1] - landscape.q2[0]) / max(len(landscape.q2) - 1, 1)
+            self.image.setRect(
+                QRectF(
+                    landscape.q1[0] - d1 / 2,
+                    landscape.q2[0] - d2 / 2,
+                    landscape.q1[-1] - landscape.q1[0] + d1,
+                    landscape.q2[-1] - landscape.q2[0] + d2,
+                )
+            )
+            best = landscape.best()
+            if best is not None:
+                self.best.setData([best[0][0]], [best[0][1]])
+            else:
+                self.best.clear()
+
@@ -1,15 +1,16 @@
 import csv
 import time
-from dataclasses import dataclass, field, fields
 from datetime import date
 from itertools import zip_longest
 from math import nan
+from pathlib import Path
 
 import PySide6QtAds as QtAds
-from pyqtgraph import PlotWidget, getConfigOption, mkBrush, mkPen
-from PySide6.QtCore import QSize, Slot
+from pyqtgraph import InfiniteLine, PlotWidget, getConfigOption, mkBrush, mkPen
+from PySide6.QtCore import QSize, Signal, Slot
 from PySide6.QtGui import QAction, QIcon, QPixmap
 from PySide6.QtWidgets import (
+    QFileDialog,
     QMessageBox,
     QToolBar,
     QVBoxLayout,
@@ -19,38 +20,26 @@ from PySide6.QtWidgets import (
 import resources  # noqa: F401
 from dirs import BASE_DATA_PATH
 from image_processing.image_processing import DetectedEllipse
+from journal import read_journal
+from minimizer.landscape import Landscape
+from profiling import profiler
+from run_data import RunData
+from tracing import tracer
 from widgets.floating_widget import FloatingWidget
-
-
-@dataclass
-class RunData:
-    x_c: list[float] = field(default_factory=list)
-    y_c: list[float] = field(default_factory=list)
-    minor: list[float] = field(default_factory=list)
-    major: list[float] = field(default_factory=list)
-    angle: list[float] = field(default_factory=list)
-    area: list[float] = field(default_factory=list)
-    perimeter: list[float] = field(default_factory=list)
-    circularity: list[float] = field(default_factory=list)
-    eccentricity: list[float] = field(default_factory=list)
-    current1: list[float] = field(default_factory=list)
-    current2: list[float] = field(default_factory=list)
-    cost_func: list[float] = field(default_factory=list)
-
-    def append_data(self, data: DetectedEllipse) -> None:
-        for f in fields(data):
-            getattr(self, f.name).append(getattr(data, f.name))
-
-    def clear_data(self) -> None:
-        for f in fields(self):
-            getattr(self, f.name).clear()
+from widgets.landscape_widget import LandscapeWidget
+from widgets.render_scheduler import RenderScheduler
+from widgets.timing_widget import TimingWidget
 
 
 class PlottingWidget(QWidget):
+    # Position of the evaluation cursor moved by the user
+    cursorMoved = Signal(int)
+
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
         self.parent = parent
         self.data = RunData()
+        self.scheduler = RenderScheduler(self)
         legend_pen = getConfigOption("foreground")
         legend_brush = getConfigOption("background")
 
@@ -67,11 +56,14 @@ class PlottingWidget(QWidget):
         self.pw1 = PlotWidget()
         self.graph1 = self.pw1.getPlotItem()
         self.graph1.showAxes(True)
+        self.graph1.setClipToView(True)
+        self.graph1.setDownsampling(auto=True, mode="peak")
         self.graph1.setTitle("Ellipse Axes")
         self.graph1.setLabels(left="Length [px]", bottom="Count")
         self.graph1.addLegend(pen=legend_pen, brush=legend_brush, labelTextSize="8pt", colCount=2)
         self.item1 = self.graph1.plot(
-            self.data.major,
+            self.data.major.index,
+            self.data.major.values,
             pen=mkPen({"color": "#1f77b4", "width": 2}),
             symbol="o",
             symbolPen=mkPen({"color": "#1f77b4", "width": 1}),
@@ -80,7 +72,8 @@ class PlottingWidget(QWidget):
             name="Major",
         )
         self.item2 = self.graph1.plot(
-            self.data.minor,
+            self.data.minor.index,
+            self.data.minor.values,
             pen=mkPen({"color": "#ff7f0e", "width": 2}),
             symbol="o",
             symbolPen=mkPen({"color": "#ff7f0e", "width": 1}),
@@ -96,16 +89,20 @@ class PlottingWidget(QWidget):
         self.dock_widget1 = QtAds.CDockWidget("Ellipse Axes")
         self.dock_widget1.setContentsMargins(5, 5, 10, 5)
         self.dock_widget1.setWidget(self.pw1)
+        self.dock_widget1.visibilityChanged.connect(self.scheduler.wake)
         manager.addDockWidget(QtAds.LeftDockWidgetArea, self.dock_widget1)
 
         self.pw2 = PlotWidget()
         self.graph2 = self.pw2.getPlotItem()
         self.graph2.showAxes(True)
+        self.graph2.setClipToView(True)
+        self.graph2.setDownsampling(auto=True, mode="peak")
         self.graph2.setTitle("Quadrupole Currents")
         self.graph2.setLabels(left="Current [A]", bottom="Count")
         self.graph2.addLegend(pen=legend_pen, brush=legend_brush, labelTextSize="8pt", colCount=2)
         self.item3 = self.graph2.plot(
-            self.data.current1,
+            self.data.current1.index,
+            self.data.current1.values,
             pen=mkPen({"color": "#1f77b4", "width": 2}),
             symbol="o",
             symbolPen=mkPen({"color": "#1f77b4", "width": 1}),
@@ -114,7 +111,8 @@ class PlottingWidget(QWidget):
             name="PS1",
         )
         self.item4 = self.graph2.plot(
-            self.data.current2,
+            self.data.current2.index,
+            self.data.current2.values,
             pen=mkPen({"color": "#ff7f0e", "width": 2}),
             symbol="o",
             symbolPen=mkPen({"color": "#ff7f0e", "width": 1}),
@@ -132,18 +130,22 @@ class PlottingWidget(QWidget):
         self.dock_widget2 = QtAds.CDockWidget("Currents")
         self.dock_widget2.setContentsMargins(5, 5, 10, 5)
         self.dock_widget2.setWidget(self.pw2)
+        self.dock_widget2.visibilityChanged.connect(self.scheduler.wake)
         manager.addDockWidget(QtAds.RightDockWidgetArea, self.dock_widget2)
 
         self.pw3 = PlotWidget()
         self.graph3 = self.pw3.getPlotItem()
         self.graph3.showAxes(True)
+        self.graph3.setClipToView(True)
+        self.graph3.setDownsampling(auto=True, mode="peak")
         self.graph3.setTitle("Minimization Function")
         self.graph3.setLabels(left="Value [px⁴]", bottom="Count")
         self.graph3.getAxis("left").enableAutoSIPrefix(False)
         self.graph3.setLogMode(x=False, y=True)
         # self.graph3.addLegend(pen='k', labelTextSize='10pt')
         self.item5 = self.graph3.plot(
-            self.data.cost_func,
+            self.data.cost_func.index,
+            self.data.cost_func.values,
             pen=mkPen({"color": "#1f77b4", "width": 2}),
             symbol="o",
             symbolPen=mkPen({"color": "#1f77b4", "width": 1}),
@@ -155,12 +157,36 @@ class PlottingWidget(QWidget):
         self.dock_widget3 = QtAds.CDockWidget("Min Function")
         self.dock_widget3.setContentsMargins(5, 5, 10, 5)
         self.dock_widget3.setWidget(self.pw3)
+        self.dock_widget3.visibilityChanged.connect(self.scheduler.wake)
         manager.addDockWidget(QtAds.BottomDockWidgetArea, self.dock_widget3)
 
+        # Evaluation shown in the run browser
+        self.cursors = []
+        for graph in (self.graph1, self.graph2, self.graph3):
+            cursor = InfiniteLine(angle=90, movable=True, pen=mkPen({"color": "#d62728", "width": 1}))
+            cursor.setVisible(False)
+            cursor.sigPositionChangeFinished.connect(self.onCursorMoved)
+            graph.addItem(cursor, ignoreBounds=True)
+            self.cursors.append(cursor)
+
         # self.dock_widget4 = QtAds.CDockWidget("Plot 4")
         # self.dock_widget4.setWidget(QWidget())
         # manager.addDockWidget(QtAds.BottomDockWidgetArea, self.dock_widget4, h)
 
+        self.timing = TimingWidget(self)
+        self.dock_widget4 = QtAds.CDockWidget("Timing")
+        self.dock_widget4.setContentsMargins(5, 5, 10, 5)
+        self.dock_widget4.setWidget(self.timing)
+        manager.addDockWidgetTabToArea(self.dock_widget4, self.dock_widget3.dockAreaWidget())
+
+        self.landscapeView = LandscapeWidget(self)
+        self.dock_widget5 = QtAds.CDockWidget("Landscape")
+        self.dock_widget5.setContentsMargins(5, 5, 10, 5)
+        self.dock_widget5.setWidget(self.landscapeView)
+        self.dock_widget5.visibilityChanged.connect(self.scheduler.wake)
+        manager.addDockWidgetTabToArea(self.dock_widget5, self.dock_widget3.dockAreaWidget())
+        self.dock_widget3.setAsCurrentTab()
+
         self.toolbar = QToolBar(self)
         self.toolbar.setIconSize(QSize(16, 16))
         self.actionOpenInWindow = QAction("Open in window", self)
@@ -174,6 +200,12 @@ class PlottingWidget(QWidget):
         self.actionSaveData.setIcon(QIcon(QPixmap(":/icons/floppy-disk-solid.svg")))
         self.actionSaveData.triggered.connect(self.onActionSaveData)
 
+        self.actionLoadJournal = QAction("Load run journal...", self)
+        self.actionLoadJournal.triggered.connect(self.onActionLoadJournal)
+
+        self.actionLoadLandscape = QAction("Load landscape...", self)
+        self.actionLoadLandscape.triggered.connect(self.onActionLoadLandscape)
+
         self.actionClearData = QAction("Clear all data", self)
         self.actionClearData.setIcon(QIcon(QPixmap(":/icons/trash-can-solid.svg")))
         self.actionClearData.triggered.connect(self.onActionClearData)
@@ -193,24 +225,51 @@ class PlottingWidget(QWidget):
 
         self.setLayout(layout)
 
+        self.scheduler.register("axes", self.pw1, self.renderEllipseAxes)
+        self.scheduler.register("currents", self.pw2, self.renderCurrents)
+        self.scheduler.register("function", self.pw3, self.renderFunction)
+        self.scheduler.register("landscape", self.landscapeView, self.landscapeView.renderLandscape)
+
+    def showEvent(self, event) -> None:
+        super().showEvent(event)
+        self.scheduler.wake()
+
     @Slot(DetectedEllipse)
     def updatePlotEllipseAxes(self, detected_ellipse: DetectedEllipse) -> None:
+        profiler.since("ellipse signal", "signal hop: ellipse to GUI")
         self.data.append_data(detected_ellipse)
-        self.item1.setData(self.data.major)
-        self.item2.setData(self.data.minor)
+        self.scheduler.schedule("axes")
 
     @Slot(list)
     def updatePlotCurrents(self, x) -> None:
         self.data.current1.append(x[0])
         self.data.current2.append(x[1])
-
-        self.item3.setData(self.data.current1)
-        self.item4.setData(self.data.current2)
+        self.scheduler.schedule("currents")
 
     @Slot(float)
     def updatePlotFunction(self, v) -> None:
+        profiler.since("function signal", "signal hop: function to GUI")
         self.data.cost_func.append(v)
-        self.item5.setData(self.data.cost_func)
+        self.scheduler.schedule("function")
+
+    @Slot(Landscape)
+    def updateLandscape(self, landscape: Landscape) -> None:
+        self.landscapeView.setLandscape(landscape)
+        self.scheduler.schedule("landscape")
+
+    def renderEllipseAxes(self) -> None:
+        with profiler.span("plot update"):
+            self.item1.setData(self.data.major.index, self.data.major.values)
+            self.item2.setData(self.data.minor.index, self.data.minor.values)
+
+    def renderCurrents(self) -> None:
+        with profiler.span("plot update"):
+            self.item3.setData(self.data.current1.index, self.data.current1.values)
+            self.item4.setData(self.data.current2.index, self.data.current2.values)
+
+    def renderFunction(self) -> None:
+        with profiler.span("plot update"):
+            self.item5.setData(self.data.cost_func.index, self.data.cost_func.values)
 
     @Slot()
     def onActionOpenWindowClicked(self, checked) -> None:
@@ -233,7 +292,8 @@ class PlottingWidget(QWidget):
         if not path or not path.exists():
             path = BASE_DATA_PATH / date.today().isoformat()
             path.mkdir(parents=True, exist_ok=True)
-        filename = path / f"data_{date.today()}_{time.time_ns()}.csv"
+        stem = f"{date.today()}_{time.time_ns()}"
+        filename = path / f"data_{stem}.csv"
         with filename.open(mode="w", newline="") as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(
@@ -254,6 +314,11 @@ class PlottingWidget(QWidget):
             ):
                 writer.writerow([row, *line])
 
+        # Timing breakdown of the last minimization
+        profiler.export_csv(path, stem)
+        if tracer.enabled:
+            tracer.dump(path, stem)
+
         QMessageBox.information(
             self,
             "Data saved",
@@ -261,12 +326,68 @@ class PlottingWidget(QWidget):
             QMessageBox.StandardButton.Ok,
         )
 
+    @Slot()
+    def onActionLoadJournal(self) -> None:
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Load Run Journal", str(BASE_DATA_PATH), "Run Journals (journal_*.csv);;All Files (*)"
+        )
+        if filename:
+            self.loadJournal(Path(filename))
+
+    def loadJournal(self, path: Path) -> None:
+        try:
+            data = read_journal(path)
+        except (OSError, ValueError) as err:
+            QMessageBox.critical(
+                self,
+                "Invalid run journal",
+                f"The run journal {path} could not be loaded: {err}",
+                QMessageBox.StandardButton.Ok,
+            )
+            return
+        self.data = data
+        self.scheduler.pending.clear()
+        self.renderEllipseAxes()
+        self.renderCurrents()
+        self.renderFunction()
+
+    @Slot()
+    def onActionLoadLandscape(self) -> None:
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Load Landscape", str(BASE_DATA_PATH), "Landscapes (landscape_*.npz);;All Files (*)"
+        )
+        if not filename:
+            return
+        try:
+            landscape = Landscape.load(Path(filename))
+        except (OSError, ValueError, KeyError) as err:
+            QMessageBox.critical(
+                self,
+                "Invalid landscape",
+                f"The landscape {filename} could not be loaded: {err}",
+                QMessageBox.StandardButton.Ok,
+            )
+            return
+        self.landscapeView.setLandscape(landscape)
+        self.landscapeView.renderLandscape()
+        self.dock_widget5.toggleView(True)
+
+    @Slot(int)
+    def setEvaluationCursor(self, x: int) -> None:
+        for cursor in self.cursors:
+            cursor.setValue(x)
+            cursor.setVisible(True)
+
+    def onCursorMoved(self, cursor: InfiniteLine) -> None:
+        x = round(cursor.value())
+        self.setEvaluationCursor(x)
+        self.cursorMoved.emit(x)
+
     @Slot()
     def onActionClearData(self) -> None:
         self.data.clear_data()
 
-        self.item1.setData(self.data.major)
-        self.item2.setData(self.data.minor)
-        self.item3.setData(self.data.current1)
-        self.item4.setData(self.data.current2)
-        self.item5.setData(self.data.cost_func)
+        self.scheduler.pending.clear()
+        self.renderEllipseAxes()
+        self.renderCurrents()
+        self.renderFunction()
@@ -0,0 +1,50 @@
+from typing import Callable
+
+from PySide6.QtCore import QObject, QTimer, Slot
+from PySide6.QtWidgets import QWidget
+
+# Maximum number of redraws per second of a plot
+REFRESH_RATE = 25
+
+
+class RenderScheduler(QObject):
+    """
+    Coalesces plot updates to a target refresh rate.
+
+    Widgets store their new data and mark a view dirty with `schedule`. The pending views
+    are redrawn once per timer tick, however many updates they received in between. Views
+    whose widget is not visible (closed, auto-hidden or in a background tab) stay pending
+    until `wake` is called when they are shown again.
+    """
+
+    def __init__(self, parent=None, rate: float = REFRESH_RATE) -> None:
+        super().__init__(parent)
+        self.views: dict[str, tuple[QWidget, Callable[[], None]]] = {}
+        self.pending: set[str] = set()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(int(1000 / rate))
+        self.timer.timeout.connect(self.flush)
+
+    def register(self, key: str, widget: QWidget, render: Callable[[], None]) -> None:
+        self.views[key] = (widget, render)
+
+    def schedule(self, key: str) -> None:
+        self.pending.add(key)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    @Slot()
+    @Slot(bool)
+    def wake(self, visible: bool = True) -> None:
+        if visible and self.pending and not self.timer.isActive():
+            self.timer.start()
+
+    @Slot()
+    def flush(self) -> None:
+        for key in tuple(self.pending):
+            widget, render = self.views[key]
+            if widget.isVisible():
+                self.pending.discard(key)
+                render()
@@ -0,0 +1,239 @@
+import logging
+from bisect import bisect_left
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from PySide6.QtCore import QObject, QRunnable, QSize, Qt, Signal, Slot
+from PySide6.QtGui import QAction, QIcon, QImage, QPixmap
+from PySide6.QtWidgets import (
+    QComboBox,
+    QFileDialog,
+    QHBoxLayout,
+    QLabel,
+    QListView,
+    QListWidget,
+    QListWidgetItem,
+    QSlider,
+    QSplitter,
+    QToolBar,
+    QVBoxLayout,
+    QWidget,
+)
+
+from dirs import BASE_DATA_PATH
+from execution import Role
+from image_processing.saved_images import RunImages
+from widgets.image_processing_widget import ImageProcessingQLabel
+
+logger = logging.getLogger(__name__)
+
+
+def to_uint8(frame: np.ndarray) -> np.ndarray:
+    if frame.dtype == np.uint8:
+        return np.ascontiguousarray(frame)
+    frame = np.asarray(frame, dtype=np.float32)
+    low, high = float(frame.min()), float(frame.max())
+    return ((frame - low) * (255.0 / (high - low) if high > low else 0.0)).astype(np.uint8)
+
+
+def to_qimage(frame: np.ndarray) -> QImage:
+    """Return a copy of a Mono8 or RGB8 frame as a QImage, which can be passed between threads."""
+    frame = to_uint8(frame)
+    h, w = frame.shape[:2]
+    if frame.ndim == 2:
+        return QImage(frame.data, w, h, frame.strides[0], QImage.Format.Format_Grayscale8).copy()
+    return QImage(frame.data, w, h, frame.strides[0], QImage.Format.Format_RGB888).copy()
+
+
+class ThumbnailSignals(QObject):
+    thumbnailReady = Signal(int, QImage)
+
+
+class ThumbnailTask(QRunnable):
+    """Render the thumbnails of a run in the background, reading a strided subset of every frame."""
+
+    def __init__(self, images: RunImages, kind: str, size: int) -> None:
+        super().__init__()
+        self.images = images
+        self.kind = kind
+        self.size = size
+        self.cancelled = False
+        self.signals = ThumbnailSignals()
+
+    def run(self) -> None:
+        for index in range(len(self.images)):
+            if self.cancelled:
+                return
+            frame = self.images.load(index, self.kind)
+            if frame is None:
+                continue
+            step = max(1, max(frame.shape[:2]) // self.size)
+            self.signals.thumbnailReady.emit(index, to_qimage(frame[::step, ::step]))
+
+
+class RunBrowserWidget(QWidget):
+    """
+    Browser of the images saved during a run, in sync with the plots of the run data.
+
+    The image numbers count every image saved in the run directory, so the images are
+    matched to the evaluations of the plotted journal through the catalogue.
+    """
+
+    frameChanged = Signal(int)
+
+    THUMBNAIL_SIZE = 96
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.parent = parent
+        self.images: Optional[RunImages] = None
+        self.thumbnails: Optional[ThumbnailTask] = None
+        # Evaluation row of the plotted journal of every image taken for it, and back
+        self.rows: dict[int, int] = {}
+        self.numbers: dict[int, int] = {}
+
+        self.toolbar = QToolBar(self)
+        self.toolbar.setIconSize(QSize(16, 16))
+        self.actionOpenRun = QAction("Open run...", self)
+        self.actionOpenRun.triggered.connect(self.onActionOpenRun)
+        self.toolbar.addAction(self.actionOpenRun)
+
+        self.comboboxKind = QComboBox(self)
+        for kind in RunImages.KINDS:
+            self.comboboxKind.addItem(kind.capitalize(), kind)
+        self.comboboxKind.currentIndexChanged.connect(self.onKindChanged)
+        self.toolbar.addWidget(self.comboboxKind)
+
+        self.list = QListWidget(self)
+        self.list.setViewMode(QListView.ViewMode.IconMode)
+        self.list.setIconSize(QSize(self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE))
+        self.list.setResizeMode(QListView.ResizeMode.Adjust)
+        self.list.setUniformItemSizes(True)
+        self.list.setMovement(QListView.Movement.Static)
+        self.list.currentRowChanged.connect(self.onRowChanged)
+
+        self.view = ImageProcessingQLabel(self)
+
+        self.slider = QSlider(Qt.Orientation.Horizontal, self)
+        self.slider.setEnabled(False)
+        self.slider.valueChanged.connect(self.showFrame)
+        self.labelFrame = QLabel("No run opened", self)
+
+        sliderLayout = QHBoxLayout()
+        sliderLayout.addWidget(self.slider)
+        sliderLayout.addWidget(self.labelFrame)
+
+        viewer = QWidget(self)
+        viewerLayout = QVBoxLayout()
+        viewerLayout.addWidget(self.view)
+        viewerLayout.addLayout(sliderLayout)
+        viewer.setLayout(viewerLayout)
+
+        splitter = QSplitter(Qt.Orientation.Horizontal, self)
+        splitter.addWidget(self.list)
+        splitter.addWidget(viewer)
+        splitter.setStretchFactor(1, 3)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.toolbar)
+        layout.addWidget(splitter)
+        self.setLayout(layout)
+
+    @property
+    def kind(self) -> str:
+        return self.comboboxKind.currentData()
+
+    @Slot()
+    def onActionOpenRun(self) -> None:
+        path = QFileDialog.getExistingDirectory(self, "Open Run", str(BASE_DATA_PATH))
+        if path:
+            self.openRun(Path(path))
+
+    def openRun(self, run_path: Path) -> None:
+        self.images = RunImages(run_path)
+        logger.info(f"Browsing {len(self.images)} saved images of {run_path}")
+
+        self.list.clear()
+        for number in self.images.numbers:
+            item = QListWidgetItem(str(number))
+            item.setSizeHint(QSize(self.THUMBNAIL_SIZE + 8, self.THUMBNAIL_SIZE + 24))
+            self.list.addItem(item)
+        self.slider.setRange(0, max(len(self.images) - 1, 0))
+        self.slider.setEnabled(len(self.images) > 0)
+        self.startThumbnails()
+
+        # Show the run data next to the images
+        self.rows, self.numbers = {}, {}
+        journals = sorted(run_path.glob("journal_*.csv"))
+        if journals:
+            self.parent.plotting.loadJournal(journals[-1])
+            self.rows = self.images.evaluation_rows(journals[-1].stem.removeprefix("journal_"))
+            self.numbers = {row: number for number, row in sorted(self.rows.items(), reverse=True)}
+
+        if len(self.images):
+            self.slider.setValue(0)
+            self.showFrame(0)
+        else:
+            self.labelFrame.setText("No saved images")
+
+    def startThumbnails(self) -> None:
+        if self.thumbnails is not None:
+            self.thumbnails.cancelled = True
+        if self.images is None or not len(self.images):
+            return
+        self.thumbnails = ThumbnailTask(self.images, self.kind, self.THUMBNAIL_SIZE)
+        self.thumbnails.signals.thumbnailReady.connect(self.onThumbnailReady)
+        self.parent.executor.start(Role.BACKGROUND, self.thumbnails)
+
+    @Slot(int, QImage)
+    def onThumbnailReady(self, index: int, image: QImage) -> None:
+        if self.sender() is not self.thumbnails.signals:
+            # Late thumbnail of a previous run or kind
+            return
+        if (item := self.list.item(index)) is not None:
+            item.setIcon(QIcon(QPixmap.fromImage(image)))
+
+    @Slot(int)
+    def onKindChanged(self, index: int) -> None:
+        if self.images is not None and len(self.images):
+            self.startThumbnails()
+            self.showFrame(self.slider.value())
+
+    @Slot(int)
+    def onRowChanged(self, row: int) -> None:
+        if row >= 0:
+            self.slider.setValue(row)
+
+    @Slot(int)
+    def showFrame(self, index: int) -> None:
+        if self.images is None or not 0 <= index < len(self.images):
+            return
+        number = self.images.numbers[index]
+        frame = self.images.load(index, self.kind)
+        if frame is not None:
+            self.view.setImage(to_uint8(frame))
+        row = self.rows.get(number)
+        evaluation = f", evaluation {row}" if row is not None else ""
+        self.labelFrame.setText(f"Image {number} ({index + 1}/{len(self.images)}){evaluation}")
+
+        self.list.blockSignals(True)
+        self.list.setCurrentRow(index)
+        self.list.blockSignals(False)
+        if row is not None:
+            self.frameChanged.emit(row)
+
+    @Slot(int)
+    def setEvaluationRow(self, row: int) -> None:
+        """Show the image of the evaluation `row` of the plotted journal, or of the closest one with an image."""
+        if self.images is None or not self.numbers:
+            return
+        rows = sorted(self.numbers)
+        i = min(bisect_left(rows, row), len(rows) - 1)
+        if i > 0 and row - rows[i - 1] < rows[i] - row:
+            i -= 1
+        self.slider.setValue(bisect_left(self.images.numbers, self.numbers[rows[i]]))
+
+    def stop(self) -> None:
+        if self.thumbnails is not None:
+            self.thumbnails.cancelled = True
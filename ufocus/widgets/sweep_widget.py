@@ -0,0 +1,201 @@
+import json
+import logging
+import time
+from datetime import date
+from typing import Optional
+
+from pyqtgraph import PlotWidget, getConfigOption, mkBrush, mkPen
+from PySide6.QtCore import QSize, Qt, Slot
+from PySide6.QtGui import QAction
+from PySide6.QtWidgets import (
+    QComboBox,
+    QDoubleSpinBox,
+    QLabel,
+    QMessageBox,
+    QSplitter,
+    QToolBar,
+    QVBoxLayout,
+    QWidget,
+)
+
+from execution import Role
+from minimizer.sweep import LineSweep, SweepResult
+
+logger = logging.getLogger(__name__)
+
+
+class SweepWidget(QWidget):
+    """
+    Line sweeps of one power supply at a constant ramp rate, for coarse focus finding and
+    for checking the lens calibration, with the response of the spot against the current.
+    """
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.parent = parent
+        self.sweep: Optional[LineSweep] = None
+        # Image processing worker the sweep collects the detections of
+        self.worker = None
+        self.result: Optional[SweepResult] = None
+        legend_pen = getConfigOption("foreground")
+        legend_brush = getConfigOption("background")
+
+        self.toolbar = QToolBar(self)
+        self.toolbar.setIconSize(QSize(16, 16))
+        self.comboboxAxis = QComboBox(self)
+        self.comboboxAxis.addItem("Q1", 0)
+        self.comboboxAxis.addItem("Q2/3", 1)
+        self.comboboxAxis.setToolTip("Power supply ramped, the other one stays at its initial current")
+        self.spinboxRate = QDoubleSpinBox(self)
+        self.spinboxRate.setRange(0.001, 10.0)
+        self.spinboxRate.setDecimals(3)
+        self.spinboxRate.setValue(0.05)
+        self.spinboxRate.setSuffix(" A/s")
+        self.spinboxRate.setToolTip("Ramp rate, the sweep covers the Min to Max range of the minimizer options")
+        self.actionSweep = QAction("Sweep", self)
+        self.actionSweep.setCheckable(True)
+        self.actionSweep.toggled.connect(self.onActionSweep)
+        self.actionUseBest = QAction("Use as initial", self)
+        self.actionUseBest.setToolTip("Set the initial current of the swept supply to the smallest spot")
+        self.actionUseBest.setEnabled(False)
+        self.actionUseBest.triggered.connect(self.onActionUseBest)
+
+        self.toolbar.addWidget(QLabel("Supply: ", self))
+        self.toolbar.addWidget(self.comboboxAxis)
+        self.toolbar.addWidget(QLabel(" Rate: ", self))
+        self.toolbar.addWidget(self.spinboxRate)
+        self.toolbar.addSeparator()
+        self.toolbar.addAction(self.actionSweep)
+        self.toolbar.addAction(self.actionUseBest)
+
+        self.labelStatus = QLabel("Ramp one supply while the camera streams to measure the response in a single pass.", self)
+
+        self.pw1 = PlotWidget()
+        self.graph1 = self.pw1.getPlotItem()
+        self.graph1.showAxes(True)
+        self.graph1.setTitle("Minimization Function")
+        self.graph1.setLabels(left="Value [px⁴]", bottom="Current [A]")
+        self.graph1.getAxis("left").enableAutoSIPrefix(False)
+        self.graph1.setLogMode(x=False, y=True)
+        self.item1 = self.graph1.plot(
+            [], [], pen=None, symbol="o", symbolPen=mkPen({"color": "#1f77b4", "width": 1}),
+            symbolBrush=mkBrush("#1f77b4"), symbolSize=4,
+        )
+
+        self.pw2 = PlotWidget()
+        self.graph2 = self.pw2.getPlotItem()
+        self.graph2.showAxes(True)
+        self.graph2.setTitle("Ellipse Axes")
+        self.graph2.setLabels(left="Length [px]", bottom="Current [A]")
+        self.graph2.addLegend(pen=legend_pen, brush=legend_brush, labelTextSize="8pt", colCount=2)
+        self.item2 = self.graph2.plot(
+            [], [], pen=None, symbol="o", symbolPen=mkPen({"color": "#1f77b4", "width": 1}),
+            symbolBrush=mkBrush("#1f77b4"), symbolSize=4, name="Major",
+        )
+        self.item3 = self.graph2.plot(
+            [], [], pen=None, symbol="o", symbolPen=mkPen({"color": "#ff7f0e", "width": 1}),
+            symbolBrush=mkBrush("#ff7f0e"), symbolSize=4, name="Minor",
+        )
+
+        splitter = QSplitter(Qt.Orientation.Vertical, self)
+        splitter.addWidget(self.pw1)
+        splitter.addWidget(self.pw2)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.toolbar)
+        layout.addWidget(self.labelStatus)
+        layout.addWidget(splitter)
+        self.setLayout(layout)
+
+    def bounds(self, axis: int) -> tuple[float, float, float]:
+        """Start and stop of the ramp of `axis` and the current of the other supply."""
+        if axis == 0:
+            return self.parent.spinboxMinPS1.value(), self.parent.spinboxMaxPS1.value(), self.parent.spinboxInitialPS2.value()
+        return self.parent.spinboxMinPS2.value(), self.parent.spinboxMaxPS2.value(), self.parent.spinboxInitialPS1.value()
+
+    def powers(self) -> tuple[float, float]:
+        try:
+            numerator, denominator = json.loads(self.parent.lineEditObjFuncPowers.text())
+        except (ValueError, TypeError):
+            return 1, 2
+        return numerator, denominator
+
+    @Slot(bool)
+    def onActionSweep(self, checked: bool) -> None:
+        if not checked:
+            if self.sweep is not None:
+                self.sweep.stop()
+            return
+        worker = getattr(self.parent, "imageProcessingWorker", None)
+        if (
+            worker is None
+            or not worker.running
+            or not hasattr(self.parent, "pscontroller")
+            or not all(self.parent.pscontroller.successfull.values())
+            or self.parent.minimizationButton.isChecked()
+        ):
+            QMessageBox.warning(
+                self,
+                "Cannot sweep",
+                "The power supplies have to be connected, image processing running and the minimization stopped.",
+                QMessageBox.StandardButton.Ok,
+            )
+            self.actionSweep.setChecked(False)
+            return
+
+        axis = self.comboboxAxis.currentData()
+        start, stop, fixed = self.bounds(axis)
+        self.sweep = LineSweep(
+            self.parent.pscontroller, axis, start, stop, self.spinboxRate.value(), fixed, self.powers()
+        )
+        # The detections are collected in the image processing thread
+        self.worker = worker
+        worker.signals.sweepSample.connect(self.sweep.onSample, Qt.ConnectionType.DirectConnection)
+        self.sweep.signals.sweeping.connect(worker.setSweeping)
+        self.sweep.signals.controlTimer.connect(self.parent.pscontroller.controlTimer)
+        self.sweep.signals.progress.connect(self.onProgress)
+        self.sweep.signals.finished.connect(self.onSweepFinished)
+        self.actionUseBest.setEnabled(False)
+        self.comboboxAxis.setEnabled(False)
+        self.labelStatus.setText(f"Sweeping {self.comboboxAxis.currentText()} from {start} A to {stop} A...")
+        self.parent.executor.start(Role.OPTIMIZATION, self.sweep)
+
+    @Slot(int)
+    def onProgress(self, samples: int) -> None:
+        self.labelStatus.setText(f"Sweeping {self.comboboxAxis.currentText()}, {samples} frames analyzed...")
+
+    @Slot(object)
+    def onSweepFinished(self, result: SweepResult) -> None:
+        # Image processing may have been restarted with a new worker meanwhile
+        self.worker.signals.sweepSample.disconnect(self.sweep.onSample)
+        self.worker = self.sweep = None
+        self.result = result
+        self.comboboxAxis.setEnabled(True)
+        self.actionSweep.blockSignals(True)
+        self.actionSweep.setChecked(False)
+        self.actionSweep.blockSignals(False)
+
+        self.item1.setData(result.current, result.values)
+        self.item2.setData(result.current, result.attribute("major"))
+        self.item3.setData(result.current, result.attribute("minor"))
+
+        path = self.parent.runDataPath() / f"sweep_{date.today()}_{time.time_ns()}.csv"
+        result.save(path)
+        logger.info(f"Saved the sweep to {path}")
+
+        best = result.best()
+        if best is None:
+            self.labelStatus.setText(f"No spot was detected during the sweep ({len(result.readback)} current readings).")
+            return
+        self.actionUseBest.setEnabled(True)
+        self.labelStatus.setText(
+            f"{len(result)} frames over {len(result.readback)} current readings, "
+            f"smallest at {best[0]:.4f} A (Obj. Func. = {best[1]:.2f})"
+        )
+
+    @Slot()
+    def onActionUseBest(self) -> None:
+        if self.result is None or (best := self.result.best()) is None:
+            return
+        spinbox = self.parent.spinboxInitialPS1 if self.result.axis == 0 else self.parent.spinboxInitialPS2
+        spinbox.setValue(best[0])
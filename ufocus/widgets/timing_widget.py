@@ -0,0 +1,94 @@
+from numpy import arange, array, zeros
+from pyqtgraph import BarGraphItem, PlotWidget, getConfigOption, mkBrush, mkPen
+from PySide6.QtCore import Qt, QTimer, Slot
+from PySide6.QtWidgets import (
+    QAbstractItemView,
+    QHeaderView,
+    QSplitter,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from profiling import Profiler, profiler
+
+COLORS = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf")
+
+
+class TimingWidget(QWidget):
+    """Breakdown of the time spent per objective function evaluation and per run."""
+
+    # Sequential phases of an evaluation in the Minimizer thread, the other spans are nested
+    # in them or run in other threads and are only listed in the table
+    PHASES = ("set currents", "wait for image processing", "refresh status")
+    OTHER = "other"
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.parent = parent
+
+        self.table = QTableWidget(0, 5, self)
+        self.table.setHorizontalHeaderLabels(["Span", "Count", "Total [s]", "Mean [ms]", "Share"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+
+        self.pw = PlotWidget()
+        self.graph = self.pw.getPlotItem()
+        self.graph.showAxes(True)
+        self.graph.setTitle("Time per Evaluation")
+        self.graph.setLabels(left="Time [s]", bottom="Count")
+        self.graph.addLegend(
+            pen=getConfigOption("foreground"), brush=getConfigOption("background"), labelTextSize="8pt", colCount=2
+        )
+        self.bars: dict[str, BarGraphItem] = {}
+
+        splitter = QSplitter(Qt.Orientation.Vertical, self)
+        splitter.addWidget(self.pw)
+        splitter.addWidget(self.table)
+
+        layout = QVBoxLayout()
+        layout.addWidget(splitter)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+    @Slot()
+    def refresh(self) -> None:
+        if not self.isVisible():
+            return
+        run, evaluations = profiler.snapshot()
+        self.updateTable(run)
+        self.updateBars(evaluations)
+
+    def updateTable(self, run) -> None:
+        reference = run[Profiler.EVALUATION].total if Profiler.EVALUATION in run else 0.0
+        rows = sorted(run.items(), key=lambda item: -item[1].total)
+        self.table.setRowCount(len(rows))
+        for row, (name, stats) in enumerate(rows):
+            share = f"{100 * stats.total / reference:.1f}%" if reference else ""
+            for column, value in enumerate(
+                (name, str(stats.count), f"{stats.total:.3f}", f"{1e3 * stats.mean:.1f}", share)
+            ):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+
+    def updateBars(self, evaluations) -> None:
+        x = arange(len(evaluations))
+        bottom = zeros(len(evaluations))
+        phases = {name: array([e.get(name, 0.0) for e in evaluations]) for name in self.PHASES}
+        total = array([e.get(Profiler.EVALUATION, 0.0) for e in evaluations])
+        phases[self.OTHER] = (total - sum(phases.values())).clip(0.0)
+
+        for i, (name, height) in enumerate(phases.items()):
+            if name not in self.bars:
+                color = COLORS[i % len(COLORS)]
+                self.bars[name] = BarGraphItem(
+                    x=[], height=[], width=0.8, brush=mkBrush(color), pen=mkPen(color), name=name
+                )
+                self.graph.addItem(self.bars[name])
+            self.bars[name].setOpts(x=x, y0=bottom.copy(), height=height)
+            bottom += height
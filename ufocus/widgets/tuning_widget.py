@@ -0,0 +1,201 @@
+import logging
+from typing import Optional
+
+from numpy import ndarray
+from PySide6.QtCore import QObject, QRunnable, QSize, Signal, Slot
+from PySide6.QtGui import QAction
+from PySide6.QtWidgets import (
+    QAbstractItemView,
+    QDoubleSpinBox,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QMessageBox,
+    QSpinBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QToolBar,
+    QVBoxLayout,
+    QWidget,
+)
+
+from execution import Role
+from image_processing.tuning import KERNELS, PYRAMID_LEVELS, TuningResult, best, tune
+
+logger = logging.getLogger(__name__)
+
+
+def parse_values(text: str) -> list[int]:
+    return [int(value) for value in text.replace(",", " ").split()]
+
+
+class TuningSignals(QObject):
+    finished = Signal(object)
+
+
+class TuningTask(QRunnable):
+    def __init__(self, frames: list[ndarray], interval: float, thresholds: list[int], kernels: list[int]) -> None:
+        super().__init__()
+        self.frames = frames
+        self.interval = interval
+        self.thresholds = thresholds
+        self.kernels = kernels
+        self.signals = TuningSignals()
+
+    def run(self) -> None:
+        try:
+            results = tune(self.frames, self.interval, self.thresholds, self.kernels, PYRAMID_LEVELS)
+        except Exception as e:
+            logger.error(f"Tuning failed: {e!r}")
+            results = []
+        self.signals.finished.emit(results)
+
+
+class TuningWidget(QWidget):
+    """
+    Tuning of the detection parameters on a burst of frames taken at a fixed setpoint.
+
+    Every combination of threshold, Gaussian kernel, pyramid levels and number of
+    accumulated images is evaluated on the same frames, and the cheapest one whose
+    objective is stable within the target noise is selected.
+    """
+
+    COLUMNS = ["Threshold", "Kernel", "Pyramid", "Images", "Detected", "Objective", "Noise [%]", "Analysis [ms]", "Evaluation [ms]"]
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.parent = parent
+        self.results: list[TuningResult] = []
+        self.task: Optional[TuningTask] = None
+
+        self.toolbar = QToolBar(self)
+        self.toolbar.setIconSize(QSize(16, 16))
+        self.spinboxBurst = QSpinBox(self)
+        self.spinboxBurst.setRange(3, 512)
+        self.spinboxBurst.setValue(48)
+        self.spinboxBurst.setToolTip("Number of frames captured at the current setpoint")
+        self.lineEditThresholds = QLineEdit("-1", self)
+        self.lineEditThresholds.setToolTip("Thresholds to try, -1 selects Otsu's method")
+        self.lineEditKernels = QLineEdit(", ".join(str(k) for k in KERNELS), self)
+        self.lineEditKernels.setToolTip("Gaussian kernel sizes to try, 0 disables the filtering")
+        self.spinboxNoise = QDoubleSpinBox(self)
+        self.spinboxNoise.setRange(0.1, 50.0)
+        self.spinboxNoise.setValue(2.0)
+        self.spinboxNoise.setSuffix(" %")
+        self.spinboxNoise.setToolTip("Largest relative spread of the objective that is accepted")
+        self.actionTune = QAction("Capture && Tune", self)
+        self.actionTune.triggered.connect(self.onActionTune)
+        self.actionApply = QAction("Apply", self)
+        self.actionApply.setEnabled(False)
+        self.actionApply.triggered.connect(self.onActionApply)
+
+        self.toolbar.addWidget(QLabel("Frames: ", self))
+        self.toolbar.addWidget(self.spinboxBurst)
+        self.toolbar.addWidget(QLabel(" Thresholds: ", self))
+        self.toolbar.addWidget(self.lineEditThresholds)
+        self.toolbar.addWidget(QLabel(" Kernels: ", self))
+        self.toolbar.addWidget(self.lineEditKernels)
+        self.toolbar.addWidget(QLabel(" Target noise: ", self))
+        self.toolbar.addWidget(self.spinboxNoise)
+        self.toolbar.addSeparator()
+        self.toolbar.addAction(self.actionTune)
+        self.toolbar.addAction(self.actionApply)
+
+        self.labelStatus = QLabel("Capture a burst of frames of a stable beam to tune the detection.", self)
+
+        self.table = QTableWidget(0, len(self.COLUMNS), self)
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.toolbar)
+        layout.addWidget(self.labelStatus)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+    @Slot()
+    def onActionTune(self) -> None:
+        worker = getattr(self.parent, "imageProcessingWorker", None)
+        if worker is None or not worker.running or self.parent.minimizationButton.isChecked():
+            QMessageBox.warning(
+                self,
+                "Cannot tune",
+                "Image processing has to be running, and the minimization stopped, to capture a burst of frames.",
+                QMessageBox.StandardButton.Ok,
+            )
+            return
+        try:
+            self.thresholds = parse_values(self.lineEditThresholds.text())
+            self.kernels = [k for k in parse_values(self.lineEditKernels.text()) if k == 0 or k % 2 == 1]
+        except ValueError:
+            self.labelStatus.setText("The thresholds and kernels must be lists of integers.")
+            return
+        self.actionTune.setEnabled(False)
+        self.actionApply.setEnabled(False)
+        self.labelStatus.setText(f"Capturing {self.spinboxBurst.value()} frames...")
+        worker.captureBurst(self.spinboxBurst.value())
+
+    @Slot(object, float)
+    def onBurstCaptured(self, frames: list[ndarray], interval: float) -> None:
+        if self.actionTune.isEnabled():
+            # Not requested by this widget
+            return
+        self.labelStatus.setText(f"Evaluating the candidates on {len(frames)} frames...")
+        self.task = TuningTask(frames, interval, self.thresholds, self.kernels)
+        self.task.signals.finished.connect(self.onTuningFinished)
+        self.parent.executor.start(Role.BACKGROUND, self.task)
+
+    @Slot(object)
+    def onTuningFinished(self, results: list[TuningResult]) -> None:
+        self.task = None
+        self.actionTune.setEnabled(True)
+        self.results = sorted(results, key=lambda r: r.cost)
+        selected = best(self.results, self.spinboxNoise.value() / 100)
+
+        self.table.setRowCount(len(self.results))
+        for row, result in enumerate(self.results):
+            parameters = result.candidate.parameters
+            for column, value in enumerate(
+                (
+                    str(parameters.threshold),
+                    str(parameters.kernel or "Off"),
+                    str(parameters.pyramid),
+                    str(result.candidate.frames),
+                    f"{result.detected}/{result.samples}",
+                    f"{result.mean:.4g}",
+                    f"{100 * result.relative_std:.2f}",
+                    f"{1e3 * result.compute:.1f}",
+                    f"{1e3 * result.cost:.0f}",
+                )
+            ):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+
+        if selected is None:
+            self.labelStatus.setText("The spot was not detected reliably with any candidate.")
+            return
+        self.table.selectRow(self.results.index(selected))
+        self.actionApply.setEnabled(True)
+        self.labelStatus.setText(
+            f"Selected {selected.candidate.name}: {100 * selected.relative_std:.2f}% noise, "
+            f"{1e3 * selected.cost:.0f} ms per evaluation."
+        )
+
+    @Slot()
+    def onActionApply(self) -> None:
+        """Apply the selected candidate to the image processing, and thus to the evaluations of the minimizer."""
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            return
+        result = self.results[rows[0].row()]
+        parameters = result.candidate.parameters
+        self.parent.spinboxThreshold.setValue(parameters.threshold)
+        self.parent.checkboxGaussianFiltering.setChecked(parameters.kernel > 0)
+        if parameters.kernel > 0:
+            self.parent.spinboxGaussianKernel.setValue(parameters.kernel)
+        self.parent.comboboxPyramid.setCurrentIndex(self.parent.comboboxPyramid.findData(parameters.pyramid))
+        self.parent.spinboxImagesToAccumulate.setValue(result.candidate.frames)
+        logger.info(f"Applied the detection parameters {result.candidate.name}")
@@ -9,6 +9,8 @@ from pypylon.genicam import GenericException
 from PySide6.QtCore import QObject, Signal, Slot
 from PySide6.QtGui import QImage
 
+from profiling import profiler
+from tracing import tracer
 from workers.camera_worker_base import CameraWorker
 
 logger = logging.getLogger(__name__)
@@ -31,6 +33,7 @@ class BaslerCameraWorker(CameraWorker):
 
     @Slot()
     def run(self):
+        tracer.set_thread_name("Camera worker")
         try:
             self.camera.StartGrabbing(pylon.GrabStrategy_OneByOne, pylon.GrabLoop_ProvidedByInstantCamera)
             logger.info("Camera worker started")
@@ -62,17 +65,21 @@ class CameraImageHandler(pylon.ImageEventHandler, QObject):
         # self.img = np.zeros((2048, 2448))
 
     def OnImageGrabbed(self, camera, grab):
+        # Called on the grab loop thread of pylon, not on the thread of the worker
+        tracer.set_thread_name("Camera grab loop")
         if grab.GrabSucceeded():
-            self.img: ndarray = grab.GetArray()
-            self.progress.emit(self.img)
-            if self.img.ndim == 2:
-                h, w = self.img.shape
-                image = QImage(self.img.data, w, h, w, QImage.Format.Format_Grayscale8)
-            elif self.img.ndim == 3:
-                h, w, ch = self.img.shape
-                image = QImage(self.img.data, w, h, ch * w, QImage.Format.Format_RGB888)
-            # self.image = self.image.scaled(320, 240, Qt.KeepAspectRatio)
-            self.updateFrame.emit(image)
+            with profiler.span("camera: grab"):
+                self.img: ndarray = grab.GetArray()
+            with profiler.span("camera: emit"):
+                self.progress.emit(self.img)
+                if self.img.ndim == 2:
+                    h, w = self.img.shape
+                    image = QImage(self.img.data, w, h, w, QImage.Format.Format_Grayscale8)
+                elif self.img.ndim == 3:
+                    h, w, ch = self.img.shape
+                    image = QImage(self.img.data, w, h, ch * w, QImage.Format.Format_RGB888)
+                # self.image = self.image.scaled(320, 240, Qt.KeepAspectRatio)
+                self.updateFrame.emit(image)
         
 
     def OnImagesSkipped(self, camera, countOfSkippedImages):
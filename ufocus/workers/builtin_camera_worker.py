@@ -7,6 +7,8 @@ import cv2
 from PySide6.QtCore import Slot
 from PySide6.QtGui import QImage
 
+from profiling import profiler
+from tracing import tracer
 from workers.camera_worker_base import CameraWorker
 
 logger = logging.getLogger(__name__)
@@ -20,6 +22,7 @@ class BuiltInCameraWorker(CameraWorker):
 
     @Slot()
     def run(self):
+        tracer.set_thread_name("Camera worker")
         try:
             self.camera.open(0)
         except Exception as e:
@@ -31,24 +34,26 @@ class BuiltInCameraWorker(CameraWorker):
                 if frames == 0:
                     start = time.perf_counter()
                 try:
-                    ret, frame = self.camera.read()
+                    with profiler.span("camera: grab"):
+                        ret, frame = self.camera.read()
                 except cv2.error:
                     pass
                 else:
                     if ret:
-                        # Reading the image in RGB to display it
-                        img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        self.signals.progress.emit(img)
-
-                        if img.ndim == 2:
-                            h, w = img.shape
-                            img = QImage(
-                                img.data, w, h, w, QImage.Format.Format_Grayscale8
-                            )
-                        elif img.ndim == 3:
-                            h, w, ch = img.shape
-                        image = QImage(img.data, w, h, ch * w, QImage.Format.Format_RGB888)
-                        self.signals.updateFrame.emit(image)
+                        with profiler.span("camera: emit"):
+                            # Reading the image in RGB to display it
+                            img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                            self.signals.progress.emit(img)
+
+                            if img.ndim == 2:
+                                h, w = img.shape
+                                img = QImage(
+                                    img.data, w, h, w, QImage.Format.Format_Grayscale8
+                                )
+                            elif img.ndim == 3:
+                                h, w, ch = img.shape
+                            image = QImage(img.data, w, h, ch * w, QImage.Format.Format_RGB888)
+                            self.signals.updateFrame.emit(image)
                         frames += 1
                         if frames == 30:
                             self.signals.fps.emit(frames / (time.perf_counter() - start))
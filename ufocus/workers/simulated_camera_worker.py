@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+from PySide6.QtCore import Slot
+from PySide6.QtGui import QImage
+
+from profiling import profiler
+from tracing import tracer
+from workers.camera_worker_base import CameraWorker
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedCameraWorker(CameraWorker):
+    def __init__(self, camera, parent=None) -> None:
+        super().__init__(parent)
+        self.camera = camera
+
+    @Slot()
+    def run(self):
+        logger.info("Camera worker started")
+        tracer.set_thread_name("Camera worker")
+        self.camera.grabbing = True
+        try:
+            frames = 0
+            start = time.perf_counter()
+            while self.camera.grabbing:
+                t_frame = time.perf_counter()
+                with profiler.span("camera: grab"):
+                    currents = self.camera.currents()
+                    if (roi := self.camera.roi) is not None:
+                        x1, y1, x2, y2 = roi
+                        img = self.camera.model.render(self.camera.width, self.camera.height, currents, (x1, y1, x2 - x1, y2 - y1))
+                    else:
+                        img = self.camera.model.render(self.camera.width, self.camera.height, currents)
+                with profiler.span("camera: emit"):
+                    self.signals.progress.emit(img)
+
+                    h, w = img.shape
+                    image = QImage(img.data, w, h, w, QImage.Format.Format_Grayscale8)
+                    self.signals.updateFrame.emit(image)
+
+                frames += 1
+                if frames == 30:
+                    self.signals.fps.emit(frames / (time.perf_counter() - start))
+                    frames = 0
+                    start = time.perf_counter()
+
+                # A frame rate of zero runs the simulation as fast as possible
+                if self.camera.frame_rate > 0:
+                    remaining = 1 / self.camera.frame_rate - (time.perf_counter() - t_frame)
+                    if remaining > 0:
+                        time.sleep(remaining)
+        finally:
+            logger.info("Camera worker finished")
+            if not self.manually_terminated:
+                self.signals.finished.emit()